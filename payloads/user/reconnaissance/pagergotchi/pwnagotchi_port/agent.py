@@ -8,8 +8,6 @@ import os
 import re
 import logging
 import asyncio
-import threading
-from glob import glob
 
 # Changed: pwnagotchi -> pwnagotchi_port
 import pwnagotchi_port as pwnagotchi
@@ -22,6 +20,17 @@ from pwnagotchi_port.bettercap import Client
 from pwnagotchi_port.mesh.utils import AsyncAdvertiser
 from pwnagotchi_port.gps import GPS
 from pwnagotchi_port.ap_logger import APLogger
+from pwnagotchi_port.wifi_security import skip_reason, deauth_useful
+from pwnagotchi_port.client_priority import client_skip_reason, rank_clients
+from pwnagotchi_port.scheduler import TargetScheduler
+from pwnagotchi_port.attack_dispatcher import AttackDispatcher
+from pwnagotchi_port.handshake_book import HandshakeBook
+from pwnagotchi_port.handshake_catalog import HASH_PMKID, HASH_EAPOL
+from pwnagotchi_port.records import mac_to_int
+from pwnagotchi_port.throttle import AdaptiveThrottle, TokenBucket, FRAMES, ASSOC, DEAUTH
+from pwnagotchi_port.ai.dwell import DwellBandit, VisitHistory, dwell_options, fixed_dwell
+from pwnagotchi_port.hop_plan import compile_plan, channel_to_band
+from pwnagotchi_port.runtime import get_runtime
 
 # Payload directory paths (relative to this file's location)
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -30,16 +39,6 @@ DATA_DIR = os.path.join(PAYLOAD_DIR, 'data')
 RECOVERY_DATA_FILE = os.path.join(DATA_DIR, 'recovery.json')
 
 
-def channel_to_band(channel):
-    """Convert channel number to frequency band string"""
-    if channel <= 14:
-        return "2G"
-    elif channel <= 177:
-        return "5G"
-    else:
-        return "6G"
-
-
 class Agent(Client, Automata, AsyncAdvertiser):
     def __init__(self, view, config, keypair=None):
         Client.__init__(self,
@@ -47,7 +46,8 @@ class Agent(Client, Automata, AsyncAdvertiser):
                         "http" if "scheme" not in config['bettercap'] else config['bettercap']['scheme'],
                         8081 if "port" not in config['bettercap'] else config['bettercap']['port'],
                         "pwnagotchi" if "username" not in config['bettercap'] else config['bettercap']['username'],
-                        "pwnagotchi" if "password" not in config['bettercap'] else config['bettercap']['password'])
+                        "pwnagotchi" if "password" not in config['bettercap'] else config['bettercap']['password'],
+                        config=config)
         Automata.__init__(self, config, view)
         AsyncAdvertiser.__init__(self, config, view, keypair)
 
@@ -63,11 +63,46 @@ class Agent(Client, Automata, AsyncAdvertiser):
         self._access_points = []
         self._last_pwnd = None
         self._history = {}
-        self._handshakes = {}
+        self._handshakes = HandshakeBook()
+        # What auto mode attacks next, see plan_epoch()
+        personality = config['personality']
+        # Associations on a channel take turns holding the focus lease
+        self._focus_time = config.get('recon', {}).get('focus_time', 2)
+        # assoc_time/deauth_time follow the learned throttles, see plan_epoch()
+        self._scheduler = TargetScheduler(
+            assoc_time=max(personality.get('throttle_a', 0.4), self._focus_time),
+            deauth_time=personality.get('throttle_d', 0.9),
+            # main loop pause + the shortest wait set_channel() makes
+            switch_time=1 + personality.get('min_recon_time', 5),
+            max_attempts=personality.get('max_interactions', 3),
+            associate=personality.get('associate', True),
+            deauth=personality.get('deauth', True))
+        # throttle_a/d adapt to command latency and results (per environment,
+        # data/throttle.json); inject_rate caps frames/s over all targets
+        self._throttle = AdaptiveThrottle(personality.get('throttle_a', 0.4),
+                                          personality.get('throttle_d', 0.9))
+        self._throttle.load()
+        self._epoch.throttle = self._throttle
+        self._inject_budget = TokenBucket(personality.get('inject_rate', 20),
+                                          personality.get('inject_burst', 40))
+        # How long to stay on a channel after attacking it ([timing] dwell):
+        # learned per channel, or the fixed hop/min_recon_time. Visits are
+        # recorded either way (see ai/dwell.py --evaluate)
+        self._dwell = None
+        self._dwell_history = None
+        if personality.get('dwell', 'bandit') == 'bandit':
+            self._dwell = DwellBandit(dwell_options(config))
+            self._dwell.load()
+        else:
+            self._dwell_history = VisitHistory()
+        self._visit = None  # (channel, started, session handshakes at start)
+        self._hop_plan = None  # this epoch's channel order, see plan_epoch()
+        # Sends assoc/deauth commands off the main loop; the throttles are
+        # per-target cooldowns and the face goes back to normal when it's idle
+        self._dispatcher = AttackDispatcher(self.run, on_idle=self._on_attacks_done,
+                                            budget=self._inject_budget)
         self._session_handshakes = 0  # Handshakes captured this session
         self._last_total_handshakes = 0  # For detecting new handshakes
-        self._known_handshake_files = set()  # Track seen files directly
-        self._pineap_handshakes_dir = '/root/loot/handshakes'  # PineAP saves here (not config path!)
         self.last_session = LastSession(self._config)
         self.mode = 'auto'
 
@@ -187,17 +222,17 @@ class Agent(Client, Automata, AsyncAdvertiser):
         self.set_starting()
         time.sleep(3)  # Show startup message for 3 seconds
         self.start_monitor_mode()
-        # Initialize known handshakes from directory so we only track NEW ones this session
-        pattern = os.path.join(self._pineap_handshakes_dir, '*.22000')
-        self._known_handshake_files = set(glob(pattern))
-        logging.info(f"[agent] Starting with {len(self._known_handshake_files)} existing handshakes")
+        # Start AP logger if enabled (before event polling, it consumes wifi.ap.new)
+        self._ap_logger.start()
+        # New capture files arrive from the backend's handshake watcher; files
+        # already in the directory are only counted
+        self.subscribe_handshakes(self._on_new_handshake_file)
+        logging.info(f"[agent] Starting with {self.get_total_handshakes_count()} existing handshakes")
         self.start_event_polling()
         self.start_session_fetcher()
         # Start GPS (optional - no error if not available)
         if self._gps.start():
             logging.info("GPS enabled")
-        # Start AP logger if enabled
-        self._ap_logger.start()
         # print initial stats
         self.next_epoch()
         self.set_ready()
@@ -212,6 +247,9 @@ class Agent(Client, Automata, AsyncAdvertiser):
             recon_time *= recon_mul
 
         self._view.set('channel', '*')
+        self._dispatcher.drain()
+        # No dwell decision was made for the last channel, nothing to learn
+        self._visit = None
 
         if not channels:
             self._current_channel = 0
@@ -252,7 +290,8 @@ class Agent(Client, Automata, AsyncAdvertiser):
                 return True
         return False
 
-    def get_access_points(self):
+    def _target_lists(self):
+        """Return (whitelist, blacklist) entries from settings and config"""
         # Get whitelist/blacklist from settings
         whitelist = self._settings.get('whitelist', [])
         blacklist = self._settings.get('blacklist', [])
@@ -263,27 +302,34 @@ class Agent(Client, Automata, AsyncAdvertiser):
             if ssid and not any(e.get('ssid', '').lower() == ssid.lower() for e in whitelist):
                 whitelist.append({'ssid': ssid, 'bssid': ''})
 
+        return whitelist, blacklist
+
+    def _is_target(self, ap, whitelist, blacklist):
+        """Check if an AP should be attacked given the white/blacklists"""
+        # Skip APs that can't give a crackable handshake (open, WEP, SAE-only,
+        # enterprise) as set by the [targeting] policy
+        reason = skip_reason(ap, self._config.get('targeting'))
+        if reason:
+            logging.debug("skipping %s (%s): %s", ap.get('hostname', ''), ap.get('mac', ''), reason)
+            return False
+
+        # If blacklist has entries, ONLY target those (blacklist mode)
+        if blacklist:
+            return self._ap_matches_list(ap, blacklist)
+
+        # Otherwise, use whitelist to exclude (whitelist mode)
+        return not self._ap_matches_list(ap, whitelist)
+
+    def get_access_points(self):
+        whitelist, blacklist = self._target_lists()
+
         aps = []
         try:
             s = self.session()
             plugins.on("unfiltered_ap_list", self, s['wifi']['aps'])
             for ap in s['wifi']['aps']:
-                # Skip open networks
-                if ap.get('encryption', '') == '' or ap.get('encryption', '') == 'OPEN':
-                    continue
-
-                # If blacklist has entries, ONLY target those (blacklist mode)
-                if blacklist:
-                    if self._ap_matches_list(ap, blacklist):
-                        aps.append(ap)
-                    # Skip if not in blacklist
-                    continue
-
-                # Otherwise, use whitelist to exclude (whitelist mode)
-                if self._ap_matches_list(ap, whitelist):
-                    continue
-
-                aps.append(ap)
+                if self._is_target(ap, whitelist, blacklist):
+                    aps.append(ap)
         except Exception as e:
             logging.exception("Error while getting access points (%s)", e)
 
@@ -320,6 +366,64 @@ class Agent(Client, Automata, AsyncAdvertiser):
         # sort by more populated channels
         return sorted(grouped.items(), key=lambda kv: len(kv[1]), reverse=True)
 
+    def _schedulable(self, ap):
+        """True if auto mode should spend airtime on a target AP this epoch"""
+        channels = self._config['personality']['channels']
+        if channels and ap.get('channel', 0) not in channels:
+            return False
+        if ap.get('rssi', 0) < self._config['personality']['min_rssi']:
+            return False
+        return not self._has_handshake(ap['mac']) and not self.captured_before(ap)
+
+    def _deauth_clients(self, ap):
+        if not deauth_useful(ap, self._config.get('targeting')):
+            return []
+        return self.deauth_targets(ap)
+
+    def _predicted_dwell(self, channel, did_deauth):
+        if self._dwell is not None:
+            expected = self._dwell.expected(channel)
+            return max(expected, key=expected.get)
+        return fixed_dwell(self._config, did_deauth)
+
+    def plan_epoch(self):
+        """Queue this epoch's targets in the scheduler and plan the channel
+        order within the airtime budget, returns how many APs"""
+        aps = [ap for ap in self.get_access_points() if self._schedulable(ap)]
+        # Score and plan with what attacks cost here, as learned so far
+        self._scheduler.assoc_time = max(self._throttle.value(ASSOC), self._focus_time)
+        self._scheduler.deauth_time = self._throttle.value(DEAUTH)
+        self._scheduler.begin_epoch((ap, self._deauth_clients(ap)) for ap in aps)
+        work = {ch: (seconds + self._predicted_dwell(ch, deauth), shakes)
+                for ch, (seconds, shakes, deauth) in self._scheduler.workload().items()}
+        self._hop_plan = compile_plan(work, self._current_channel,
+                                      self._config['personality'].get('airtime_budget', 0))
+        if self._hop_plan.dropped:
+            logging.debug("[HopPlan] Over budget, skipping channels %s this epoch",
+                          self._hop_plan.dropped)
+        logging.debug("[HopPlan] %s (%s)", self._hop_plan.order, self._hop_plan.summary())
+        if len(self._hop_plan):
+            # The clock for the first channel starts now, hop or not
+            self._hop_plan.mark(self._hop_plan.current())
+        return len(aps)
+
+    def next_target(self):
+        """Next (action, ap, clients) to do, None when done
+
+        Works through the hop plan one channel at a time, best item first;
+        APs recon reports on channels outside the plan wait for the next one.
+        """
+        plan = self._hop_plan
+        if plan is None:
+            return self._scheduler.next(self._current_channel)
+        channel = plan.current()
+        while channel is not None:
+            item = self._scheduler.next(channel, stay=True)
+            if item is not None:
+                return item
+            channel = plan.advance()
+        return None
+
     def _find_ap_sta_in(self, station_mac, ap_mac, session):
         for ap in session['wifi']['aps']:
             if ap['mac'] == ap_mac:
@@ -346,54 +450,39 @@ class Agent(Client, Automata, AsyncAdvertiser):
                 [len(ap.get('clients', [])) for ap in self._access_points if ap.get('channel') == self._current_channel])
             self._view.set('aps', '%d (%d)' % (self._aps_on_channel, self._tot_aps))
 
-    def _check_handshakes_direct(self):
-        """Directly scan handshake directory for new files"""
-        # Find all .22000 files
-        pattern = os.path.join(self._pineap_handshakes_dir, '*.22000')
-        current_files = set(glob(pattern))
-
-        # Find new files (files we haven't seen before)
-        new_files = current_files - self._known_handshake_files
-        new_count = len(new_files)
-
-        # Always update known files set to keep total count accurate
-        self._known_handshake_files = current_files
-
-        if new_count > 0:
+    def _on_new_handshake_file(self, event):
+        """handshake.new/updated from the backend's watcher (runtime pool thread)"""
+        filepath = event['data']['file']
+        capture = self.handshake_entry(filepath)
+        essid = capture['essid'] if capture else None
+
+        # Credit the attacks that led to it (PMKID = association, EAPOL = deauth)
+        if capture and capture['ap']:
+            actions = []
+            if HASH_PMKID in capture['types']:
+                actions.append(ASSOC)
+            if HASH_EAPOL in capture['types']:
+                actions.append(DEAUTH)
+            self._throttle.on_handshake(mac_to_int(capture['ap']), actions)
+        if event['tag'] == 'handshake.updated':
+            # More hashes in a file already counted
+            return
+        if essid:
+            self._last_pwnd = essid
+            logging.info(f"[agent] New handshake captured: {essid}")
+        else:
+            # Try to get MAC from filename
+            filename = os.path.basename(filepath)
+            mac_match = re.search(r'_([0-9A-Fa-f]{12})_', filename)
+            if mac_match:
+                raw_mac = mac_match.group(1)
+                self._last_pwnd = ':'.join(raw_mac[i:i+2] for i in range(0, 12, 2))
+            logging.info(f"[agent] New handshake captured: {self._last_pwnd or 'unknown'}")
 
-            # Get SSID from newest file (by modification time)
-            newest_file = max(new_files, key=os.path.getmtime)
-            essid = self._extract_essid_from_file(newest_file)
-            if essid:
-                self._last_pwnd = essid
-                logging.info(f"[agent] New handshake captured: {essid}")
-            else:
-                # Try to get MAC from filename
-                filename = os.path.basename(newest_file)
-                mac_match = re.search(r'_([0-9A-Fa-f]{12})_', filename)
-                if mac_match:
-                    raw_mac = mac_match.group(1)
-                    self._last_pwnd = ':'.join(raw_mac[i:i+2] for i in range(0, 12, 2))
-                logging.info(f"[agent] New handshake captured: {self._last_pwnd or 'unknown'}")
-
-        return new_count
-
-    def _extract_essid_from_file(self, filepath):
-        """Extract ESSID from .22000 hashcat file"""
         try:
-            with open(filepath, 'r') as f:
-                for line in f:
-                    # Format: WPA*TYPE*PMKID/MIC*MAC_AP*MAC_STA*ESSID_HEX*...
-                    parts = line.strip().split('*')
-                    if len(parts) >= 6:
-                        essid_hex = parts[5]
-                        try:
-                            return bytes.fromhex(essid_hex).decode('utf-8', errors='ignore')
-                        except:
-                            pass
-        except:
-            pass
-        return None
+            self._update_handshakes(1)
+        except Exception as err:
+            logging.debug("[agent:_on_new_handshake_file] self.update_handshakes: %s" % repr(err))
 
     def _update_handshakes(self, new_shakes=0):
         if new_shakes > 0:
@@ -401,7 +490,7 @@ class Agent(Client, Automata, AsyncAdvertiser):
             self._session_handshakes += new_shakes
 
         # Total = number of .22000 files in handshakes directory
-        total_known = len(self._known_handshake_files)
+        total_known = self.get_total_handshakes_count()
         # Display: session_captures (total_known)
         txt = '%d (%d)' % (self._session_handshakes, total_known)
 
@@ -442,7 +531,7 @@ class Agent(Client, Automata, AsyncAdvertiser):
                     'started_at': self._started_at,
                     'epoch': self._epoch.epoch,
                     'history': self._history,
-                    'handshakes': self._handshakes,
+                    'handshakes': self._handshakes.to_dict(),
                     'last_pwnd': self._last_pwnd
                 }
                 json.dump(data, fp)
@@ -456,7 +545,7 @@ class Agent(Client, Automata, AsyncAdvertiser):
                 logging.info("found recovery data: %s", data)
                 self._started_at = data['started_at']
                 self._epoch.epoch = data['epoch']
-                self._handshakes = data['handshakes']
+                self._handshakes = HandshakeBook.from_dict(data['handshakes'])
                 self._history = data['history']
                 self._last_pwnd = data['last_pwnd']
 
@@ -468,7 +557,8 @@ class Agent(Client, Automata, AsyncAdvertiser):
                 raise
 
     def start_session_fetcher(self):
-        threading.Thread(target=self._fetch_stats, args=(), name="Session Fetcher", daemon=True).start()
+        # One round every 5 seconds on the shared runtime's pool
+        get_runtime().every(5, self._fetch_stats, 'session-fetcher', blocking=True, delay=0)
 
     def _update_battery(self):
         """Update battery indicator (right-aligned via view component)"""
@@ -515,66 +605,83 @@ class Agent(Client, Automata, AsyncAdvertiser):
             self._view.set('gps', '')
 
     def _fetch_stats(self):
-        while True:
-            try:
-                s = self.session()
-            except Exception as err:
-                logging.debug("[agent:_fetch_stats] self.session: %s" % repr(err))
-                time.sleep(5)
-                continue
-
-            try:
-                self._update_uptime(s)
-            except Exception as err:
-                logging.debug("[agent:_fetch_stats] self.update_uptimes: %s" % repr(err))
+        try:
+            s = self.session()
+        except Exception as err:
+            logging.debug("[agent:_fetch_stats] self.session: %s" % repr(err))
+            return
 
-            try:
-                self._update_peers()
-            except Exception as err:
-                logging.debug("[agent:_fetch_stats] self.update_peers: %s" % repr(err))
-            try:
-                self._update_counters()
-            except Exception as err:
-                logging.debug("[agent:_fetch_stats] self.update_counters: %s" % repr(err))
-            try:
-                # Directly scan for handshake files (simpler and more reliable)
-                new_shakes = self._check_handshakes_direct()
-                self._update_handshakes(new_shakes)
-            except Exception as err:
-                logging.debug("[agent:_fetch_stats] self.update_handshakes: %s" % repr(err))
-            try:
-                self._update_battery()
-            except Exception as err:
-                logging.debug("[agent:_fetch_stats] self.update_battery: %s" % repr(err))
-            try:
-                self._update_gps()
-            except Exception as err:
-                logging.debug("[agent:_fetch_stats] self.update_gps: %s" % repr(err))
+        try:
+            self._update_uptime(s)
+        except Exception as err:
+            logging.debug("[agent:_fetch_stats] self.update_uptimes: %s" % repr(err))
 
-            time.sleep(5)
+        try:
+            self._update_peers()
+        except Exception as err:
+            logging.debug("[agent:_fetch_stats] self.update_peers: %s" % repr(err))
+        try:
+            self._update_counters()
+        except Exception as err:
+            logging.debug("[agent:_fetch_stats] self.update_counters: %s" % repr(err))
+        try:
+            # New files are counted as they arrive (_on_new_handshake_file)
+            self._update_handshakes()
+        except Exception as err:
+            logging.debug("[agent:_fetch_stats] self.update_handshakes: %s" % repr(err))
+        try:
+            self._update_battery()
+        except Exception as err:
+            logging.debug("[agent:_fetch_stats] self.update_battery: %s" % repr(err))
+        try:
+            self._update_gps()
+        except Exception as err:
+            logging.debug("[agent:_fetch_stats] self.update_gps: %s" % repr(err))
 
     async def _on_event(self, msg):
-        found_handshake = False
         try:
             jmsg = json.loads(msg)
         except:
             return
+        # Plugins, session reads and file writes would stall the runtime's
+        # loop (display, timers), so events are handled on its pool, in order
+        await get_runtime().run_blocking(self._handle_event, jmsg)
 
+    def _handle_event(self, jmsg):
+        """One bettercap-style event (runtime pool thread)"""
         # give plugins access to the events
         try:
             plugins.on('bcap_%s' % re.sub(r"[^a-z0-9_]+", "_", jmsg.get('tag', '').lower()), self, jmsg)
         except Exception as err:
             logging.error("Processing event: %s" % err)
 
-        if jmsg.get('tag') == 'wifi.client.handshake':
+        if jmsg.get('tag') in ('wifi.ap.new', 'wifi.ap.changed'):
+            # Only deltas reach the AP logger and the scheduler, no need to
+            # rescan the whole list
+            whitelist, blacklist = self._target_lists()
+            ap = jmsg['data']
+            if self._is_target(ap, whitelist, blacklist):
+                if self._ap_logger.enabled:
+                    self._ap_logger.log_new_ap(ap)
+                # APs showing up mid-epoch are attacked this epoch
+                if self._schedulable(ap):
+                    ap['clients'] = self.ap_clients(ap['mac'])
+                    self._scheduler.offer(ap, self._deauth_clients(ap))
+
+        elif jmsg.get('tag') == 'wifi.ap.lost':
+            # Out of range for ap.ttl, it starts over if it comes back
+            self._scheduler.forget(jmsg['data'])
+
+        elif jmsg.get('tag') == 'wifi.client.handshake':
             filename = jmsg['data']['file']
             sta_mac = jmsg['data']['station']
             ap_mac = jmsg['data']['ap']
             # PineAP backend extracts ESSID from .22000 file and provides it as ap_name
             ap_name_from_file = jmsg['data'].get('ap_name', '')
             key = "%s -> %s" % (sta_mac, ap_mac)
-            if key not in self._handshakes:
-                self._handshakes[key] = jmsg
+            # Captured: nothing left to attack (_schedulable() keeps it out)
+            self._scheduler.forget({'mac': ap_mac})
+            if self._handshakes.record(ap_mac, sta_mac, jmsg):
                 s = self.session()
                 ap_and_station = self._find_ap_sta_in(sta_mac, ap_mac, s)
                 if ap_and_station is None:
@@ -597,27 +704,28 @@ class Agent(Client, Automata, AsyncAdvertiser):
                         ap.get('channel', 0), ap.get('rssi', 0), sta['mac'], sta.get('vendor', ''),
                         self._last_pwnd, ap['mac'], ap.get('vendor', ''))
                     plugins.on('handshake', self, filename, ap, sta)
-                found_handshake = True
                 # Save GPS coordinates if available
                 if self._gps.available:
                     self._gps.save_coordinates(filename)
-            self._update_handshakes(1 if found_handshake else 0)
+            # Counted by _on_new_handshake_file already, just refresh the name
+            self._update_handshakes()
 
-    def _event_poller(self, loop):
-        self._load_recovery_data()
-        self.run('events.clear')
+    async def _event_poller(self):
+        runtime = get_runtime()
+        await runtime.run_blocking(self._load_recovery_data)
+        await runtime.run_blocking(self.run, 'events.clear')
 
         while True:
             logging.debug("[agent:_event_poller] polling events ...")
             try:
-                loop.create_task(self.start_websocket(self._on_event))
-                loop.run_forever()
-                logging.debug("[agent:_event_poller] loop loop loop")
+                await self.start_websocket(self._on_event)
             except Exception as ex:
                 logging.debug("[agent:_event_poller] Error while polling via websocket (%s)", ex)
+                await asyncio.sleep(1.0)
 
     def start_event_polling(self):
-        threading.Thread(target=self._event_poller, args=(asyncio.new_event_loop(),), name="Event Polling", daemon=True).start()
+        # Runs on the shared runtime's loop, woken by events only
+        get_runtime().spawn(self._event_poller())
 
     def is_module_running(self, module):
         s = self.session()
@@ -633,13 +741,17 @@ class Agent(Client, Automata, AsyncAdvertiser):
         self.run('%s off; %s on' % (module, module))
 
     def _has_handshake(self, bssid):
-        for key in self._handshakes:
-            if bssid.lower() in key:
-                return True
-        return False
+        return self._handshakes.has_ap(bssid)
+
+    def _should_interact(self, who, ap=None):
+        # who is the AP itself or one of its stations; either way a handshake
+        # for the AP already has what we're after
+        if self._has_handshake(ap['mac'] if ap is not None else who):
+            return False
 
-    def _should_interact(self, who):
-        if self._has_handshake(who):
+        # Captured in a previous session (loot directory, [targeting] recapture)
+        elif ap is not None and self.captured_before(ap):
+            logging.debug("skipping %s (%s), captured before", ap.get('hostname', ''), ap['mac'])
             return False
 
         elif who not in self._history:
@@ -673,29 +785,46 @@ class Agent(Client, Automata, AsyncAdvertiser):
             obfuscated['mac'] = obfuscate_mac(obfuscated['mac'])
         return obfuscated
 
+    def _on_attacks_done(self):
+        """Dispatcher drained (worker thread)"""
+        self._view.on_normal()
+
+    def _assoc_done(self, ap, error, elapsed):
+        """wifi.assoc completed (worker thread)"""
+        if error is not None:
+            self._on_error(ap['mac'], error)
+        else:
+            self._epoch.track(assoc=True)
+            self._throttle.sent(ASSOC, mac_to_int(ap['mac']), elapsed)
+        plugins.on('association', self, ap)
+
+    def _deauth_done(self, ap, sta, who, error, elapsed):
+        """wifi.deauth completed (worker thread)"""
+        if error is not None:
+            self._on_error(who, error)
+        else:
+            self._epoch.track(deauth=True)
+            self._throttle.sent(DEAUTH, mac_to_int(ap['mac']), elapsed)
+        plugins.on('deauthentication', self, ap, sta)
+
     def associate(self, ap, throttle=-1):
         if self.is_stale():
             logging.debug("recon is stale, skipping assoc(%s)", ap['mac'])
             return
-        if throttle == -1 and "throttle_a" in self._config['personality']:
-            throttle = self._config['personality']['throttle_a']
-
-        if self._config['personality']['associate'] and self._should_interact(ap['mac']):
-            self._view.on_assoc(self._obfuscate_ap(ap))
+        if throttle == -1:
+            throttle = self._throttle.value(ASSOC)
 
-            try:
-                logging.info("sending association frame to %s (%s %s) on channel %d [%d clients], %d dBm...",
-                             ap.get('hostname', ''), ap['mac'], ap.get('vendor', ''), ap.get('channel', 0),
-                             len(ap.get('clients', [])), ap.get('rssi', 0))
-                self.run('wifi.assoc %s' % ap['mac'])
-                self._epoch.track(assoc=True)
-            except Exception as e:
-                self._on_error(ap['mac'], e)
+        if self._dispatcher.cooling_down(ap['mac']):
+            return
 
-            plugins.on('association', self, ap)
-            if throttle > 0:
-                self._sleep_with_exit_check(throttle)
-            self._view.on_normal()
+        if self._config['personality']['associate'] and self._should_interact(ap['mac'], ap):
+            logging.info("sending association frame to %s (%s %s) on channel %d [%d clients], %d dBm...",
+                         ap.get('hostname', ''), ap['mac'], ap.get('vendor', ''), ap.get('channel', 0),
+                         len(ap.get('clients', [])), ap.get('rssi', 0))
+            if self._dispatcher.submit('wifi.assoc %s' % ap['mac'], ap['mac'], max(throttle, 0),
+                                       lambda error, elapsed: self._assoc_done(ap, error, elapsed),
+                                       FRAMES[ASSOC]):
+                self._view.on_assoc(self._obfuscate_ap(ap))
 
     def deauth(self, ap, sta, throttle=-1):
         if self.is_stale():
@@ -703,81 +832,147 @@ class Agent(Client, Automata, AsyncAdvertiser):
             return
 
         if throttle == -1:
-            throttle = self._config['personality'].get('throttle_d', 0.9)
+            throttle = self._throttle.value(DEAUTH)
 
-        logging.debug("deauth throttle=%s", throttle)
+        logging.debug("deauth cooldown=%s", throttle)
 
-        if self._config['personality']['deauth'] and self._should_interact(sta['mac']):
-            self._view.on_deauth(self._obfuscate_sta(sta))
+        if not deauth_useful(ap, self._config.get('targeting')):
+            logging.debug("skipping deauth on %s, clients ignore it (PMF required)", ap['mac'])
+            return
 
-            try:
-                logging.info("deauthing %s (%s) from %s (%s %s) on channel %d, %d dBm ...",
-                             sta['mac'], sta.get('vendor', ''), ap.get('hostname', ''), ap['mac'],
-                             ap.get('vendor', ''), ap.get('channel', 0), ap.get('rssi', 0))
-                self.run('wifi.deauth %s %s' % (ap['mac'], sta['mac']))
-                self._epoch.track(deauth=True)
-            except Exception as e:
-                self._on_error(sta['mac'], e)
+        reason = client_skip_reason(sta, self._config.get('targeting'))
+        if reason:
+            logging.debug("skipping deauth of %s (%s)", sta['mac'], reason)
+            return
 
-            plugins.on('deauthentication', self, ap, sta)
-            if throttle > 0:
-                self._sleep_with_exit_check(throttle)
-            self._view.on_normal()
+        if self._dispatcher.cooling_down(sta['mac']):
+            return
+
+        if self._config['personality']['deauth'] and self._should_interact(sta['mac'], ap):
+            logging.info("deauthing %s (%s) from %s (%s %s) on channel %d, %d dBm ...",
+                         sta['mac'], sta.get('vendor', ''), ap.get('hostname', ''), ap['mac'],
+                         ap.get('vendor', ''), ap.get('channel', 0), ap.get('rssi', 0))
+            if self._dispatcher.submit('wifi.deauth %s %s' % (ap['mac'], sta['mac']), sta['mac'],
+                                       max(throttle, 0),
+                                       lambda error, elapsed: self._deauth_done(ap, sta, sta['mac'], error, elapsed),
+                                       FRAMES[DEAUTH]):
+                self._view.on_deauth(self._obfuscate_sta(sta))
+
+    def deauth_targets(self, ap):
+        """The AP's clients worth deauthing, most likely to reconnect first"""
+        return rank_clients(ap.get('clients', []), self._config.get('targeting'))
 
     def broadcast_deauth(self, ap, throttle=-1):
         """Broadcast deauth to kick all clients from AP (PineAP adaptation - no client data available)"""
         if self.is_stale():
             return
 
-        if throttle == -1 and "throttle_d" in self._config['personality']:
-            throttle = self._config['personality']['throttle_d']
+        if throttle == -1:
+            throttle = self._throttle.value(DEAUTH)
+
+        if not deauth_useful(ap, self._config.get('targeting')):
+            logging.debug("skipping broadcast deauth on %s, clients ignore it (PMF required)", ap['mac'])
+            return
+
+        target = (ap['mac'], 'broadcast')
+        if self._dispatcher.cooling_down(target):
+            return
 
-        if self._config['personality']['deauth'] and self._should_interact(ap['mac']):
+        if self._config['personality']['deauth'] and self._should_interact(ap['mac'], ap):
             # Use AP name for display instead of broadcast address
             ap_name = ap.get('hostname') or ap.get('mac', 'unknown')
             fake_sta = {'mac': ap_name, 'vendor': 'broadcast'}
-            self._view.on_deauth(self._obfuscate_sta(fake_sta))
-
-            try:
-                logging.info("broadcast deauth %s (%s) on channel %d",
-                             ap.get('hostname', ''), ap['mac'], ap.get('channel', 0))
-                self.run('wifi.deauth %s %s' % (ap['mac'], 'FF:FF:FF:FF:FF:FF'))
-                self._epoch.track(deauth=True)
-            except Exception as e:
-                self._on_error(ap['mac'], e)
-
-            plugins.on('deauthentication', self, ap, fake_sta)
-            if throttle > 0:
-                self._sleep_with_exit_check(throttle)
-            self._view.on_normal()
+            logging.info("broadcast deauth %s (%s) on channel %d",
+                         ap.get('hostname', ''), ap['mac'], ap.get('channel', 0))
+            if self._dispatcher.submit('wifi.deauth %s %s' % (ap['mac'], 'FF:FF:FF:FF:FF:FF'), target,
+                                       max(throttle or 0, 0),
+                                       lambda error, elapsed: self._deauth_done(ap, fake_sta, ap['mac'],
+                                                                                error, elapsed),
+                                       FRAMES[DEAUTH]):
+                self._view.on_deauth(self._obfuscate_sta(fake_sta))
+
+    def next_epoch(self):
+        plan, self._hop_plan = self._hop_plan, None
+        if plan is not None and len(plan):
+            plan.mark(None)
+            logging.info("[HopPlan] %s", plan.summary())
+            for channel, predicted, actual in plan.report():
+                logging.debug("[HopPlan] channel %d: predicted %.1fs, actual %s", channel, predicted,
+                              '%.1fs' % actual if actual is not None else '-')
+        # Attacks without a capture in time count against the throttles,
+        # which are kept per environment (the APs around)
+        self._throttle.settle()
+        self._throttle.select_environment(ap['mac'] for ap in self._access_points)
+        logging.debug("[Throttle] assoc=%.2fs deauth=%.2fs, dispatcher %s", self._throttle.value(ASSOC),
+                      self._throttle.value(DEAUTH), self._dispatcher.stats())
+        Automata.next_epoch(self)
+        self._throttle.save()
+        if self._dwell is not None:
+            self._dwell.save()
+
+    def _end_visit(self, dwell):
+        """Leaving the current channel after waiting dwell seconds on it"""
+        visit, self._visit = self._visit, None
+        if visit is None or not dwell:
+            return
+        channel, started, shakes_before = visit
+        shakes = self._session_handshakes - shakes_before
+        seconds = time.time() - started
+        record = {
+            'channel': channel, 'dwell': dwell, 'shakes': shakes, 'seconds': round(seconds, 1),
+            'deauth': self._epoch.did_deauth,
+            'fixed': fixed_dwell(self._config, self._epoch.did_deauth),
+            'policy': 'bandit' if self._dwell is not None else 'fixed',
+        }
+        if self._dwell is not None:
+            self._dwell.update(channel, dwell, shakes, seconds, record)
+        else:
+            self._dwell_history.append(record)
 
     def set_channel(self, channel, verbose=True):
         if self.is_stale():
             logging.debug("recon is stale, skipping set_channel(%d)", channel)
             return
 
+        # Commands queued for this channel go out before we leave it
+        self._dispatcher.drain()
+
         # if in the previous loop no client stations has been deauthenticated
         # and only association frames have been sent, we don't need to wait
         # very long before switching channel as we don't have to wait for
         # such client stations to reconnect in order to sniff the handshake.
+        # How long is learned per channel by the dwell bandit when enabled.
         wait = 0
-        if self._epoch.did_deauth:
-            wait = self._config['personality']['hop_recon_time']
-        elif self._epoch.did_associate:
-            wait = self._config['personality']['min_recon_time']
+        if self._epoch.did_deauth or self._epoch.did_associate:
+            if self._dwell is not None and self._current_channel != 0:
+                wait = self._dwell.choose(self._current_channel)
+            else:
+                wait = fixed_dwell(self._config, self._epoch.did_deauth)
 
         if channel != self._current_channel:
             if self._current_channel != 0 and wait > 0:
+                # The channel lock has to last the wait too
+                self.run('wifi.recon.channel %d %.1f' % (self._current_channel, wait + 1))
                 if verbose:
                     logging.info("waiting for %ds on channel %d ...", wait, self._current_channel)
                 else:
                     logging.debug("waiting for %ds on channel %d ...", wait, self._current_channel)
                 self.wait_for(wait)
+            self._end_visit(wait if self._current_channel != 0 else 0)
+            if self._hop_plan is not None:
+                self._hop_plan.mark(channel)
             if verbose and self._epoch.any_activity:
                 logging.info("CHANNEL %d", channel)
             try:
-                self.run('wifi.recon.channel %d' % channel)
+                # Locked for as long as the hop plan expects to spend there
+                # (renewed by attacks and the wait above)
+                planned = self._hop_plan.predicted.get(channel) if self._hop_plan is not None else None
+                if planned:
+                    self.run('wifi.recon.channel %d %.1f' % (channel, planned))
+                else:
+                    self.run('wifi.recon.channel %d' % channel)
                 self._current_channel = channel
+                self._visit = (channel, time.time(), self._session_handshakes)
                 self._epoch.track(hop=True)
                 self._view.set('channel', '%d(%s)' % (channel, channel_to_band(channel)))
 
@@ -789,6 +984,8 @@ class Agent(Client, Automata, AsyncAdvertiser):
     def stop(self):
         """Stop the agent and cleanup resources"""
         logging.info("Stopping agent...")
+        self._dispatcher.drain(timeout=2.0)
+        self._dispatcher.stop()
         # Stop AP logger
         if self._ap_logger:
             self._ap_logger.stop()
@@ -0,0 +1,228 @@
+"""
+Channel dwell allocator - Thompson sampling over per-channel dwell times
+Replaces the fixed hop_recon_time / min_recon_time wait before leaving a
+channel. Every (channel, dwell) arm keeps a Gamma posterior over the
+handshake rate it earns per second of channel time (Poisson counts, so the
+update is just two additions); before hopping, one rate is sampled per
+dwell option and the best one is used. Old evidence decays, so the choice
+follows the pager around. A few float operations per hop, no numpy.
+
+Each visit is appended to data/dwell_history.jsonl (with the dwell the
+fixed policy would have used), whichever policy is running, which the
+offline evaluation replays:
+
+    python -m pwnagotchi_port.ai.dwell --evaluate [history.jsonl]
+"""
+
+import os
+import sys
+import json
+import random
+import logging
+import threading
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PAYLOAD_DIR = os.path.abspath(os.path.join(_THIS_DIR, '..', '..'))
+DATA_DIR = os.path.join(PAYLOAD_DIR, 'data')
+STATE_FILE = os.path.join(DATA_DIR, 'dwell.json')
+HISTORY_FILE = os.path.join(DATA_DIR, 'dwell_history.jsonl')
+
+
+def dwell_options(config):
+    """Dwell times (seconds, floats) to choose from, around the configured ones"""
+    personality = config['personality']
+    low = float(personality.get('min_recon_time', 5))
+    high = float(personality.get('hop_recon_time', 10))
+    return sorted({max(1.0, low // 2), low, high, high * 2})
+
+
+def fixed_dwell(config, did_deauth):
+    """The original policy: hop_recon_time after deauths, else min_recon_time"""
+    personality = config['personality']
+    return personality['hop_recon_time'] if did_deauth else personality['min_recon_time']
+
+
+class VisitHistory:
+    """Visit records appended to a JSON lines file, trimmed to the newer
+    half once it reaches MAX_HISTORY lines"""
+
+    MAX_HISTORY = 5000
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self._lines = None
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        with self._lock:
+            try:
+                if self._lines is None:
+                    self._lines = 0
+                    if os.path.exists(self.path):
+                        with open(self.path) as fp:
+                            self._lines = sum(1 for _ in fp)
+                if self._lines >= self.MAX_HISTORY:
+                    # Keep the newer half
+                    with open(self.path) as fp:
+                        lines = fp.readlines()[-self.MAX_HISTORY // 2:]
+                    with open(self.path, 'w') as fp:
+                        fp.writelines(lines)
+                    self._lines = len(lines)
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'a') as fp:
+                    fp.write(json.dumps(record, separators=(',', ':')) + '\n')
+                self._lines += 1
+            except Exception as e:
+                logging.debug(f"[Dwell] Failed to record visit: {e}")
+
+
+class DwellBandit:
+    """
+    Gamma-Poisson Thompson sampling, one arm per (channel, dwell seconds).
+
+    An arm's posterior is Gamma(PRIOR_SHAKES + handshakes,
+    PRIOR_SECONDS + seconds); DECAY pulls it back toward the prior on every
+    update of that channel.
+    """
+
+    PRIOR_SHAKES = 1.0
+    PRIOR_SECONDS = 60.0
+    DECAY = 0.98
+
+    def __init__(self, options=(2, 5, 10, 20), path=STATE_FILE, history=HISTORY_FILE, rng=None):
+        # Floats throughout, so arms match whatever type the config gave
+        self.options = tuple(sorted({float(o) for o in options}))
+        self.path = path
+        self.history = VisitHistory(history) if history else None
+        self._rng = rng or random.Random()
+        self._arms = {}  # channel -> {dwell: [shakes, seconds]}
+        self._lock = threading.Lock()
+
+    def choose(self, channel):
+        """Dwell (seconds) to spend on channel before hopping"""
+        with self._lock:
+            arms = self._arms.get(channel, {})
+            best, best_rate = self.options[0], -1.0
+            for dwell in self.options:
+                shakes, seconds = arms.get(dwell, (0.0, 0.0))
+                # random.gammavariate takes shape and scale (1 / rate)
+                rate = self._rng.gammavariate(self.PRIOR_SHAKES + shakes,
+                                              1.0 / (self.PRIOR_SECONDS + seconds))
+                if rate > best_rate:
+                    best, best_rate = dwell, rate
+            return best
+
+    def update(self, channel, dwell, shakes, seconds, record=None):
+        """A visit to channel that waited dwell seconds got shakes handshakes
+        in seconds of channel time; record (dict) also goes to the history"""
+        dwell = float(dwell)
+        with self._lock:
+            arms = self._arms.setdefault(channel, {})
+            for arm in arms.values():
+                arm[0] *= self.DECAY
+                arm[1] *= self.DECAY
+            arm = arms.setdefault(dwell, [0.0, 0.0])
+            arm[0] += shakes
+            arm[1] += seconds
+        if record is not None and self.history is not None:
+            self.history.append(record)
+
+    def expected(self, channel):
+        """Posterior mean handshakes/hour per dwell option on channel"""
+        with self._lock:
+            arms = self._arms.get(channel, {})
+            return {dwell: 3600.0 * (self.PRIOR_SHAKES + arms.get(dwell, (0, 0))[0]) /
+                    (self.PRIOR_SECONDS + arms.get(dwell, (0, 0))[1]) for dwell in self.options}
+
+    def load(self):
+        """Read saved posteriors (arms for dwell times no longer offered are dropped)"""
+        try:
+            with open(self.path, 'rt') as fp:
+                data = json.load(fp)
+            arms = {}
+            for channel, per_dwell in data.get('channels', {}).items():
+                arms[int(channel)] = {float(d): [float(v[0]), float(v[1])]
+                                      for d, v in per_dwell.items() if float(d) in self.options}
+            self._arms = arms
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError, IndexError) as e:
+            logging.warning(f"[Dwell] Ignoring unreadable {self.path}: {e}")
+            self._arms = {}
+
+    def save(self):
+        with self._lock:
+            data = {'channels': {str(ch): {str(d): [round(v[0], 4), round(v[1], 2)] for d, v in arms.items()}
+                                 for ch, arms in self._arms.items()}}
+        tmp = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, 'w') as fp:
+                json.dump(data, fp, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logging.error(f"[Dwell] Failed to save {self.path}: {e}")
+
+
+def read_history(path=HISTORY_FILE):
+    visits = []
+    with open(path) as fp:
+        for line in fp:
+            try:
+                visits.append(json.loads(line))
+            except ValueError:
+                continue
+    return visits
+
+
+def evaluate(visits, policy):
+    """Replay recorded visits against a policy
+
+    policy(visit) returns the dwell it would have used, or a DwellBandit.
+    Only visits where the recorded dwell matches the policy's choice count
+    (the standard replay estimator, unbiased when the recorded dwells were
+    explored evenly); a bandit learns from the visits it gets. Returns
+    (matched visits, handshakes, seconds).
+    """
+    matched, shakes, seconds = 0, 0.0, 0.0
+    for visit in visits:
+        if isinstance(policy, DwellBandit):
+            choice = policy.choose(visit['channel'])
+        else:
+            choice = policy(visit)
+        if choice != visit['dwell']:
+            continue
+        matched += 1
+        shakes += visit['shakes']
+        seconds += visit['seconds']
+        if isinstance(policy, DwellBandit):
+            policy.update(visit['channel'], visit['dwell'], visit['shakes'], visit['seconds'])
+    return matched, shakes, seconds
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] != '--evaluate':
+        print(__doc__.strip())
+        return 2
+    path = argv[1] if len(argv) > 1 else HISTORY_FILE
+    visits = read_history(path)
+    options = sorted({float(v['dwell']) for v in visits}) or [5.0, 10.0]
+
+    def report(name, result):
+        matched, shakes, seconds = result
+        rate = 3600.0 * shakes / seconds if seconds else 0.0
+        print('%-8s %5d/%d visits  %6.1f handshakes  %8.1f handshakes/hour' % (
+            name, matched, len(visits), shakes, rate))
+
+    print('%d recorded visits, dwell options %s' % (len(visits), options))
+    report('fixed', evaluate(visits, lambda v: v['fixed']))
+    # Average a few runs, Thompson sampling is random
+    runs = [evaluate(visits, DwellBandit(options, path=None, history=None, rng=random.Random(seed)))
+            for seed in range(5)]
+    report('bandit', tuple(sum(r[i] for r in runs) / len(runs) for i in range(3)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
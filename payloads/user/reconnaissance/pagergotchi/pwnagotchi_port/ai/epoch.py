@@ -69,6 +69,8 @@ class Epoch(object):
         self._epoch_data = {}
         self._epoch_data_ready = threading.Event()
         self._reward = RewardFunction()
+        # attack throttle, shown in the epoch log line when set
+        self.throttle = None
 
     def wait_for_epoch_data(self, with_observation=True, timeout=None):
         self._epoch_data_ready.wait(timeout)
@@ -217,7 +219,7 @@ class Epoch(object):
                          self.num_shakes,
                          cpu * 100,
                          mem * 100,
-                         temp))
+                         temp) + (" " + self.throttle.summary() if self.throttle is not None else ""))
 
         self.epoch += 1
         self.epoch_started = now
@@ -114,7 +114,11 @@ class APLogger:
             logging.error(f"[APLogger] Failed to init WiGLE file: {e}")
 
     def log_aps(self, aps):
-        """Log access points"""
+        """Log access points (full list, called once per epoch)
+
+        Only WiGLE logging needs the full list since its rows are keyed by
+        location; normal logging is fed new APs through log_new_ap().
+        """
         if not self._enabled:
             return
 
@@ -125,8 +129,12 @@ class APLogger:
 
         if self._wigle_enabled:
             self._log_wigle(aps)
-        else:
-            self._log_normal(aps)
+
+    def log_new_ap(self, ap):
+        """Log a single newly discovered (or changed) access point"""
+        if not self._enabled or self._wigle_enabled:
+            return
+        self._log_normal([ap])
 
     def _log_wigle(self, aps):
         """Log APs in WiGLE CSV format"""
@@ -0,0 +1,294 @@
+"""
+Incremental access point table for the PineAP backend
+Keeps one record per BSSID across recon polls (first/last seen, RSSI history)
+and reports what changed as bettercap-style wifi.ap.new / wifi.ap.changed /
+wifi.ap.lost events instead of swapping in a fresh dict every poll.
+
+Readers that run per frame or per UI refresh don't look at the table itself:
+after each poll the writer publishes an immutable APSnapshot, which can be
+read from any thread without taking the backend lock. The snapshot holds one
+small tuple per AP, shared between snapshots while the AP doesn't change;
+bettercap-style dicts are only built when a reader asks for one.
+"""
+
+import math
+import time
+from collections.abc import Mapping
+
+from pwnagotchi_port.records import APRecord, mac_to_int, format_mac
+from pwnagotchi_port.wifi_security import SECURITY_FIELDS
+
+# Fields whose change is reported as wifi.ap.changed
+TRACKED_FIELDS = ('hostname', 'channel', 'encryption', 'cipher', 'authentication', 'pmf')
+
+# What a snapshot keeps per AP, in APRecord.view() order after 'mac'
+STATE_FIELDS = ('hostname', 'vendor', 'channel', 'rssi', 'encryption', 'cipher',
+                'authentication', 'pmf', 'first_seen', 'last_seen')
+_LAST_SEEN = STATE_FIELDS.index('last_seen')
+
+
+class APViews(Mapping):
+    """Read-only {mac: view dict} over a snapshot's AP states, building each
+    dict when it's looked up (callers get a fresh dict every time)"""
+
+    __slots__ = ('_states',)
+
+    def __init__(self, states):
+        self._states = states
+
+    def __getitem__(self, mac):
+        state = self._states[mac]
+        data = {'mac': format_mac(mac)}
+        data.update(zip(STATE_FIELDS, state))
+        return data
+
+    def __contains__(self, mac):
+        return mac in self._states
+
+    def __iter__(self):
+        return iter(self._states)
+
+    def __len__(self):
+        return len(self._states)
+
+    def field(self, mac, name):
+        """One field of an AP without building its view"""
+        return self._states[mac][STATE_FIELDS.index(name)]
+
+
+class APSnapshot:
+    """
+    Read-only copy of the AP table as of one publish().
+
+    records maps every AP MAC (int) to its bettercap-style view dict (built
+    on lookup, see APViews) and in_range holds the MACs not held out by
+    min_rssi, in table order. last_seen is rounded up to SEEN_STEP seconds.
+    Never modified once published; generation increases with every publish,
+    so readers can cache anything derived from it.
+    """
+
+    __slots__ = ('generation', 'states', 'records', 'in_range', 'lost_after')
+
+    def __init__(self, generation=0, states=None, in_range=(), lost_after=0):
+        self.generation = generation
+        self.states = states if states is not None else {}
+        self.records = APViews(self.states)
+        self.in_range = in_range
+        self.lost_after = lost_after
+
+    def __len__(self):
+        return len(self.states)
+
+    def __contains__(self, mac):
+        return mac in self.states
+
+    def visible(self, now=None):
+        """(mac, view) pairs in range and seen within lost_after seconds"""
+        if now is None:
+            now = time.time()
+        states, records = self.states, self.records
+        if not self.lost_after:
+            return [(mac, records[mac]) for mac in self.in_range]
+        deadline = now - self.lost_after
+        return [(mac, records[mac]) for mac in self.in_range
+                if states[mac][_LAST_SEEN] >= deadline]
+
+
+class APTable:
+    """
+    APRecords keyed by integer MAC, updated in place.
+
+    merge() folds in a recon poll (page by page if needed) and expire()
+    drops APs missing from polls for longer than lost_after seconds. Deltas
+    are put on event_queue (if given) in the same {'tag': ..., 'data': ...}
+    shape as handshake events.
+
+    APs weaker than min_rssi stay in the table but are out of range (see
+    in_range) until they come back above min_rssi + rssi_hysteresis, so one
+    marginal AP doesn't flap in and out of the target list every poll.
+
+    All of the above happens under the caller's lock; publish() then makes
+    the result visible to lock-free readers as the new snapshot.
+    """
+
+    # RSSI swing (dB) that counts as a change worth reporting
+    RSSI_CHANGE_DB = 10
+    # Snapshots round last_seen up to this many seconds, so an AP that is
+    # merely seen again doesn't make every poll publish
+    SEEN_STEP = 10
+
+    def __init__(self, event_queue=None, lost_after=120, min_rssi=None, rssi_hysteresis=5):
+        self.records = {}
+        self.lost_after = lost_after
+        self.min_rssi = min_rssi
+        self.rssi_hysteresis = rssi_hysteresis
+        self._out_of_range = set()  # MACs held below min_rssi
+        self._queue = event_queue
+        self._states = {}  # mac -> STATE_FIELDS tuple, as of the last merge
+        self.snapshot = APSnapshot(lost_after=lost_after)
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, mac):
+        return mac in self.records
+
+    def get(self, mac, default=None):
+        return self.records.get(mac, default)
+
+    def clear(self):
+        """Forget all APs (in place, so references to records stay valid)"""
+        self.records.clear()
+        self._states.clear()
+        self._out_of_range.clear()
+        self._dirty = True
+
+    def set_min_rssi(self, min_rssi):
+        """Change the RSSI floor (None = off) and re-check every AP against it"""
+        self.min_rssi = min_rssi
+        self._out_of_range.clear()
+        if min_rssi is not None:
+            self._out_of_range.update(mac for mac, rec in self.records.items()
+                                      if rec.rssi < min_rssi)
+        self._dirty = True
+
+    def set_lost_after(self, lost_after):
+        self.lost_after = lost_after
+        self._dirty = True
+
+    def in_range(self, mac):
+        """False while an AP is held out by the min_rssi threshold"""
+        return mac not in self._out_of_range
+
+    def publish(self):
+        """Replace the snapshot if anything changed since the last publish"""
+        if not self._dirty:
+            return self.snapshot
+        # Only the dict is copied, unchanged APs share their state tuple
+        states = dict(self._states)
+        out = self._out_of_range
+        in_range = tuple(mac for mac in states if mac not in out)
+        # A single attribute store, so readers see either snapshot whole
+        self.snapshot = APSnapshot(self.snapshot.generation + 1, states, in_range, self.lost_after)
+        self._dirty = False
+        return self.snapshot
+
+    def update(self, aps, now=None):
+        """Merge one complete poll and expire APs that stopped showing up
+
+        Returns (new, changed, lost) lists of MACs.
+        """
+        if now is None:
+            now = time.time()
+        new, changed = self.merge(aps, now)
+        lost = self.expire(now)
+        self.publish()
+        return new, changed, lost
+
+    def merge(self, aps, now=None):
+        """Merge polled APs (iterable of dicts with mac/hostname/channel/rssi and
+        the wifi_security fields)
+
+        Can be called once per page of a poll. An AP may carry its own
+        'last_seen' (e.g. from the recon database), otherwise now is used.
+        Returns (new, changed) lists of MACs.
+        """
+        if now is None:
+            now = time.time()
+        new, changed = [], []
+
+        for ap in aps:
+            key = mac_to_int(ap['mac'])
+            if key is None:
+                continue
+            seen = ap.get('last_seen', now)
+            rec = self.records.get(key)
+            if rec is None:
+                rec = APRecord(key, ap.get('hostname', ''), ap.get('channel', 0),
+                               ap.get('rssi', -100), ap.get('encryption', ''), seen)
+                rec.cipher = ap.get('cipher', '')
+                rec.authentication = ap.get('authentication', '')
+                rec.pmf = ap.get('pmf', '')
+                self.records[key] = rec
+                self._check_rssi(rec)
+                self._update_state(rec)
+                new.append(key)
+                self._emit('wifi.ap.new', rec)
+                continue
+
+            # A poll without an SSID or channel doesn't wipe the known one.
+            # Security fields are taken as reported (pmf and authentication
+            # can go back to ''), unless the source didn't know them at all
+            known = ap.get('security_known', True)
+            fields = []
+            for f in TRACKED_FIELDS:
+                if f in SECURITY_FIELDS:
+                    reported = known and f in ap
+                else:
+                    reported = bool(ap.get(f))
+                if reported and ap[f] != getattr(rec, f):
+                    fields.append(f)
+            for f in fields:
+                setattr(rec, f, ap[f])
+
+            rssi = ap.get('rssi', rec.rssi)
+            if abs(rssi - rec.rssi) >= self.RSSI_CHANGE_DB:
+                fields.append('rssi')
+            rec.add_rssi(rssi)
+            self._check_rssi(rec)
+            rec.last_seen = max(rec.last_seen, seen)
+            self._update_state(rec)
+
+            if fields:
+                changed.append(key)
+                self._emit('wifi.ap.changed', rec, fields)
+
+        return new, changed
+
+    def expire(self, now=None):
+        """Drop APs not seen for lost_after seconds, returns their MACs"""
+        if now is None:
+            now = time.time()
+        lost = []
+        if self.lost_after:
+            for key, rec in list(self.records.items()):
+                if now - rec.last_seen > self.lost_after:
+                    del self.records[key]
+                    self._states.pop(key, None)
+                    self._out_of_range.discard(key)
+                    lost.append(key)
+                    self._emit('wifi.ap.lost', rec)
+        if lost:
+            self._dirty = True
+        return lost
+
+    def _check_rssi(self, rec):
+        """Drop below min_rssi, come back only above min_rssi + rssi_hysteresis"""
+        if self.min_rssi is None:
+            return
+        if rec.mac in self._out_of_range:
+            if rec.rssi >= self.min_rssi + self.rssi_hysteresis:
+                self._out_of_range.discard(rec.mac)
+                self._dirty = True
+        elif rec.rssi < self.min_rssi:
+            self._out_of_range.add(rec.mac)
+            self._dirty = True
+
+    def _update_state(self, rec):
+        """Refresh rec's snapshot state, marking the table dirty if it changed"""
+        step = self.SEEN_STEP
+        state = (rec.hostname, rec.vendor, rec.channel, rec.rssi, rec.encryption, rec.cipher,
+                 rec.authentication, rec.pmf, rec.first_seen,
+                 math.ceil(rec.last_seen / step) * step if step else rec.last_seen)
+        if self._states.get(rec.mac) != state:
+            self._states[rec.mac] = state
+            self._dirty = True
+
+    def _emit(self, tag, rec, fields=None):
+        if self._queue is None:
+            return
+        data = rec.view()
+        if fields is not None:
+            data['changed'] = fields
+        self._queue.put({'tag': tag, 'data': data})
@@ -0,0 +1,149 @@
+"""
+Attack command dispatcher for the agent
+Association and deauth commands are queued and sent by a couple of worker
+threads instead of the main loop blocking on each backend command and then
+sleeping the throttle. The throttle becomes a per-target cooldown: the same
+AP or station isn't hit again until it expires, but different targets on
+the current channel go out back to back.
+
+Completion callbacks run on the worker thread, which is where the agent
+updates its epoch counters, plugins and the face. An optional token bucket
+(see throttle.py) holds commands back while the injection budget is spent;
+a command still waiting for it after BUDGET_TIMEOUT seconds is dropped.
+"""
+
+import time
+import logging
+import threading
+from queue import Queue
+
+
+class AttackDispatcher:
+    """
+    Runs commands through run(command) on worker threads.
+
+    submit() returns False without queueing anything while the target is
+    cooling down. drain() waits for everything queued so far, which the
+    agent does before leaving the channel the commands were meant for.
+    on_idle() is called whenever the last pending command has completed.
+    """
+
+    # Seconds a command may wait for the injection budget before it's dropped
+    BUDGET_TIMEOUT = 10.0
+
+    def __init__(self, run, workers=2, on_idle=None, budget=None):
+        self._run = run
+        self._on_idle = on_idle
+        self._budget = budget
+        self._queue = Queue()
+        self._ready_at = {}  # target -> monotonic time its cooldown ends
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._workers = workers
+        self._threads = []
+
+        # Counters
+        self.sent = 0
+        self.failed = 0
+        self.cooling = 0  # submissions skipped by a cooldown
+        self.over_budget = 0  # commands dropped waiting for the budget
+
+    @property
+    def pending(self):
+        """Commands queued or running"""
+        return self._pending
+
+    def start(self):
+        for _ in range(self._workers - len(self._threads)):
+            thread = threading.Thread(target=self._worker, daemon=True,
+                                      name='attack-%d' % len(self._threads))
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        self._threads = []
+
+    def cooling_down(self, target):
+        with self._lock:
+            return time.monotonic() < self._ready_at.get(target, 0)
+
+    def submit(self, command, target, cooldown=0.0, on_done=None, cost=0):
+        """Queue command for target, on_done(error or None, seconds) once it has run
+
+        cost is what the command takes from the budget (frames).
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._ready_at.get(target, 0):
+                self.cooling += 1
+                return False
+            if cooldown > 0:
+                self._ready_at[target] = now + cooldown
+                if len(self._ready_at) > 1024:
+                    self._ready_at = {t: at for t, at in self._ready_at.items() if at > now}
+            self._pending += 1
+        if not self._threads:
+            self.start()
+        self._queue.put((command, on_done, cost))
+        return True
+
+    def drain(self, timeout=15.0):
+        """Wait until every queued command has run, returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logging.warning("[Dispatcher] %d commands still pending", self._pending)
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def stats(self):
+        return {'sent': self.sent, 'failed': self.failed, 'cooling': self.cooling,
+                'over_budget': self.over_budget, 'pending': self._pending}
+
+    def _send(self, command, on_done):
+        error = None
+        started = time.monotonic()
+        try:
+            self._run(command)
+        except Exception as e:
+            error = e
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.sent += 1
+            if error is not None:
+                self.failed += 1
+        if on_done is not None:
+            try:
+                on_done(error, elapsed)
+            except Exception as e:
+                logging.error(f"[Dispatcher] Completion callback failed: {e}")
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            command, on_done, cost = job
+            if cost and self._budget is not None and not self._budget.wait(cost, self.BUDGET_TIMEOUT):
+                # Sending it late would break the rate cap, drop it
+                logging.debug(f"[Dispatcher] Injection budget spent, dropping {command}")
+                with self._lock:
+                    self.over_budget += 1
+            else:
+                self._send(command, on_done)
+            with self._idle:
+                self._pending -= 1
+                idle = not self._pending
+                if idle:
+                    self._idle.notify_all()
+            if idle and self._on_idle is not None:
+                try:
+                    self._on_idle()
+                except Exception as e:
+                    logging.error(f"[Dispatcher] Idle callback failed: {e}")
@@ -20,8 +20,62 @@ import logging
 import asyncio
 import subprocess
 import threading
-from glob import glob
-from queue import Queue, Empty
+from queue import Empty
+
+from pwnagotchi_port.ap_table import APTable
+from pwnagotchi_port.client_table import ClientTable
+from pwnagotchi_port.command_channel import CommandChannel
+from pwnagotchi_port.focus_lease import FocusLeases, OWNER_HOP
+from pwnagotchi_port.dot11 import PcapReader, PcapError, FrameSampler, parse_frame, tracker_filter
+from pwnagotchi_port.handshake_watcher import HandshakeWatcher
+from pwnagotchi_port.handshake_catalog import HandshakeCatalog
+from pwnagotchi_port.hop_plan import channel_to_band
+from pwnagotchi_port.prior_captures import PriorCaptureIndex
+from pwnagotchi_port.recon import ReconFetcher, parse_recon_ap
+from pwnagotchi_port.recon_db import ReconDBReader, find_recon_db
+from pwnagotchi_port.records import mac_to_int, format_mac
+from pwnagotchi_port.runtime import EventQueue, get_runtime
+from pwnagotchi_port.wifi_security import security_from_text
+
+PINEAPD = '/usr/sbin/pineapd'
+
+
+def pineapd_bands(channels=None):
+    """pineapd --band list covering channels (all bands when there are none)"""
+    bands = set(channel_to_band(ch) for ch in channels or ())
+    return ','.join(b[0] for b in ('2G', '5G', '6G') if not bands or b in bands)
+
+
+def pineapd_command(iface='wlan1mon', channels=None):
+    """pineapd command line with recon and handshake capture on iface
+
+    With channels only the bands they are on are scanned; the backend
+    narrows that down to the channels themselves (see restrict_channels).
+    """
+    return [
+        PINEAPD,
+        '--recon=true',
+        '--reconpath', '/root/recon/',
+        '--reconname', 'pager',
+        '--handshakepath', '/root/loot/handshakes/',
+        '--handshakes=true',
+        '--partialhandshakes=true',
+        '--interface', iface,
+        '--band', '%s:%s' % (iface, pineapd_bands(channels)),
+        '--type', '%s:max' % iface,
+        '--hop', '%s:fast' % iface,
+        '--primary', iface,
+        '--inject', iface,
+    ]
+
+
+def _cmdline_arg(cmdline, flag):
+    """Value following flag in a pgrep -a line, or None"""
+    parts = cmdline.split()
+    for i, part in enumerate(parts[:-1]):
+        if part == flag:
+            return parts[i + 1]
+    return None
 
 
 class PineAPBackend:
@@ -30,29 +84,63 @@ class PineAPBackend:
     Provides real AP data and targeted attacks
     """
 
-    def __init__(self, handshakes_dir='/root/loot/handshakes/pagergotchi'):
+    # APs merged into the table per lock acquisition
+    RECON_BATCH = 200
+    # Client tracker BPF filter: at most this many BSSIDs (strongest first),
+    # re-evaluated at most every TRACKER_REFILTER_INTERVAL seconds
+    TRACKER_MAX_BSSIDS = 64
+    TRACKER_REFILTER_INTERVAL = 60
+    # An AP in the filter is only swapped for one at least this many dB
+    # stronger, and the filter only changes once this share of it would,
+    # however many APs there are (restarting tcpdump loses frames)
+    TRACKER_SWAP_DB = 6
+    TRACKER_SWAP_SHARE = 0.25
+    # Seconds between recon polls
+    RECON_INTERVAL = 3
+    # Seconds between writes of the handshake catalog (if it changed)
+    CATALOG_SAVE_INTERVAL = 60
+    # Seconds a session may lag behind client statistics (same as a recon poll)
+    SESSION_REFRESH = 3
+
+    def __init__(self, handshakes_dir='/root/loot/handshakes/pagergotchi', config=None):
         # PineAP saves handshakes to /root/loot/handshakes/ by default, not our subdirectory
         # Monitor the actual PineAP handshakes location
         self.handshakes_dir = '/root/loot/handshakes'
         self.pagergotchi_handshakes_dir = handshakes_dir  # Keep for future use
         self.running = False
 
-        # Discovered networks (real data from PineAP)
-        self.access_points = {}
-        self.clients = {}  # {ap_mac: [{mac: client_mac, vendor: '', last_seen: time}, ...]}
+        # Event queue for websocket simulation
+        # Periodic work (recon polls, restricted hopping) runs on the shared runtime
+        self._runtime = get_runtime()
+        self.event_queue = EventQueue(self._runtime)
+
+        # Discovered networks (real data from PineAP), updated in place by recon
+        # polls. All MAC keys are 48-bit ints (see records.py); bettercap-style
+        # dicts are only built when read from the snapshot, and for events. Anything
+        # that runs per frame or per session read uses _ap_table.snapshot,
+        # which needs no lock
+        self._ap_table = APTable(event_queue=self.event_queue)
+        self.access_points = self._ap_table.records  # {ap_mac: APRecord}, under _lock
+        self.clients = ClientTable()  # (ap_mac, client_mac) -> ClientRecord, see set wifi.sta.ttl
         self.handshakes = {}
 
-        # Track known handshake files to detect new ones
-        self._known_handshakes = set()
+        # Single watcher for new handshake files (inotify, mtime poll fallback);
+        # the agent subscribes to it too
+        self.handshake_watcher = HandshakeWatcher(self.handshakes_dir)
+        self.handshake_watcher.subscribe(self._on_handshake_file)
+        # What each capture file contains, cached in data/ across runs
+        self.handshake_catalog = HandshakeCatalog()
 
         # MAC -> ESSID mapping learned from handshakes
         self._learned_essids = {}
 
-        # Event queue for websocket simulation
-        self.event_queue = Queue()
+        # APs captured before (loot directory), checked before attacking
+        targeting = (config or {}).get('targeting', {})
+        self.prior_captures = PriorCaptureIndex(targeting.get('recapture', 'never'),
+                                                targeting.get('recapture_days', 30),
+                                                targeting.get('recapture_match_essid', False))
 
         # Background threads
-        self._recon_thread = None
         self._handshake_thread = None
         self._client_tracker_thread = None
         self._client_tracker_proc = None
@@ -63,25 +151,84 @@ class PineAPBackend:
         self._pineapd_proc = None
         self._pineapd_service_was_running = False
 
+        # Long-lived shell for _pineap/iw commands (falls back to spawning)
+        self._cmd_channel = CommandChannel()
+        self._stats_logged_at = time.time()
+
+        # Walks the whole recon AP set page by page, parsing JSON as it streams
+        self._recon_fetcher = ReconFetcher(self._cmd_channel.stream, page_size=self.RECON_BATCH)
+
+        # Optional direct reader for pineapd's recon database ([recon] source = db)
+        self._recon_db = None
+        recon_cfg = (config or {}).get('recon', {})
+        if recon_cfg.get('source', 'cli') == 'db':
+            db_path = recon_cfg.get('db_path') or find_recon_db()
+            self._recon_db = ReconDBReader(db_path)
+        # Client tracker input: 'pcap' (binary frames) or 'text' (tcpdump -e lines)
+        self._tracker_mode = recon_cfg.get('tracker', 'pcap')
+        self._tracker_sampler = FrameSampler(recon_cfg.get('tracker_sample_fps', 300),
+                                             recon_cfg.get('tracker_sample_pair', 3))
+        self._tracker_bssids = frozenset()  # BSSIDs in the running filter
+        self._tracker_refilter_at = 0
+        self._tracker_restart = False
+        self._tracker_use_bssids = True
+        self._tracker_ignored = 0  # frames without a unicast station
+        self._tracker_dropped = 0  # frames dropped by the kernel (tcpdump's count)
+        self.clients.max_clients = recon_cfg.get('max_clients', 4096)
+        self._ap_table.rssi_hysteresis = recon_cfg.get('rssi_hysteresis', 5)
+
+        # Last session built (see get_session_data):
+        # (generations, client updates, monotonic time, session)
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.session_builds = 0
+        self.session_hits = 0
+
         # Current channel (0 = hopping)
         self.current_channel = 0
         self.focused_bssid = None
 
+        # pineapd setup from config.conf: [capture] interface, [channels]
+        self.iface = (config or {}).get('main', {}).get('iface', 'wlan1mon')
+        self.channels = list((config or {}).get('personality', {}).get('channels') or ())
+        # Restricted hopping: EXAMINE CHANNEL over a channel list, channel_dwell
+        # seconds each, instead of pineapd hopping every channel of its bands
+        self.channel_dwell = max(0.1, recon_cfg.get('channel_dwell', 0.5))
+        self._hop_channels = ()
+        self._hop_lock = threading.Lock()  # held while a hop command is sent
+        self._hop_index = 0
+        self.hops = 0
+        # EXAMINE locks as leases sized to what's planned on them; an AP is
+        # focused for focus_time seconds (the wait for a PMKID)
+        self.leases = FocusLeases(self._run_cmd, bssid_lease=recon_cfg.get('focus_time', 2),
+                                  runtime=self._runtime)
+
         # Scan existing handshakes on init so count is available immediately
         self._scan_existing_handshakes()
 
     def _ensure_pineapd_handshakes(self):
         """Ensure pineapd is running with handshake capture enabled.
 
-        If the service is running without --handshakes=true, we stop it and
+        If the service is running without --handshakes=true, or on another
+        interface or without the bands [channels] needs, we stop it and
         start our own pineapd process. On exit, we restart the service.
         """
         try:
             result = subprocess.run(['pgrep', '-a', 'pineapd'], capture_output=True, text=True, timeout=5)
             cmdline = result.stdout
+            cmd = pineapd_command(self.iface, self.channels)
+
+            mismatch = None
+            if cmdline.strip():
+                if '--handshakes=true' not in cmdline:
+                    mismatch = 'without handshakes'
+                elif _cmdline_arg(cmdline, '--interface') not in (None, self.iface):
+                    mismatch = 'on %s' % _cmdline_arg(cmdline, '--interface')
+                elif self.channels and _cmdline_arg(cmdline, '--band') != cmd[cmd.index('--band') + 1]:
+                    mismatch = 'with bands %s' % _cmdline_arg(cmdline, '--band')
 
-            if '--handshakes=false' in cmdline or (cmdline.strip() and '--handshakes=true' not in cmdline):
-                logging.info("[PineAP] pineapd running without handshakes, restarting with capture enabled...")
+            if mismatch:
+                logging.info(f"[PineAP] pineapd running {mismatch}, restarting as configured...")
 
                 # Track that service was running so we can restart it on exit
                 self._pineapd_service_was_running = True
@@ -100,23 +247,6 @@ class PineAPBackend:
                     subprocess.run(['killall', '-9', 'pineapd'], capture_output=True, timeout=5)
                     time.sleep(1)
 
-                # Start our own pineapd with handshakes enabled
-                cmd = [
-                    '/usr/sbin/pineapd',
-                    '--recon=true',
-                    '--reconpath', '/root/recon/',
-                    '--reconname', 'pager',
-                    '--handshakepath', '/root/loot/handshakes/',
-                    '--handshakes=true',
-                    '--partialhandshakes=true',
-                    '--interface', 'wlan1mon',
-                    '--band', 'wlan1mon:2,5,6',
-                    '--type', 'wlan1mon:max',
-                    '--hop', 'wlan1mon:fast',
-                    '--primary', 'wlan1mon',
-                    '--inject', 'wlan1mon',
-                ]
-
                 # Start in background
                 self._pineapd_proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
                 time.sleep(2)
@@ -127,21 +257,6 @@ class PineAPBackend:
             else:
                 # No pineapd running at all - start our own
                 logging.info("[PineAP] No pineapd running, starting with handshakes enabled...")
-                cmd = [
-                    '/usr/sbin/pineapd',
-                    '--recon=true',
-                    '--reconpath', '/root/recon/',
-                    '--reconname', 'pager',
-                    '--handshakepath', '/root/loot/handshakes/',
-                    '--handshakes=true',
-                    '--partialhandshakes=true',
-                    '--interface', 'wlan1mon',
-                    '--band', 'wlan1mon:2,5,6',
-                    '--type', 'wlan1mon:max',
-                    '--hop', 'wlan1mon:fast',
-                    '--primary', 'wlan1mon',
-                    '--inject', 'wlan1mon',
-                ]
                 self._pineapd_proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
                 time.sleep(2)
                 logging.info("[PineAP] pineapd started (PID: %s)",
@@ -159,6 +274,9 @@ class PineAPBackend:
         # pineapd is started by payload.sh with --handshakes=true
         # Don't start a new recon - use pineapd's existing recon which starts automatically
         # RECON NEW resets the database and can cause APs to disappear
+        if self.channels:
+            # ... unless it scans bands [channels] has nothing on
+            self._ensure_pineapd_handshakes()
         logging.info("[PineAP] Using existing pineapd recon (started at boot)")
         # Just make sure we're not locked to a single channel
         self._run_cmd(['_pineap', 'EXAMINE', 'CANCEL'])
@@ -166,12 +284,12 @@ class PineAPBackend:
         self.running = True
 
         # Start background recon thread
-        self._recon_thread = threading.Thread(target=self._recon_loop, daemon=True)
-        self._recon_thread.start()
+        self._runtime.every(self.RECON_INTERVAL, self._recon_poll, 'recon', blocking=True, delay=0)
 
-        # Start handshake monitoring thread
-        self._handshake_thread = threading.Thread(target=self._handshake_monitor_loop, daemon=True)
-        self._handshake_thread.start()
+        # Start handshake watcher; new captures are cataloged in memory
+        self.handshake_watcher.start()
+        self._runtime.every(self.CATALOG_SAVE_INTERVAL, self.handshake_catalog.save, 'handshake-catalog',
+                            blocking=True)
 
         # Start client tracker thread (captures frames to track client-to-AP associations)
         self._client_tracker_thread = threading.Thread(target=self._client_tracker_loop, daemon=True)
@@ -184,6 +302,15 @@ class PineAPBackend:
         """Stop reconnaissance and cleanup pineapd"""
         self.running = False
 
+        self.handshake_watcher.stop()
+        self._runtime.cancel('recon')
+        self._runtime.cancel('handshake-catalog', wait=2.0)
+        self.handshake_catalog.save()
+        self._stop_hopping()
+
+        if self._recon_db is not None:
+            self._recon_db.close()
+
         # Kill client tracker tcpdump process
         if self._client_tracker_proc:
             try:
@@ -194,7 +321,11 @@ class PineAPBackend:
             self._client_tracker_proc = None
 
         # Reset any channel focus
-        self._run_cmd(['_pineap', 'EXAMINE', 'CANCEL'])
+        self.leases.cancel()
+
+        logging.info("[PineAP] Command latency: %s", self._cmd_channel.stats.summary())
+        logging.info("[PineAP] Focus leases: %s", self.leases.stats())
+        self._cmd_channel.close()
 
         # Kill our pineapd process if we started one
         if self._pineapd_proc:
@@ -223,221 +354,244 @@ class PineAPBackend:
     def _run_cmd(self, cmd, timeout=10):
         """Run a shell command and return output
 
+        Goes through the persistent command channel, which falls back to
+        spawning a process per command if the channel is busy or broken.
+
         Note: _pineap outputs data to stderr and uses exit code for counts
         """
+        if isinstance(cmd, str):
+            cmd = cmd.split()
+        return self._cmd_channel.run(cmd, timeout=timeout)
+
+    def get_command_stats(self):
+        """Per-command latency counters ({'_pineap RECON': {count, avg_ms, ...}})"""
+        return self._cmd_channel.stats.snapshot()
+
+    def _scan_existing_handshakes(self):
+        """Scan for existing handshake files and learn their ESSIDs
+
+        Only files that are new or changed since the catalog was last saved
+        are opened.
+        """
+        self.handshake_watcher.scan_existing()
+        self.handshake_catalog.load()
+        self.handshake_catalog.sync(self.handshake_watcher.known_files())
+        entries = self.handshake_catalog.items()
+        for _path, entry in entries:
+            ap_key = mac_to_int(entry['ap'])
+            if ap_key is not None and entry['essid']:
+                self._learned_essids[ap_key] = entry['essid']
+        # Second pass so files without an ESSID still match by learned name
+        for _path, entry in entries:
+            self._index_capture(entry)
+        logging.info(f"[PineAP] {len(self.prior_captures)} APs captured in previous sessions "
+                     f"(recapture: {self.prior_captures.policy})")
+
+    def _index_capture(self, entry):
+        """Add a catalog entry to the prior-capture index"""
+        ap_key = mac_to_int(entry.get('ap'))
+        essid = entry.get('essid') or self._learned_essids.get(ap_key, '')
+        self.prior_captures.add(ap_key, essid, entry.get('mtime', 0) / 1e9, entry.get('types', ()))
+
+    def captured_before(self, bssid, essid=''):
+        """True if the recapture policy says to leave this AP alone"""
+        return self.prior_captures.should_skip(mac_to_int(bssid), essid)
+
+    def _recon_poll(self):
+        """One recon pass: fetch APs, refilter the tracker, expire clients (runtime pool)"""
+        if not self.running:
+            return
         try:
-            if isinstance(cmd, str):
-                cmd = cmd.split()
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            # PineAP outputs to stderr, combine both
-            output = result.stdout.strip() or result.stderr.strip()
-            return output, result.stderr.strip(), result.returncode
-        except subprocess.TimeoutExpired:
-            logging.warning(f"[PineAP] Command timed out: {cmd}")
-            return '', 'timeout', -1
+            self._fetch_aps()
         except Exception as e:
-            logging.error(f"[PineAP] Command error: {e}")
-            return '', str(e), -1
+            logging.debug(f"[PineAP] Recon error: {e}")
 
-    def _extract_essid_from_22000(self, filepath):
-        """Extract ESSID and AP MAC from a .22000 hashcat file"""
         try:
-            with open(filepath, 'r') as f:
-                for line in f:
-                    # Format: WPA*02*mic*ap_mac*client_mac*essid_hex*...
-                    if line.startswith('WPA*'):
-                        parts = line.split('*')
-                        if len(parts) >= 6:
-                            ap_mac = parts[3].upper()
-                            essid_hex = parts[5]
-                            # Decode hex ESSID
-                            try:
-                                essid = bytes.fromhex(essid_hex).decode('utf-8', errors='ignore')
-                                if essid and ap_mac:
-                                    return ap_mac, essid
-                            except Exception:
-                                pass
+            self._refilter_tracker()
         except Exception as e:
-            logging.debug(f"[PineAP] Error reading {filepath}: {e}")
-        return None, None
+            logging.debug(f"[ClientTracker] Refilter error: {e}")
 
-    def _scan_existing_handshakes(self):
-        """Scan for existing handshake files and extract ESSIDs"""
-        patterns = [
-            os.path.join(self.handshakes_dir, '*.22000'),
-            os.path.join(self.handshakes_dir, '*_handshake.22000'),
-            os.path.join(self.handshakes_dir, '*.pcap'),
-        ]
-        for pattern in patterns:
-            for f in glob(pattern):
-                self._known_handshakes.add(f)
-                # Extract ESSID from .22000 files
-                if f.endswith('.22000'):
-                    ap_mac, essid = self._extract_essid_from_22000(f)
-                    if ap_mac and essid:
-                        # Normalize MAC format
-                        ap_mac_formatted = ':'.join(ap_mac[i:i+2] for i in range(0, 12, 2))
-                        self._learned_essids[ap_mac_formatted] = essid
-                        logging.debug(f"[PineAP] Learned ESSID '{essid}' for {ap_mac_formatted}")
-
-    def _recon_loop(self):
-        """Background thread to fetch AP data from PineAP"""
-        while self.running:
-            try:
-                self._fetch_aps()
-            except Exception as e:
-                logging.debug(f"[PineAP] Recon error: {e}")
-            time.sleep(3)  # Update every 3 seconds
+        with self._clients_lock:
+            self.clients.expire(time.time())
+
+        # Periodically report command latency so the channel's gain is visible
+        if time.time() - self._stats_logged_at >= 300:
+            self._stats_logged_at = time.time()
+            logging.debug("[PineAP] Command latency: %s", self._cmd_channel.stats.summary())
+            logging.debug("[ClientTracker] Frames: %s", self.get_tracker_stats())
+            with self._clients_lock:
+                logging.debug("[ClientTracker] Clients: %s", self.clients.stats())
+            logging.debug("[PineAP] Focus leases: %s", self.leases.stats())
+            logging.debug("[PineAP] Sessions: %d built, %d shared",
+                          self.session_builds, self.session_hits)
+            if self.hops:
+                logging.debug("[PineAP] Restricted hops: %d", self.hops)
+
+    def _learned_essid(self, mac):
+        """ESSID learned from a handshake file for an AP MAC (any format)"""
+        return self._learned_essids.get(mac_to_int(mac), '')
 
     def _fetch_aps(self):
-        """Fetch AP list from PineAP"""
-        # Use _pineap command to get JSON AP list
-        # Format: _pineap RECON APS format=json limit=100
-        output, stderr, rc = self._run_cmd(['_pineap', 'RECON', 'APS', 'format=json', 'limit=100'])
+        """Fetch the full AP list from PineAP
 
-        if not output:
-            logging.debug(f"[PineAP] No output from RECON APS (rc={rc}, stderr={stderr[:100] if stderr else 'none'})")
+        Reads the recon database directly when configured (falling back to the
+        CLI if it can't be read), otherwise pages through
+        `_pineap RECON APS format=json` and merges each page into the AP table
+        as soon as it's parsed, so only one page is held at a time.
+        """
+        if self._recon_db is not None and self._fetch_aps_db():
             return
 
-        try:
-            # Parse JSON response
-            data = json.loads(output)
+        now = time.time()
+        count = 0
 
+        for page in self._recon_fetcher.pages():
+            polled = []
+            for ap in page:
+                parsed = parse_recon_ap(ap)
+                if parsed is None:
+                    continue
+                # If no SSID in the recon data, check learned ESSIDs from handshakes
+                if not parsed['hostname']:
+                    parsed['hostname'] = self._learned_essid(parsed['mac'])
+                polled.append(parsed)
+
+            # Merge into the existing table (keeps first_seen, emits wifi.ap.* deltas)
             with self._lock:
-                new_aps = {}
+                self._ap_table.merge(polled, now)
+            count += len(polled)
 
-                # PineAP returns array of AP objects
-                aps_list = data if isinstance(data, list) else data.get('aps', [])
+        if not count:
+            # Don't expire anything on a failed poll
+            logging.debug("[PineAP] No APs from RECON APS")
+            return
 
-                for ap in aps_list:
-                    mac = ap.get('mac', '').upper()
-                    if not mac:
-                        continue
+        with self._lock:
+            self._ap_table.expire(now)
+            self._ap_table.publish()
 
-                    # Extract SSID and channel from beacon data
-                    # Format: {"beacon": {"hash": {"channel": 11, "ssid": "name", ...}}, "mac": "...", "signal": -52}
-                    ssid = ''
-                    channel = 0
-                    beacon = ap.get('beacon', {})
-                    if beacon:
-                        # Get first beacon entry (there's usually one keyed by a hash)
-                        for beacon_key, beacon_data in beacon.items():
-                            if isinstance(beacon_data, dict):
-                                ssid = beacon_data.get('ssid', '')
-                                channel = beacon_data.get('channel', 0)
-                                break
-
-                    # Convert freq to channel if channel not in beacon
-                    if channel == 0 and 'freq' in ap:
-                        freq = ap['freq']
-                        if 2412 <= freq <= 2484:
-                            channel = (freq - 2407) // 5
-                        elif 5180 <= freq <= 5825:
-                            channel = (freq - 5000) // 5
-
-                    # If no SSID from beacon, check learned ESSIDs from handshakes
-                    if not ssid:
-                        mac_formatted = ':'.join(mac[i:i+2] for i in range(0, 12, 2))
-                        ssid = self._learned_essids.get(mac_formatted, '')
-
-                    new_aps[mac.lower()] = {
-                        'mac': mac,
-                        'hostname': ssid,
-                        'vendor': '',
-                        'channel': channel,
-                        'rssi': int(ap.get('signal', -100)),
-                        'encryption': 'WPA2',  # PineAP doesn't provide this directly
-                        'clients': [],
-                        'last_seen': time.time()
-                    }
+        logging.debug("[PineAP] Recon poll: %d APs in %d request(s), %.0fms",
+                      count, self._recon_fetcher.last_requests,
+                      self._recon_fetcher.last_duration * 1000)
 
-                self.access_points = new_aps
+    def _fetch_aps_db(self):
+        """Read APs and clients changed since the last poll from the recon database
 
-        except json.JSONDecodeError as e:
-            logging.debug(f"[PineAP] JSON parse error: {e}")
-        except Exception as e:
-            logging.debug(f"[PineAP] AP parse error: {e}")
+        Returns False if the database can't be used (caller falls back to the CLI).
+        """
+        if not self._recon_db.open():
+            return False
+
+        start = time.monotonic()
+        now = time.time()
+        count = 0
+        batch = []
+        for ap in self._recon_db.read_aps():
+            if not ap['hostname']:
+                ap['hostname'] = self._learned_essid(ap['mac'])
+            batch.append(ap)
+            if len(batch) >= self.RECON_BATCH:
+                with self._lock:
+                    self._ap_table.merge(batch, now)
+                count += len(batch)
+                batch = []
+        if batch:
+            with self._lock:
+                self._ap_table.merge(batch, now)
+            count += len(batch)
+
+        for ap_mac, client_mac, _signal in self._recon_db.read_clients():
+            ap_key = mac_to_int(ap_mac)
+            client_key = mac_to_int(client_mac)
+            if ap_key is not None and client_key is not None:
+                self._record_client(ap_key, client_key)
+
+        # Without per-row times an unchanged row doesn't mean the AP is gone
+        with self._lock:
+            if self._recon_db.tracks_time:
+                self._ap_table.expire(now)
+            self._ap_table.publish()
+
+        logging.debug("[PineAP] Recon DB poll: %d changed APs, %.0fms",
+                      count, (time.monotonic() - start) * 1000)
+        return True
 
     def _parse_text_aps(self, text):
         """Parse text-format AP output from PineAP"""
         # Format: MAC Channel Signal RSSI Encryption SSID
-        with self._lock:
-            for line in text.strip().split('\n'):
-                if not line or line.startswith('#'):
-                    continue
-                parts = line.split()
-                if len(parts) >= 5:
-                    try:
-                        mac = parts[0].lower()
-                        # Validate MAC format
-                        if not re.match(r'^([0-9a-f]{2}:){5}[0-9a-f]{2}$', mac):
-                            continue
-
-                        self.access_points[mac] = {
-                            'mac': mac,
-                            'hostname': ' '.join(parts[5:]) if len(parts) > 5 else '',
-                            'vendor': '',
-                            'channel': int(parts[1]) if parts[1].isdigit() else 0,
-                            'rssi': int(parts[2]) if parts[2].lstrip('-').isdigit() else -100,
-                            'encryption': parts[4] if len(parts) > 4 else 'WPA2',
-                            'clients': [],
-                            'last_seen': time.time()
-                        }
-                    except (ValueError, IndexError):
+        polled = []
+        for line in text.strip().split('\n'):
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split()
+            if len(parts) >= 5:
+                try:
+                    mac = parts[0].lower()
+                    # Validate MAC format
+                    if not re.match(r'^([0-9a-f]{2}:){5}[0-9a-f]{2}$', mac):
                         continue
 
-    def _handshake_monitor_loop(self):
-        """Monitor for new handshake captures"""
-        while self.running:
-            try:
-                self._check_new_handshakes()
-            except Exception as e:
-                logging.debug(f"[PineAP] Handshake monitor error: {e}")
-            time.sleep(2)  # Check every 2 seconds
-
-    def _check_new_handshakes(self):
-        """Check for newly captured handshakes"""
-        patterns = [
-            os.path.join(self.handshakes_dir, '*.22000'),
-            os.path.join(self.handshakes_dir, '*_handshake.22000'),
-        ]
+                    ap = {
+                        'mac': mac,
+                        'hostname': ' '.join(parts[5:]) if len(parts) > 5 else '',
+                        'channel': int(parts[1]) if parts[1].isdigit() else 0,
+                        'rssi': int(parts[2]) if parts[2].lstrip('-').isdigit() else -100,
+                        'encryption': parts[4],
+                    }
+                    ap.update(security_from_text(parts[4]) or {})
+                    polled.append(ap)
+                except (ValueError, IndexError):
+                    continue
+
+        with self._lock:
+            self._ap_table.update(polled)
+
+    def _on_handshake_file(self, event):
+        """handshake.new/updated from the watcher"""
+        if event['tag'] == 'handshake.updated':
+            self._process_updated_handshake(event['data']['file'])
+        else:
+            self._process_new_handshake(event['data']['file'])
 
-        for pattern in patterns:
-            for filepath in glob(pattern):
-                if filepath not in self._known_handshakes:
-                    self._known_handshakes.add(filepath)
-                    self._process_new_handshake(filepath)
+    def _process_updated_handshake(self, filepath):
+        """pineapd added hashes to a capture file (e.g. EAPOL after a PMKID)"""
+        entry = self.handshake_catalog.add(filepath)
+        if not entry:
+            return
+        logging.debug(f"[PineAP] Handshake file updated: {os.path.basename(filepath)} "
+                      f"(types {entry['types']})")
+        file_key = mac_to_int(entry.get('ap'))
+        if file_key is not None and entry.get('essid'):
+            self._learned_essids[file_key] = entry['essid']
+        # The recapture policy sees the upgrade (PMKID only -> full handshake)
+        self._index_capture(entry)
 
     def _process_new_handshake(self, filepath):
         """Process a newly captured handshake"""
         filename = os.path.basename(filepath)
         logging.info(f"[PineAP] New handshake detected: {filename}")
 
-        # Extract ESSID from .22000 file and learn it
-        ap_mac_from_file, essid = self._extract_essid_from_22000(filepath)
-        if ap_mac_from_file and essid:
-            mac_formatted = ':'.join(ap_mac_from_file[i:i+2] for i in range(0, 12, 2))
-            self._learned_essids[mac_formatted] = essid
-            logging.info(f"[PineAP] Learned ESSID '{essid}' for {mac_formatted}")
+        # Catalog the .22000 file and learn its ESSID
+        entry = self.handshake_catalog.add(filepath) or {}
+        file_key = mac_to_int(entry.get('ap'))
+        if file_key is not None and entry.get('essid'):
+            self._learned_essids[file_key] = entry['essid']
+            logging.info(f"[PineAP] Learned ESSID '{entry['essid']}' for {format_mac(file_key)}")
+        if entry:
+            self._index_capture(entry)
 
         # Try to extract MAC from filename
         # Format: {MAC}_handshake.22000 or {MAC}.22000
         mac_match = re.search(r'([0-9a-fA-F]{12})', filename.replace(':', '').replace('-', ''))
-        ap_mac = ''
-        if mac_match:
-            # Convert to colon format
-            raw_mac = mac_match.group(1).lower()
-            ap_mac = ':'.join(raw_mac[i:i+2] for i in range(0, 12, 2))
+        ap_key = mac_to_int(mac_match.group(1)) if mac_match else file_key
+        ap_mac = format_mac(ap_key, upper=False) if ap_key is not None else ''
 
-        # Look up AP info - check learned ESSIDs first, then access_points
-        ap_name = self._learned_essids.get(ap_mac, '')
-        if not ap_name and ap_mac in self.access_points:
-            ap_name = self.access_points[ap_mac].get('hostname', '')
+        # Look up AP info - check learned ESSIDs first, then recon
+        ap_name = self._learned_essids.get(ap_key, '')
+        if not ap_name:
+            view = self._ap_table.snapshot.records.get(ap_key)
+            if view is not None:
+                ap_name = view['hostname']
 
         # Record handshake
         key = f"client -> {ap_mac}"
@@ -480,8 +634,148 @@ class PineAPBackend:
             logging.warning("[ClientTracker] No monitor interface found")
             return
 
-        logging.info(f"[ClientTracker] Starting on {iface}")
+        logging.info(f"[ClientTracker] Starting on {iface} ({self._tracker_mode})")
+
+        if self._tracker_mode != 'pcap' or not self._track_pcap(iface):
+            self._track_text(iface)
+
+        logging.info("[ClientTracker] Stopped")
+
+    def _stop_tracker_proc(self):
+        proc = self._client_tracker_proc
+        if not proc:
+            return
+        try:
+            proc.terminate()
+        except Exception:
+            pass
+        if proc.stderr is not None and threading.current_thread() is self._client_tracker_thread:
+            # tcpdump reports its kernel drop count on exit
+            try:
+                _out, err = proc.communicate(timeout=2)
+                match = re.search(rb'(\d+) packets? dropped by kernel', err or b'')
+                if match:
+                    self._tracker_dropped += int(match.group(1))
+            except Exception:
+                pass
+
+    def _track_pcap(self, iface):
+        """Track clients from binary frames (tcpdump -w -)
+
+        Addresses, AP/station roles and RSSI come straight from the radiotap
+        and 802.11 headers. Returns False if the capture can't be read as
+        pcap, so the caller can fall back to text mode.
+        """
+        started = False
+        sampler = self._tracker_sampler
+        while self.running:
+            # Unicast data frames only, limited to known BSSIDs once recon has
+            # some; _refilter_tracker() restarts tcpdump when the set changes
+            self._tracker_restart = False
+            self._tracker_bssids = (self._strongest_bssids(self._tracker_bssids)
+                                    if self._tracker_use_bssids else frozenset())
+            self._tracker_refilter_at = time.time()
+            # -U: flush each packet, -s: headers are all we need
+            cmd = [
+                'tcpdump', '-i', iface, '-n', '-U', '-s', '256', '-w', '-',
+                tracker_filter(self._tracker_bssids)
+            ]
+
+            try:
+                self._client_tracker_proc = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    bufsize=65536
+                )
+                try:
+                    reader = PcapReader(self._client_tracker_proc.stdout)
+                except PcapError as e:
+                    if started and self._tracker_use_bssids:
+                        # Worked before, so it's the BSSID filter: go without it
+                        logging.warning(f"[ClientTracker] tcpdump restart failed ({e}), dropping BSSID filter")
+                        self._stop_tracker_proc()
+                        self._tracker_use_bssids = False
+                        continue
+                    logging.warning(f"[ClientTracker] pcap mode unavailable ({e}), using text mode")
+                    return False
+                started = True
+                logging.debug(f"[ClientTracker] Filtering {len(self._tracker_bssids)} BSSIDs")
+
+                radiotap = reader.radiotap
+                for ts, data in reader:
+                    if not self.running:
+                        break
+                    frame = parse_frame(data, radiotap)
+                    if frame is None:
+                        continue
+                    bssid, station, rssi, from_station, null = frame
+                    if station is None:
+                        self._tracker_ignored += 1
+                        continue
+                    # Under heavy traffic only a few frames per pair per second
+                    if sampler.admit(ts, (bssid, station)):
+                        self._record_client(bssid, station, rssi if from_station else None, null)
+
+            except Exception as e:
+                logging.error(f"[ClientTracker] Error: {e}")
+                self._tracker_restart = False
+            finally:
+                self._stop_tracker_proc()
 
+            if not self._tracker_restart:
+                break
+        return True
+
+    def _strongest_bssids(self, current=frozenset()):
+        """BSSIDs for the tracker filter (empty = all): the strongest
+        TRACKER_MAX_BSSIDS, staying with current until enough of them changed"""
+        records = self._ap_table.snapshot.records
+        if not records:
+            return frozenset()
+
+        def rssi(mac):
+            return records.field(mac, 'rssi')
+
+        # APs still around keep their place, free places go to the strongest
+        chosen = sorted((mac for mac in current if mac in records), key=rssi)
+        outside = sorted((mac for mac in records if mac not in current), key=rssi)
+        while len(chosen) < self.TRACKER_MAX_BSSIDS and outside:
+            chosen.append(outside.pop())
+        chosen.sort(key=rssi)
+        # Swap the weakest for the strongest outsider while that gains enough
+        while outside and chosen and rssi(outside[-1]) >= rssi(chosen[0]) + self.TRACKER_SWAP_DB:
+            chosen[0] = outside.pop()
+            chosen.sort(key=rssi)
+        chosen = frozenset(chosen)
+        if current and len(chosen - current) < self.TRACKER_SWAP_SHARE * len(chosen):
+            return current
+        return chosen
+
+    def _refilter_tracker(self):
+        """Restart the pcap tracker if the set of BSSIDs worth filtering changed"""
+        if self._client_tracker_proc is None or self._tracker_mode != 'pcap' or not self._tracker_use_bssids:
+            return
+        if time.time() - self._tracker_refilter_at < self.TRACKER_REFILTER_INTERVAL:
+            return
+        self._tracker_refilter_at = time.time()
+        bssids = self._strongest_bssids(self._tracker_bssids)
+        if bssids != self._tracker_bssids:
+            self._tracker_restart = True
+            self._stop_tracker_proc()
+
+    def get_tracker_stats(self):
+        """Client tracker frame counters"""
+        return {
+            'frames': self._tracker_sampler.frames,
+            'sampled': self._tracker_sampler.sampled,
+            'ignored': self._tracker_ignored,
+            'dropped': self._tracker_dropped,
+            'bssids': len(self._tracker_bssids),
+        }
+
+    def _track_text(self, iface):
+        """Track clients by parsing tcpdump's text output"""
         # tcpdump command to capture frames with link-level headers
         # -e: print link-level header (shows MAC addresses)
         # -n: don't resolve hostnames
@@ -509,13 +803,7 @@ class PineAPBackend:
         except Exception as e:
             logging.error(f"[ClientTracker] Error: {e}")
         finally:
-            if self._client_tracker_proc:
-                try:
-                    self._client_tracker_proc.terminate()
-                except Exception:
-                    pass
-
-        logging.info("[ClientTracker] Stopped")
+            self._stop_tracker_proc()
 
     def _parse_tcpdump_line(self, line):
         """
@@ -540,106 +828,91 @@ class PineAPBackend:
             if len(macs) < 2:
                 return
 
+            # tcpdump prints null data frames as "Null function (No data)"
+            null = 'Null' in line
+
             # Look for BSSID indicator in line
             bssid_match = re.search(r'BSSID[:\s]+([0-9a-fA-F:]{17})', line, re.IGNORECASE)
 
             if bssid_match:
-                bssid = bssid_match.group(1).lower()
-                # Any other MAC in the line that isn't the BSSID or broadcast is likely a client
+                bssid = mac_to_int(bssid_match.group(1))
+                if bssid is None:
+                    return
+                # Any other MAC in the line that isn't the BSSID is likely a client
                 for mac in macs:
-                    mac_lower = mac.lower()
-                    if mac_lower != bssid and not mac_lower.startswith('ff:ff:ff'):
-                        self._record_client(bssid, mac_lower)
+                    value = mac_to_int(mac)
+                    if value != bssid:
+                        self._record_client(bssid, value, null=null)
             else:
                 # No explicit BSSID - try to match MACs against known APs
-                with self._lock:
-                    known_aps = set(self.access_points.keys())
+                values = [mac_to_int(mac) for mac in macs]
+                known = self._ap_table.snapshot.records
+                ap_mac = next((v for v in values if v in known), None)
 
-                for mac in macs:
-                    mac_lower = mac.lower()
-                    if mac_lower in known_aps:
-                        # This MAC is a known AP, others are potential clients
-                        for other_mac in macs:
-                            other_lower = other_mac.lower()
-                            if other_lower != mac_lower and not other_lower.startswith('ff:ff:ff'):
-                                self._record_client(mac_lower, other_lower)
-                        break
+                if ap_mac is not None:
+                    # This MAC is a known AP, others are potential clients
+                    for value in values:
+                        if value != ap_mac:
+                            self._record_client(ap_mac, value, null=null)
 
         except Exception as e:
             logging.debug(f"[ClientTracker] Parse error: {e}")
 
-    def _record_client(self, ap_mac, client_mac):
-        """Record a client association with an AP"""
-        # Skip broadcast/multicast MACs
-        if client_mac.startswith('ff:ff:ff') or client_mac.startswith('01:'):
+    def _record_client(self, ap_mac, client_mac, rssi=None, null=None):
+        """Record a client association with an AP (both MACs as ints)
+
+        null says whether the sighting was a null data frame; None means it
+        wasn't a frame at all (recon database).
+        """
+        # Skip broadcast/multicast MACs (ff:ff:ff:..., 01:...)
+        if (client_mac >> 24) == 0xFFFFFF or (client_mac >> 40) == 0x01:
             return
 
         # Skip IPv6 multicast (33:33:xx:xx:xx:xx)
-        if client_mac.startswith('33:33:'):
+        if (client_mac >> 32) == 0x3333:
             return
 
         # Skip MACs that look like tcpdump artifacts (da:XX where XX matches common patterns)
         # These are "DA:" destination address labels being parsed as MAC prefixes
-        if client_mac.startswith('da:'):
-            # Check if it looks like a mangled MAC (da: followed by part of another MAC)
-            # Real MACs starting with DA: are rare (Cisco/misc), but da:33:33, da:01:00, etc are artifacts
-            second_octet = client_mac[3:5] if len(client_mac) > 4 else ''
-            if second_octet in ('33', '01', 'f0', 'c4', '94', '38', 'ff'):
-                return
+        # Real MACs starting with DA: are rare (Cisco/misc), but da:33:33, da:01:00, etc are artifacts
+        if (client_mac >> 40) == 0xDA and ((client_mac >> 32) & 0xFF) in (0x33, 0x01, 0xF0, 0xC4, 0x94, 0x38, 0xFF):
+            return
 
         # Skip MACs with zeros in suspicious positions (likely malformed)
-        if ':00:00:00' in client_mac or client_mac.endswith(':00:00'):
+        if (client_mac & 0xFFFF) == 0 or ((client_mac >> 8) & 0xFFFFFF) == 0 or ((client_mac >> 16) & 0xFFFFFF) == 0:
             return
 
         # Skip if client MAC looks like an AP MAC we know
-        with self._lock:
-            if client_mac in self.access_points:
-                return
+        if client_mac in self._ap_table.snapshot.records:
+            return
 
+        now = time.time()
         with self._clients_lock:
-            if ap_mac not in self.clients:
-                self.clients[ap_mac] = {}
-
-            if client_mac not in self.clients[ap_mac]:
-                self.clients[ap_mac][client_mac] = {
-                    'mac': client_mac.upper(),
-                    'vendor': '',
-                    'first_seen': time.time(),
-                    'last_seen': time.time()
-                }
-                logging.info(f"[ClientTracker] New client {client_mac} on AP {ap_mac}")
-            else:
-                # Update last seen
-                self.clients[ap_mac][client_mac]['last_seen'] = time.time()
+            new = self.clients.touch(ap_mac, client_mac, now, rssi, null)
+        if new:
+            logging.info(f"[ClientTracker] New client {format_mac(client_mac)} on AP {format_mac(ap_mac)}")
 
-    def _get_clients_for_ap(self, ap_mac):
-        """Get list of clients for an AP in bettercap format"""
-        ap_mac_lower = ap_mac.lower()
+    def _get_clients_for_aps(self, ap_macs):
+        """{AP MAC: tuple of client dicts in bettercap format} for APs (int MACs)"""
+        now = time.time()
         with self._clients_lock:
-            if ap_mac_lower not in self.clients:
-                return []
-
-            # Return as list of client dicts, filter stale entries (>5 min old)
-            now = time.time()
-            active_clients = []
-            for client_mac, client_data in self.clients[ap_mac_lower].items():
-                if now - client_data['last_seen'] < 300:  # 5 min TTL
-                    active_clients.append({
-                        'mac': client_data['mac'],
-                        'vendor': client_data['vendor']
-                    })
-            return active_clients
+            # Filter entries older than sta_ttl that the next expiry pass
+            # hasn't dropped yet
+            ttl = self.clients.ttl
+            return {mac: tuple(rec.view() for rec in self.clients.clients_for(mac)
+                               if not ttl or now - rec.last_seen < ttl)
+                    for mac in ap_macs}
 
     def deauth(self, bssid, client_mac='FF:FF:FF:FF:FF:FF', channel=None):
         """Send deauthentication packets"""
         # Get channel if not specified
         if channel is None:
-            if bssid.lower() in self.access_points:
-                channel = self.access_points[bssid.lower()].get('channel', 1)
-            else:
-                channel = self.current_channel or 1
+            view = self._ap_table.snapshot.records.get(mac_to_int(bssid))
+            channel = view['channel'] if view is not None else (self.current_channel or 1)
 
         logging.info(f"[PineAP] Deauth: {client_mac} from {bssid} on ch {channel}")
+        # The channel is needed until the client has had time to reconnect
+        self.leases.touch(channel, self.leases.bssid_lease)
 
         # Use PineAP deauth command
         stdout, stderr, rc = self._run_cmd([
@@ -648,37 +921,81 @@ class PineAPBackend:
 
         return rc == 0
 
-    def set_channel(self, channel):
-        """Set specific channel"""
+    def set_channel(self, channel, seconds=None):
+        """Set specific channel, locked for seconds (the time planned on it)
+
+        Setting the locked channel again renews the lock.
+        """
+        self._stop_hopping()
         self.current_channel = channel
-        self.focused_bssid = None
 
         if channel == 0:
             # Resume channel hopping
-            self._run_cmd(['_pineap', 'EXAMINE', 'CANCEL'])
+            self.leases.cancel()
         else:
-            # Lock to channel for 300 seconds (5 min)
-            self._run_cmd(['_pineap', 'EXAMINE', 'CHANNEL', str(channel), '300'])
+            self.leases.lock_channel(channel, seconds)
+        self.focused_bssid = self.leases.bssid
 
         return True
 
-    def focus_bssid(self, bssid):
-        """Focus on specific AP (locks to its channel)"""
+    def restrict_channels(self, channels):
+        """Hop over channels only, channel_dwell seconds each
+
+        pineapd's own hopping covers every channel of its bands, so a
+        thread locks it to each listed channel in turn until the next
+        set_channel(), focus_bssid() or clear_focus().
+        """
+        with self._hop_lock:
+            self._hop_channels = tuple(channels)
+            self.current_channel = 0
+            self.focused_bssid = None
+        self._runtime.every(self.channel_dwell, self._hop_once, 'channel-hop', blocking=True, delay=0)
+        logging.debug(f"[PineAP] Hopping over channels {','.join(map(str, channels))} "
+                      f"({self.channel_dwell}s each)")
+
+    def _stop_hopping(self):
+        # Taking the lock waits out a hop command being sent
+        with self._hop_lock:
+            hopping, self._hop_channels = self._hop_channels, ()
+        if hopping:
+            self._runtime.cancel('channel-hop')
+
+    def _hop_once(self):
+        with self._hop_lock:
+            channels = self._hop_channels
+            if not channels or not self.running:
+                return
+            channel = channels[self._hop_index % len(channels)]
+            self._hop_index += 1
+            # The lock outlives one dwell, so pineapd resumes its own
+            # hopping if the hops stop
+            if self.leases.lock_channel(channel, self.channel_dwell + 2, owner=OWNER_HOP):
+                self.hops += 1
+
+    def focus_bssid(self, bssid, seconds=None):
+        """Focus on specific AP (locks to its channel) for seconds
+
+        Raises FocusConflict if the radio is locked to another channel or
+        another AP keeps its focus.
+        """
+        self._stop_hopping()
+        view = self._ap_table.snapshot.records.get(mac_to_int(bssid))
+        channel = view['channel'] if view is not None else 0
+        self.leases.focus_bssid(bssid, channel, seconds)
         self.focused_bssid = bssid
-        # Lock to BSSID for 300 seconds (5 min)
-        self._run_cmd(['_pineap', 'EXAMINE', 'BSSID', bssid, '300'])
 
         # Update current channel from AP data
-        if bssid.lower() in self.access_points:
-            self.current_channel = self.access_points[bssid.lower()].get('channel', 0)
+        if channel:
+            self.current_channel = channel
 
         return True
 
     def clear_focus(self):
         """Clear channel/BSSID focus, resume hopping"""
+        self._stop_hopping()
         self.focused_bssid = None
         self.current_channel = 0
-        self._run_cmd(['_pineap', 'EXAMINE', 'CANCEL'])
+        self.leases.cancel()
         return True
 
     def get_current_channel(self):
@@ -706,38 +1023,50 @@ class PineAPBackend:
         return '*'
 
     def get_session_data(self):
-        """Return data in bettercap session format"""
-        with self._lock:
-            # Convert our AP dict to bettercap format
-            aps_list = []
-            for mac, ap in self.access_points.items():
-                # Get tracked clients for this AP
-                clients = self._get_clients_for_ap(mac)
-                aps_list.append({
-                    'mac': ap['mac'],
-                    'hostname': ap['hostname'],
-                    'vendor': ap['vendor'],
-                    'channel': ap['channel'],
-                    'rssi': ap['rssi'],
-                    'encryption': ap['encryption'],
-                    'clients': clients,  # Now populated from client tracker!
-                    'first_seen': ap.get('first_seen', ''),
-                    'last_seen': ap.get('last_seen', ''),
-                })
-
-            return {
+        """Return data in bettercap session format
+
+        The session is shared by every caller until the AP table, the
+        client table or the module state changes, and must not be modified.
+        Client statistics alone (frames, rssi, last_active) change with
+        every frame, so those only rebuild it after SESSION_REFRESH seconds.
+        """
+        snapshot = self._ap_table.snapshot
+        clients = self.clients
+        key = (snapshot.generation, clients.generation, clients.ttl, self.running)
+        cached = self._session
+        if cached is not None and cached[0] == key and (
+                cached[1] == clients.updates or time.monotonic() - cached[2] < self.SESSION_REFRESH):
+            self.session_hits += 1
+            return cached[3]
+
+        with self._session_lock:
+            # Another caller may have rebuilt it meanwhile
+            cached = self._session
+            if cached is not None and cached[0] == key and time.monotonic() - cached[2] < self.SESSION_REFRESH:
+                self.session_hits += 1
+                return cached[3]
+            updates = clients.updates
+            # Published AP views with tracked clients added (only APs within
+            # ap.ttl and above rssi.min, see set wifi.*)
+            visible = snapshot.visible()
+            by_ap = self._get_clients_for_aps(mac for mac, _view in visible)
+            session = {
+                'generation': self.session_builds + 1,
                 'wifi': {
-                    'aps': aps_list
+                    'aps': tuple(dict(view, clients=by_ap[mac]) for mac, view in visible)
                 },
-                'interfaces': [
+                'interfaces': (
                     {'name': 'wlan0mon'},
                     {'name': 'wlan1mon'}
-                ],
-                'modules': [
+                ),
+                'modules': (
                     {'name': 'wifi', 'running': self.running},
                     {'name': 'wifi.recon', 'running': self.running}
-                ]
+                )
             }
+            self.session_builds += 1
+            self._session = (key, updates, time.monotonic(), session)
+            return session
 
     def get_next_event(self, timeout=1.0):
         """Get next event from queue (for websocket simulation)"""
@@ -749,7 +1078,7 @@ class PineAPBackend:
     def get_total_handshakes_count(self):
         """Get total number of known handshakes (counting only .22000 files)"""
         # Count only .22000 files since each handshake produces both .22000 and .pcap
-        return len([f for f in self._known_handshakes if f.endswith('.22000')])
+        return self.handshake_watcher.count
 
     def get_latest_handshake(self):
         """Get info about the most recently captured handshake"""
@@ -769,7 +1098,7 @@ class Client:
     """
 
     def __init__(self, hostname='localhost', scheme='http', port=8081,
-                 username='user', password='pass'):
+                 username='user', password='pass', config=None):
         # These params are for compatibility - we use PineAP directly
         self.hostname = hostname
         self.scheme = scheme
@@ -779,15 +1108,16 @@ class Client:
         self.url = f"{scheme}://{hostname}:{port}/api"
         self.websocket = f"ws://{username}:{password}@{hostname}:{port}/api"
 
-        # PineAP backend
+        # PineAP backend (config selects e.g. the recon source)
         self._backend = None
+        self._backend_config = config
         # PineAP saves to /root/loot/handshakes/ by default
         self._handshakes_dir = '/root/loot/handshakes'
 
     def _ensure_backend(self):
         """Lazily initialize backend"""
         if self._backend is None:
-            self._backend = PineAPBackend(handshakes_dir=self._handshakes_dir)
+            self._backend = PineAPBackend(handshakes_dir=self._handshakes_dir, config=self._backend_config)
         return self._backend
 
     def stop(self):
@@ -806,6 +1136,34 @@ class Client:
         backend = self._ensure_backend()
         return backend.get_latest_handshake()
 
+    def captured_before(self, ap):
+        """True if a previous capture of this AP (dict) means it should be skipped"""
+        backend = self._ensure_backend()
+        essid = ap.get('hostname', '')
+        return backend.captured_before(ap['mac'], '' if essid == '<hidden>' else essid)
+
+    def subscribe_handshakes(self, callback):
+        """Call callback(event) with a handshake.new event for each new capture
+        file, handshake.updated when pineapd adds to one"""
+        backend = self._ensure_backend()
+        backend.handshake_watcher.subscribe(callback)
+
+    def handshake_entry(self, filepath):
+        """What a capture file holds ({'ap', 'sta', 'essid', 'types'}), None if unreadable
+
+        The backend catalogs each new file before other subscribers hear
+        of it, so this is normally a lookup rather than a parse.
+        """
+        backend = self._ensure_backend()
+        return backend.handshake_catalog.add(filepath)
+
+    def ap_clients(self, mac):
+        """Client dicts of one AP, as in its session entry (AP delta events
+        don't carry them)"""
+        backend = self._ensure_backend()
+        key = mac_to_int(mac)
+        return list(backend._get_clients_for_aps((key,))[key]) if key is not None else []
+
     def session(self, sess="session"):
         """Return session data in bettercap format"""
         backend = self._ensure_backend()
@@ -817,9 +1175,9 @@ class Client:
 
         Supported commands:
         - wifi.recon on/off
-        - wifi.recon.channel X or wifi.recon.channel clear
+        - wifi.recon.channel X [seconds] or wifi.recon.channel clear
         - wifi.clear
-        - wifi.assoc MAC (focus on AP for PMKID capture)
+        - wifi.assoc MAC [seconds] (focus on AP for PMKID capture)
         - wifi.deauth MAC (send deauth)
         - set wifi.* (configuration)
         - events.* (ignored)
@@ -849,25 +1207,27 @@ class Client:
                     try:
                         channels = [int(c.strip()) for c in channel_arg.split(',')]
                         if len(channels) == 1:
-                            # Single channel - lock to it
-                            backend.set_channel(channels[0])
+                            # Single channel - lock to it (for the seconds given)
+                            backend.set_channel(channels[0], float(parts[2]) if len(parts) > 2 else None)
                         else:
-                            # Multiple channels - let pineapd hop naturally, don't lock
-                            backend.clear_focus()
+                            # Multiple channels - hop over those only
+                            backend.restrict_channels(channels)
                     except ValueError:
                         pass
             return {'success': True}
 
         elif command == 'wifi.clear':
             with backend._lock:
-                backend.access_points.clear()
+                backend._ap_table.clear()
+                backend._ap_table.publish()
             return {'success': True}
 
         elif command.startswith('wifi.assoc'):
-            # Association/PMKID attack - focus on the AP
-            mac = command.replace('wifi.assoc', '').strip()
+            # Association/PMKID attack - focus on the AP [for seconds]
+            args = command.replace('wifi.assoc', '').strip().split()
+            mac = args[0] if args else ''
             if mac:
-                backend.focus_bssid(mac)
+                backend.focus_bssid(mac, float(args[1]) if len(args) > 1 else None)
                 logging.info(f"[PineAP] Focusing on {mac} for PMKID capture")
             return {'success': True}
 
@@ -885,9 +1245,29 @@ class Client:
             if 'handshakes.file' in command or 'handshakes' in command:
                 match = re.search(r'set wifi\.handshakes(?:\.file)?\s+(\S+)', command)
                 if match:
-                    self._handshakes_dir = match.group(1)
+                    # pineapd keeps writing to its own --handshakepath, which
+                    # is what the handshake watcher follows
                     if self._backend:
-                        self._backend.handshakes_dir = self._handshakes_dir
+                        self._backend.pagergotchi_handshakes_dir = match.group(1)
+            elif 'sta.ttl' in command:
+                match = re.search(r'set wifi\.sta\.ttl\s+(\d+)', command)
+                if match and self._backend:
+                    with self._backend._clients_lock:
+                        self._backend.clients.ttl = int(match.group(1))
+            elif 'ap.ttl' in command:
+                match = re.search(r'set wifi\.ap\.ttl\s+(\d+)', command)
+                if match and self._backend:
+                    with self._backend._lock:
+                        self._backend._ap_table.set_lost_after(int(match.group(1)))
+                        self._backend._ap_table.publish()
+            elif 'rssi.min' in command:
+                match = re.search(r'set wifi\.rssi\.min\s+(-?\d+)', command)
+                if match and self._backend:
+                    min_rssi = int(match.group(1))
+                    # bettercap's default of -200 means no floor
+                    with self._backend._lock:
+                        self._backend._ap_table.set_min_rssi(min_rssi if min_rssi > -128 else None)
+                        self._backend._ap_table.publish()
             return {'success': True}
 
         elif command.startswith('events.'):
@@ -919,14 +1299,11 @@ class Client:
 
         while True:
             try:
-                # Check for events (handshake captures, etc.)
-                event = backend.get_next_event(timeout=1.0)
-                if event:
-                    # Send event to consumer as JSON string
-                    await consumer(json.dumps(event))
-
-                # Small delay to prevent tight loop
-                await asyncio.sleep(0.1)
+                # Wait for events (handshake captures, AP deltas, etc.),
+                # woken by the producer rather than polling
+                event = await backend.event_queue.get_async()
+                # Send event to consumer as JSON string
+                await consumer(json.dumps(event))
 
             except Exception as e:
                 logging.debug(f"[bettercap/PineAP] Event loop error: {e}")
@@ -0,0 +1,75 @@
+"""
+Deauth target selection for Pagergotchi
+Orders an AP's client stations by how likely they are to reconnect (and so
+hand over a handshake) right after a deauth, using the activity the client
+tracker records, and leaves out stations that are idle or too weak for
+either our deauth or their reconnect to be heard.
+
+Works on bettercap-style client dicts. Stations without frame statistics
+(recon database only, other backends) are never skipped.
+"""
+
+import time
+
+# Defaults for the [targeting] config section
+DEFAULT_POLICY = {
+    # No data frame for this many seconds (counted from when the station was
+    # first seen if it never sent any) = idle (sleeping phone, parked
+    # laptop); 0 disables the check
+    'client_idle_after': 120,
+    # Stations weaker than this (dBm) are out of range
+    'client_min_rssi': -85,
+}
+
+
+def _active_since(sta):
+    """Last data frame, or first sighting for a station that only sent nulls
+    so far (waking from power save), None if neither is known"""
+    last_active = sta.get('last_active')
+    return last_active if last_active is not None else sta.get('first_seen')
+
+
+def client_skip_reason(sta, policy=None, now=None):
+    """Why a deauth to this station is likely wasted ('idle', 'weak' or '')"""
+    policy = policy or DEFAULT_POLICY
+    rssi = sta.get('rssi')
+    if rssi is not None and rssi < policy.get('client_min_rssi', -85):
+        return 'weak'
+    idle_after = policy.get('client_idle_after', 120)
+    if idle_after and sta.get('frames'):
+        if now is None:
+            now = time.time()
+        since = _active_since(sta)
+        if since is None or now - since > idle_after:
+            return 'idle'
+    return ''
+
+
+def client_score(sta, now=None):
+    """Higher = more likely to reconnect soon after a deauth
+
+    Recent real traffic counts most (a station mid-transfer reconnects at
+    once), then the share of frames that carried data rather than
+    power-save nulls, then signal strength.
+    """
+    frames = sta.get('frames', 0)
+    if not frames:
+        # Nothing known, rank between active and idle stations
+        return 0.0
+    if now is None:
+        now = time.time()
+    since = _active_since(sta)
+    age = now - since if since is not None else 600.0
+    data_share = (frames - sta.get('nulls', 0)) / frames
+    rssi = sta.get('rssi')
+    signal = (rssi + 90) / 2.0 if rssi is not None else 0.0
+    return 60.0 - min(age, 600.0) + 30.0 * data_share + signal
+
+
+def rank_clients(clients, policy=None, now=None):
+    """Clients worth a deauth, best first"""
+    if now is None:
+        now = time.time()
+    ranked = [sta for sta in clients if not client_skip_reason(sta, policy, now)]
+    ranked.sort(key=lambda sta: client_score(sta, now), reverse=True)
+    return ranked
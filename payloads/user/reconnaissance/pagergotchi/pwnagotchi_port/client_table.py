@@ -0,0 +1,104 @@
+"""
+Bounded client station table for the PineAP backend
+Clients are kept in one recency-ordered dict: every sighting moves the
+entry to the end, so the front always holds the station seen longest ago.
+That single ordering drives both TTL expiry (pop from the front while the
+entry is older than ttl) and the hard size cap (evict from the front), so
+memory stays flat however long a wardrive runs.
+"""
+
+from collections import OrderedDict
+
+from pwnagotchi_port.records import ClientRecord
+
+
+class ClientTable:
+    """
+    ClientRecords per AP, keyed by integer MACs.
+
+    generation increases whenever a pair is added or dropped, updates on
+    every sighting (which changes the records' statistics).
+
+    Not thread-safe; the backend guards it with its clients lock.
+    """
+
+    def __init__(self, ttl=300, max_clients=4096):
+        self.ttl = ttl
+        self.max_clients = max_clients
+        self._lru = OrderedDict()  # (ap, sta) -> ClientRecord, oldest sighting first
+        self._by_ap = {}           # ap -> {sta: ClientRecord}
+
+        self.generation = 0
+        self.updates = 0
+
+        # Counters
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._lru)
+
+    def clear(self):
+        self._lru.clear()
+        self._by_ap.clear()
+        self.generation += 1
+
+    def touch(self, ap, sta, now, rssi=None, null=None):
+        """Record a sighting of sta on ap, returns True if the pair is new
+
+        null is None for sightings that aren't frames, otherwise whether the
+        frame was a null data frame (see ClientRecord).
+        """
+        key = (ap, sta)
+        self.updates += 1
+        rec = self._lru.get(key)
+        if rec is not None:
+            rec.last_seen = now
+            if rssi is not None:
+                rec.rssi = rssi
+            self._lru.move_to_end(key)
+            new = False
+        else:
+            rec = ClientRecord(sta, now, rssi=rssi)
+            self._lru[key] = rec
+            self._by_ap.setdefault(ap, {})[sta] = rec
+            while len(self._lru) > self.max_clients:
+                self._drop_oldest()
+                self.evicted += 1
+            self.generation += 1
+            new = True
+        if null is not None:
+            rec.add_frame(now, null)
+        return new
+
+    def expire(self, now):
+        """Drop clients not seen for ttl seconds, returns how many"""
+        count = 0
+        if self.ttl:
+            deadline = now - self.ttl
+            while self._lru:
+                rec = next(iter(self._lru.values()))
+                if rec.last_seen > deadline:
+                    break
+                self._drop_oldest()
+                count += 1
+        if count:
+            self.generation += 1
+        self.expired += count
+        return count
+
+    def clients_for(self, ap):
+        """ClientRecords currently associated with ap"""
+        return list(self._by_ap.get(ap, {}).values())
+
+    def stats(self):
+        return {'clients': len(self._lru), 'aps': len(self._by_ap),
+                'expired': self.expired, 'evicted': self.evicted}
+
+    def _drop_oldest(self):
+        (ap, sta), _rec = self._lru.popitem(last=False)
+        ap_clients = self._by_ap.get(ap)
+        if ap_clients is not None:
+            ap_clients.pop(sta, None)
+            if not ap_clients:
+                del self._by_ap[ap]
@@ -0,0 +1,409 @@
+"""
+Persistent command channel for Pagergotchi
+Keeps one long-lived shell co-process open so the frequent _pineap calls
+(recon polls, deauths, EXAMINE focus changes) don't each pay for a Python
+fork/exec on the Pager's small MIPS CPU.
+
+Requests from different threads share the channel. A request that can't get
+the channel in time (e.g. a deauth while a recon poll is in flight) falls
+back to spawning its own process, as does everything when the shell can't
+be started.
+
+stdout and stderr are kept apart on both paths: the reply is what a
+command prints on stdout, or on stderr if stdout stays empty (_pineap
+prints its data there), so warnings don't end up inside JSON replies.
+"""
+
+import os
+import time
+import shlex
+import codecs
+import select
+import signal
+import logging
+import subprocess
+import threading
+
+
+def stream_command(cmd, timeout=10):
+    """Spawn cmd and yield its stdout as text chunks, or its stderr once it
+    exits if stdout stayed empty
+
+    Stops quietly at the deadline; the process is killed if the consumer
+    stops early or the deadline passes.
+    """
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, bufsize=0)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    deadline = time.monotonic() + timeout
+    out_fd, err_fd = proc.stdout.fileno(), proc.stderr.fileno()
+    fds = [out_fd, err_fd]
+    err = bytearray()
+    printed = False  # anything but whitespace on stdout
+    try:
+        while fds:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logging.warning(f"[CmdChannel] Command timed out: {cmd}")
+                return
+            ready, _, _ = select.select(fds, [], [], remaining)
+            for fd in ready:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    fds.remove(fd)
+                elif fd == err_fd:
+                    err += chunk
+                else:
+                    printed = printed or bool(chunk.strip())
+                    yield decoder.decode(chunk)
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+        if not printed and err:
+            yield err.decode('utf-8', errors='replace')
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def _take_reply(buf, tag):
+    """Cut '<output><tag><rc>\\n' off the front of buf, returns (output, rc)
+    or None while it's incomplete"""
+    idx = buf.find(tag)
+    if idx < 0:
+        return None
+    end = buf.find(b'\n', idx + len(tag))
+    if end < 0:
+        return None
+    output = bytes(buf[:idx])
+    rc = int(buf[idx + len(tag):end])
+    del buf[:end + 1]
+    return output, rc
+
+
+class CommandStats:
+    """Per-command latency counters, keyed by the first two command words"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    @staticmethod
+    def key(cmd):
+        # '_pineap RECON APS format=json' -> '_pineap RECON'
+        return ' '.join(cmd[:2])
+
+    def record(self, cmd, path, elapsed, ok=True):
+        """Record one finished command (path is 'channel' or 'spawn')"""
+        key = self.key(cmd)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = {
+                    'count': 0, 'errors': 0, 'total': 0.0, 'max': 0.0,
+                    'channel': 0, 'spawn': 0,
+                }
+            entry['count'] += 1
+            entry['total'] += elapsed
+            entry['max'] = max(entry['max'], elapsed)
+            entry[path] += 1
+            if not ok:
+                entry['errors'] += 1
+
+    def snapshot(self):
+        """Return {key: {count, errors, avg_ms, max_ms, channel, spawn}}"""
+        with self._lock:
+            return {
+                key: {
+                    'count': e['count'],
+                    'errors': e['errors'],
+                    'avg_ms': e['total'] * 1000.0 / e['count'],
+                    'max_ms': e['max'] * 1000.0,
+                    'channel': e['channel'],
+                    'spawn': e['spawn'],
+                }
+                for key, e in self._stats.items()
+            }
+
+    def summary(self):
+        """One-line summary for the log"""
+        parts = []
+        for key, e in sorted(self.snapshot().items()):
+            parts.append('%s n=%d avg=%.1fms max=%.1fms ch=%d spawn=%d err=%d' % (
+                key, e['count'], e['avg_ms'], e['max_ms'], e['channel'], e['spawn'], e['errors']))
+        return '; '.join(parts) or 'no commands'
+
+
+class CommandChannel:
+    """
+    Long-lived /bin/sh co-process used to run short commands.
+
+    Each request is written to the shell followed by a unique end marker
+    carrying the exit code, printed on both stdout and stderr, so the reply
+    can be framed without spawning anything from Python. The shell leads
+    its own process group: a command that times out is killed along with
+    the shell.
+    """
+
+    SHELL = '/bin/sh'
+    # How long a request waits for a busy channel before spawning instead
+    BUSY_WAIT = 0.5
+    # Give up on the channel after this many consecutive broken shells
+    MAX_FAILURES = 5
+
+    def __init__(self, stats=None):
+        self.stats = stats or CommandStats()
+        self.enabled = True
+        self._proc = None
+        self._buf = bytearray()  # stdout read past the last reply
+        self._err = bytearray()  # ... and stderr
+        self._seq = 0
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    def run(self, cmd, timeout=10):
+        """Run cmd (list of args), returns (output, stderr, returncode)"""
+        start = time.monotonic()
+        result = None
+        path = 'channel'
+        if self.enabled:
+            result = self._run_channel(cmd, timeout)
+        if result is None:
+            path = 'spawn'
+            result = self._run_spawn(cmd, timeout)
+        self.stats.record(cmd, path, time.monotonic() - start, result[2] != -1)
+        return result
+
+    def stream(self, cmd, timeout=10):
+        """Run cmd and yield its output as text chunks while it arrives
+
+        Used for large replies (the full recon AP list) so they can be parsed
+        incrementally instead of being buffered whole.
+        """
+        start = time.monotonic()
+        path = 'channel'
+        ok = True
+        try:
+            if self.enabled and self._lock.acquire(timeout=min(timeout, self.BUSY_WAIT)):
+                try:
+                    ok = yield from self._stream_channel(cmd, timeout)
+                finally:
+                    self._lock.release()
+                if ok is not None:
+                    return
+            path = 'spawn'
+            ok = True
+            try:
+                yield from stream_command(cmd, timeout)
+            except Exception as e:
+                logging.error(f"[CmdChannel] Command error: {e}")
+                ok = False
+        finally:
+            self.stats.record(cmd, path, time.monotonic() - start, bool(ok))
+
+    def close(self):
+        """Terminate the co-process"""
+        with self._lock:
+            self._kill()
+
+    def _run_spawn(self, cmd, timeout):
+        """Fallback: fork a fresh process for this command"""
+        try:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+            # PineAP outputs to stderr, combine both
+            output = result.stdout.strip() or result.stderr.strip()
+            return output, result.stderr.strip(), result.returncode
+        except subprocess.TimeoutExpired:
+            logging.warning(f"[CmdChannel] Command timed out: {cmd}")
+            return '', 'timeout', -1
+        except Exception as e:
+            logging.error(f"[CmdChannel] Command error: {e}")
+            return '', str(e), -1
+
+    def _run_channel(self, cmd, timeout):
+        """Run cmd on the co-process; returns None if the caller should spawn instead"""
+        if not self._lock.acquire(timeout=min(timeout, self.BUSY_WAIT)):
+            return None
+        try:
+            if not self._ensure_proc():
+                return None
+
+            tag = self._send(cmd)
+            reply = self._read_reply(tag, time.monotonic() + timeout)
+            if reply is None:
+                # Shell state is unknown after a timeout, start a fresh one next time
+                logging.warning(f"[CmdChannel] Command timed out: {cmd}")
+                self._kill()
+                return '', 'timeout', -1
+
+            self._failures = 0
+            output, errors, rc = reply
+            output = output.decode('utf-8', errors='replace').strip()
+            errors = errors.decode('utf-8', errors='replace').strip()
+            return output or errors, errors, rc
+
+        except (OSError, ValueError) as e:
+            logging.debug(f"[CmdChannel] Channel error, falling back to spawn: {e}")
+            self._kill()
+            self._failures += 1
+            if self._failures >= self.MAX_FAILURES:
+                logging.warning("[CmdChannel] Too many channel failures, using spawn path only")
+                self.enabled = False
+            return None
+        finally:
+            self._lock.release()
+
+    def _stream_channel(self, cmd, timeout):
+        """Generator body for stream() on the co-process (caller holds the lock)
+
+        Returns True when the reply completed, False on timeout and None if
+        nothing was sent and the caller should spawn instead.
+        """
+        try:
+            if not self._ensure_proc():
+                return None
+            tag = self._send(cmd)
+        except (OSError, ValueError) as e:
+            logging.debug(f"[CmdChannel] Channel error, falling back to spawn: {e}")
+            self._kill()
+            return None
+
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        deadline = time.monotonic() + timeout
+        done = False
+        output = None  # (stdout, rc) once stdout is complete
+        printed = False  # anything but whitespace on stdout
+        try:
+            while True:
+                if output is None:
+                    output = _take_reply(self._buf, tag)
+                    if output is not None:
+                        data = output[0]
+                    else:
+                        # Hand over everything that can't be part of the end marker
+                        data = bytes(self._buf[:max(0, len(self._buf) - len(tag))])
+                        del self._buf[:len(data)]
+                    printed = printed or bool(data.strip())
+                    out = decoder.decode(data, final=output is not None)
+                    if out:
+                        yield out
+                if output is not None:
+                    errors = _take_reply(self._err, tag)
+                    if errors is not None:
+                        done = True
+                        self._failures = 0
+                        if not printed and errors[0]:
+                            yield errors[0].decode('utf-8', errors='replace')
+                        return True
+
+                if not self._fill(deadline):
+                    logging.warning(f"[CmdChannel] Command timed out: {cmd}")
+                    return False
+        except (OSError, ValueError) as e:
+            logging.debug(f"[CmdChannel] Channel error: {e}")
+            return False
+        finally:
+            # Timed out, failed or abandoned by the consumer: the shell is
+            # mid-reply, so start a fresh one next time
+            if not done:
+                self._kill()
+
+    def _ensure_proc(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return True
+        self._kill()
+        try:
+            self._proc = subprocess.Popen(
+                [self.SHELL],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=0,
+                start_new_session=True
+            )
+            self._buf = bytearray()
+            self._err = bytearray()
+            logging.debug(f"[CmdChannel] Started co-process (PID: {self._proc.pid})")
+            return True
+        except Exception as e:
+            logging.warning(f"[CmdChannel] Could not start {self.SHELL}: {e}")
+            self._proc = None
+            self.enabled = False
+            return False
+
+    def _send(self, cmd):
+        """Write cmd plus its end markers to the shell, returns the reply tag to wait for"""
+        self._seq += 1
+        marker = '__pg_done_%d__' % self._seq
+        line = '%s </dev/null; pg_rc=$?; printf "\\n%s %%d\\n" $pg_rc; printf "\\n%s %%d\\n" $pg_rc >&2\n' % (
+            ' '.join(shlex.quote(str(c)) for c in cmd), marker, marker)
+        self._proc.stdin.write(line.encode())
+        self._proc.stdin.flush()
+        return b'\n' + marker.encode() + b' '
+
+    def _read_reply(self, tag, deadline):
+        """Read until both stdout and stderr end in '\\n<marker> <rc>\\n',
+        returns (output_bytes, error_bytes, rc) or None on timeout"""
+        output = None
+        while True:
+            if output is None:
+                output = _take_reply(self._buf, tag)
+            if output is not None:
+                errors = _take_reply(self._err, tag)
+                if errors is not None:
+                    return output[0], errors[0], output[1]
+            if not self._fill(deadline):
+                return None
+
+    def _fill(self, deadline):
+        """Read what the shell printed on stdout or stderr into the buffers,
+        waiting until deadline for something; False on timeout"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        out_fd, err_fd = self._proc.stdout.fileno(), self._proc.stderr.fileno()
+        ready, _, _ = select.select([out_fd, err_fd], [], [], remaining)
+        if not ready:
+            return False
+        for fd in ready:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise OSError('co-process exited')
+            if fd == out_fd:
+                self._buf += chunk
+            else:
+                self._err += chunk
+        return True
+
+    def _kill(self):
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            # The shell and whatever it is running
+            os.killpg(self._proc.pid, signal.SIGKILL)
+        except Exception:
+            pass
+        try:
+            self._proc.wait(timeout=1)
+        except Exception:
+            pass
+        for pipe in (self._proc.stdout, self._proc.stderr):
+            try:
+                pipe.close()
+            except Exception:
+                pass
+        self._proc = None
+        self._buf = bytearray()
+        self._err = bytearray()
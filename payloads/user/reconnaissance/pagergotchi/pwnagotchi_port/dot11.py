@@ -0,0 +1,203 @@
+"""
+Minimal pcap / radiotap / 802.11 parsing for the client tracker
+Reads `tcpdump -w -` output and pulls the addresses, ToDS/FromDS roles and
+signal strength straight out of the frame headers, instead of running
+regexes over tcpdump's text output for every frame.
+"""
+
+import struct
+
+LINKTYPE_IEEE802_11 = 105
+LINKTYPE_RADIOTAP = 127
+
+_PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': '<',  # microsecond timestamps
+    b'\x4d\x3c\xb2\xa1': '<',  # nanosecond timestamps
+    b'\xa1\xb2\xc3\xd4': '>',
+    b'\xa1\xb2\x3c\x4d': '>',
+}
+
+# Radiotap fields before dBm antenna signal (bit 5): (alignment, size)
+_RADIOTAP_FIELDS = ((8, 8), (1, 1), (1, 1), (2, 4), (1, 2))
+_RT_ANTSIGNAL = 1 << 5
+_RT_EXT = 1 << 31
+
+FRAME_TYPE_DATA = 2
+# Data subtypes 4-7 and 12-15 (Null, CF-Ack/Poll without data, QoS Null...)
+_SUBTYPE_NO_DATA = 0x40
+
+
+class PcapError(ValueError):
+    pass
+
+
+class PcapReader:
+    """
+    Iterates (timestamp, frame bytes) from a binary pcap stream.
+
+    Only radiotap and bare 802.11 link types are accepted; for radiotap the
+    frames still start with the radiotap header (see parse_frame).
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        header = self._read(24)
+        if header is None:
+            raise PcapError('no pcap header')
+        endian = _PCAP_MAGIC.get(header[:4])
+        if endian is None:
+            raise PcapError('bad pcap magic %r' % header[:4])
+        self._record = struct.Struct(endian + 'IIII')
+        self.linktype = struct.unpack(endian + 'I', header[20:24])[0] & 0x0FFFFFFF
+        if self.linktype not in (LINKTYPE_RADIOTAP, LINKTYPE_IEEE802_11):
+            raise PcapError('unsupported link type %d' % self.linktype)
+        self.radiotap = self.linktype == LINKTYPE_RADIOTAP
+
+    def _read(self, size):
+        data = self._stream.read(size)
+        if not data:
+            return None
+        while len(data) < size:
+            more = self._stream.read(size - len(data))
+            if not more:
+                return None
+            data += more
+        return data
+
+    def __iter__(self):
+        size = self._record.size
+        while True:
+            header = self._read(size)
+            if header is None:
+                return
+            ts_sec, _ts_frac, incl_len, _orig_len = self._record.unpack(header)
+            data = self._read(incl_len) if incl_len else b''
+            if data is None:
+                return
+            yield ts_sec, data
+
+
+def parse_radiotap(data):
+    """Return (header length, dBm signal or None) for a radiotap header"""
+    if len(data) < 8:
+        return None, None
+    length = data[2] | (data[3] << 8)
+    present = int.from_bytes(data[4:8], 'little')
+
+    # Skip extended presence bitmaps; fields start after the last one
+    pos = 8
+    word = present
+    while word & _RT_EXT and pos + 4 <= length:
+        word = int.from_bytes(data[pos:pos + 4], 'little')
+        pos += 4
+
+    if not present & _RT_ANTSIGNAL:
+        return length, None
+    for bit, (align, size) in enumerate(_RADIOTAP_FIELDS):
+        if present & (1 << bit):
+            pos = (pos + align - 1) & ~(align - 1)
+            pos += size
+    if pos >= length:
+        return length, None
+    signal = data[pos]
+    return length, signal - 256 if signal > 127 else signal
+
+
+def parse_frame(data, radiotap=True):
+    """Extract (bssid, station, rssi, from_station, null) from an 802.11 data frame
+
+    MACs are 48-bit ints. The station is None for frames between an AP and
+    a group address, and rssi is None without radiotap signal info. null is
+    True for (QoS) null data frames, which carry no payload. Returns None for
+    non-data frames, WDS (4-address) frames and truncated input.
+    """
+    rssi = None
+    if radiotap:
+        offset, rssi = parse_radiotap(data)
+        if offset is None:
+            return None
+    else:
+        offset = 0
+    if len(data) < offset + 22:
+        return None
+
+    fc = data[offset]
+    if (fc >> 2) & 0x3 != FRAME_TYPE_DATA:
+        return None
+    null = bool(fc & _SUBTYPE_NO_DATA)
+    flags = data[offset + 1]
+    to_ds = flags & 0x1
+    from_ds = flags & 0x2
+
+    addr1 = int.from_bytes(data[offset + 4:offset + 10], 'big')
+    addr2 = int.from_bytes(data[offset + 10:offset + 16], 'big')
+    addr3 = int.from_bytes(data[offset + 16:offset + 22], 'big')
+
+    if to_ds and not from_ds:
+        # Station -> AP: addr1 = BSSID, addr2 = station
+        bssid, station, from_station = addr1, addr2, True
+    elif from_ds and not to_ds:
+        # AP -> station: addr1 = station (or group), addr2 = BSSID
+        bssid, station, from_station = addr2, addr1, False
+    elif not to_ds:
+        # IBSS / direct link: addr2 = transmitter, addr3 = BSSID
+        bssid, station, from_station = addr3, addr2, True
+    else:
+        return None
+
+    # Group addresses (I/G bit) are never stations
+    if (station >> 40) & 1 or station == bssid:
+        station = None
+    return bssid, station, rssi, from_station, null
+
+
+# Unicast data only: drop 4-address frames and frames to group addresses
+# (ff:ff:.., 01:.., 33:33:..) unless a station is sending them to its AP
+_BASE_FILTER = 'type data and not dir dstods and (dir tods or wlan[4] & 1 = 0)'
+
+
+def tracker_filter(bssids=()):
+    """BPF filter for the client tracker, optionally limited to some BSSIDs (ints)"""
+    if not bssids:
+        return _BASE_FILTER
+    terms = []
+    for bssid in sorted(bssids):
+        mac = ':'.join('%02x' % b for b in bssid.to_bytes(6, 'big'))
+        # BSSID is addr1 in frames to the AP, addr2 in frames from it and
+        # addr3 in IBSS (ad-hoc) frames, see parse_frame()
+        terms.append('wlan addr1 %s or wlan addr2 %s or wlan addr3 %s' % (mac, mac, mac))
+    return '%s and (%s)' % (_BASE_FILTER, ' or '.join(terms))
+
+
+class FrameSampler:
+    """
+    Per-second admission control for tracked frames.
+
+    Below threshold frames per second everything is processed; above it
+    only the first per_pair frames of each (AP, station) pair in that second
+    are, which is all the tracker needs to refresh last_seen and RSSI.
+    """
+
+    def __init__(self, threshold=300, per_pair=3):
+        self.threshold = threshold
+        self.per_pair = per_pair
+        self.frames = 0      # frames offered
+        self.sampled = 0     # frames skipped by sampling
+        self._second = None
+        self._count = 0
+        self._pairs = {}
+
+    def admit(self, second, pair):
+        """True if a frame for pair captured in (integer) second should be processed"""
+        self.frames += 1
+        if second != self._second:
+            self._second = second
+            self._count = 0
+            self._pairs.clear()
+        self._count += 1
+        seen = self._pairs.get(pair, 0) + 1
+        self._pairs[pair] = seen
+        if self._count <= self.threshold or seen <= self.per_pair:
+            return True
+        self.sampled += 1
+        return False
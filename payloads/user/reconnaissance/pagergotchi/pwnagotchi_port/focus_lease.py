@@ -0,0 +1,311 @@
+"""
+Focus leases for pineapd's EXAMINE locks
+_pineap EXAMINE CHANNEL/BSSID parks the radio for as long as asked and
+stops pineapd's own hopping meanwhile, so a lock that outlives what the
+agent is doing costs recon of every other channel. Each lock here is a
+lease sized to what is planned on it: attacks and the dwell on a channel,
+the wait for a PMKID on a BSSID. It is renewed while it is used and
+cancelled as soon as the agent moves on.
+
+A BSSID lease sits on top of the channel lease for its channel; when it
+ends, the channel lock is put back. Focusing on an AP on another channel
+than the one locked is refused, and a second AP on the same channel waits
+for the first one's lease to end.
+
+Lock time nobody used (after the last attack or dwell the lease covered)
+is counted as idle.
+
+The EXAMINE commands a change needs are queued under the lock and sent, in
+order, after it is released: a slow _pineap call doesn't hold up the other
+threads deciding what to lock. A focus ends on a runtime loop timer.
+"""
+
+import math
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from pwnagotchi_port.runtime import get_runtime
+
+CHANNEL = 'channel'
+BSSID = 'bssid'
+
+# Lower priority than the agent: its locks never replace the agent's
+OWNER_HOP = 'hop'
+OWNER_AGENT = 'agent'
+
+
+class FocusConflict(Exception):
+    pass
+
+
+class Lease:
+    __slots__ = ('kind', 'target', 'channel', 'owner', 'start', 'until', 'used_until')
+
+    def __init__(self, kind, target, channel, owner, start, until, used_until):
+        self.kind = kind
+        self.target = target
+        self.channel = channel
+        self.owner = owner
+        self.start = start
+        self.until = until
+        self.used_until = used_until
+
+    def remaining(self, now):
+        return max(0.0, self.until - now)
+
+
+class FocusLeases:
+    """
+    The radio's EXAMINE state, run through run(command list).
+
+    Thread-safe: dispatcher workers focus on APs while the main loop moves
+    between channels and the restricted hopper (bettercap.py) locks
+    channels in turn. A call that changes the lock returns once its
+    commands have been sent.
+    """
+
+    # Seconds left on a lease below which a touch renews it
+    RENEW_MARGIN = 2.0
+
+    def __init__(self, run, channel_lease=30.0, bssid_lease=2.0, clock=time.monotonic, runtime=None):
+        self._run = run
+        self.channel_lease = channel_lease
+        self.bssid_lease = bssid_lease
+        self._clock = clock
+        self._runtime = runtime  # for the focus end timer, get_runtime() if None
+        self._base = None   # channel lease
+        self._focus = None  # BSSID lease on top of it
+        self._timed = None  # lease a focus end timer is pending for
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        # Commands to send, in order; queued and sent count them
+        self._commands = deque()
+        self._queued = 0
+        self._sent = 0
+        self._sending = False
+
+        # Counters
+        self.held = 0.0     # seconds locked
+        self.idle = 0.0     # ... of which nothing used the lock
+        self.granted = 0
+        self.renewed = 0
+        self.rejected = 0
+
+    @property
+    def channel(self):
+        """Locked channel, 0 when pineapd hops"""
+        with self._changing() as now:
+            self._expire(now)
+            lease = self._focus or self._base
+            return lease.channel if lease is not None else 0
+
+    @property
+    def bssid(self):
+        with self._changing() as now:
+            self._expire(now)
+            return self._focus.target if self._focus is not None else None
+
+    def lock_channel(self, channel, seconds=None, owner=OWNER_AGENT):
+        """Lock channel for seconds (the planned time on it), False if refused
+
+        Locking the channel already held by the same owner only extends the
+        lease; locking another channel ends the current leases.
+        """
+        seconds = seconds or self.channel_lease
+        with self._changing() as now:
+            self._expire(now)
+            base = self._base
+            if owner == OWNER_HOP and (self._focus is not None or
+                                       (base is not None and base.owner != OWNER_HOP)):
+                self.rejected += 1
+                return False
+            if base is not None and base.channel == channel and base.owner == owner:
+                # Renewing is using it (the dwell after attacks)
+                base.used_until = max(base.used_until, now + seconds)
+                self._extend(base, now, seconds)
+            else:
+                if self._focus is not None and self._focus.channel != channel:
+                    # The channel lock it sits on is replaced below
+                    self._finish_focus(now, restore=False)
+                if base is not None:
+                    self._end(base, now)
+                # Hopper locks are used for as long as they last
+                used = now + seconds if owner == OWNER_HOP else now
+                self._base = Lease(CHANNEL, channel, channel, owner, now, now + seconds, used)
+                self.granted += 1
+                if self._focus is None:
+                    self._examine(CHANNEL, channel, seconds)
+        return True
+
+    def focus_bssid(self, bssid, channel, seconds=None, wait=None):
+        """Lock on bssid (on channel) for seconds, raises FocusConflict if refused
+
+        Waits up to wait seconds (default: one BSSID lease) for another
+        AP's lease on the same channel to end.
+        """
+        seconds = seconds or self.bssid_lease
+        wait = self.bssid_lease if wait is None else wait
+        with self._changing() as now:
+            deadline = now + wait
+            while True:
+                now = self._clock()
+                self._expire(now)
+                focus, base = self._focus, self._base
+                if base is not None and base.owner != OWNER_HOP and channel and base.channel != channel:
+                    self.rejected += 1
+                    raise FocusConflict("channel %d is locked, %s is on %d" % (base.channel, bssid, channel))
+                if focus is None or focus.target == bssid:
+                    break
+                if focus.channel != channel or now >= deadline:
+                    self.rejected += 1
+                    raise FocusConflict("focused on %s until it gets a PMKID" % focus.target)
+                self._changed.wait(min(deadline, focus.until) - now)
+
+            if focus is not None:
+                self._extend(focus, now, seconds)
+            else:
+                if base is not None and base.owner == OWNER_HOP:
+                    # The hopper's lock gives way to attacks
+                    self._end(base, now)
+                    self._base = None
+                self._focus = Lease(BSSID, bssid, channel, OWNER_AGENT, now, now + seconds, now + seconds)
+                self.granted += 1
+                self._examine(BSSID, bssid, seconds)
+                self._schedule(self._focus)
+
+    def touch(self, channel, seconds=0.0):
+        """Something is sent on channel and needs it for seconds more:
+        record the use and renew the channel lease if it would run out"""
+        with self._changing() as now:
+            self._expire(now)
+            lease = self._base
+            if lease is not None and lease.channel == channel:
+                lease.used_until = max(lease.used_until, now + seconds)
+                if lease.remaining(now) < seconds + self.RENEW_MARGIN:
+                    self._extend(lease, now, seconds + self.RENEW_MARGIN)
+
+    def cancel(self):
+        """End every lease, pineapd hops again"""
+        with self._changing() as now:
+            self._expire(now)
+            if self._focus is not None:
+                self._finish_focus(now, restore=False)
+            if self._base is not None:
+                self._end(self._base, now)
+                self._base = None
+            self._queue(['_pineap', 'EXAMINE', 'CANCEL'])
+
+    def stats(self):
+        with self._lock:
+            return {'held': round(self.held, 1), 'idle': round(self.idle, 1), 'granted': self.granted,
+                    'renewed': self.renewed, 'rejected': self.rejected}
+
+    @contextmanager
+    def _changing(self):
+        """Hold the lock (yields the time); commands queued meanwhile are
+        sent once it's released, even if the change raised"""
+        self._lock.acquire()
+        start = self._queued
+        try:
+            yield self._clock()
+        finally:
+            target = self._queued
+            self._lock.release()
+            if target > start:
+                self._flush(target)
+
+    def _examine(self, kind, target, seconds):
+        # pineapd takes whole seconds
+        self._queue(['_pineap', 'EXAMINE', kind.upper(), str(target), str(max(1, int(math.ceil(seconds))))])
+
+    def _queue(self, command):
+        """Queue a command (lock held), sent by _flush()"""
+        self._commands.append(command)
+        self._queued += 1
+
+    def _flush(self, target):
+        """Send the queued commands in order, without the lock held; returns
+        once the first target commands have been sent (by this thread or the
+        one already sending)"""
+        with self._lock:
+            while self._sending and self._sent < target:
+                self._changed.wait()
+            if self._sent >= target:
+                return
+            self._sending = True
+        try:
+            while True:
+                with self._lock:
+                    if not self._commands:
+                        return
+                    command = self._commands.popleft()
+                try:
+                    self._run(command)
+                except Exception as e:
+                    logging.debug(f"[Focus] {' '.join(command)} failed: {e}")
+                with self._lock:
+                    self._sent += 1
+                    self._changed.notify_all()
+        finally:
+            with self._lock:
+                self._sending = False
+                self._changed.notify_all()
+
+    def _extend(self, lease, now, seconds):
+        if now + seconds <= lease.until:
+            return
+        lease.until = now + seconds
+        if lease.kind == BSSID:
+            lease.used_until = lease.until
+            self._schedule(lease)
+        self.renewed += 1
+        if lease is self._focus or self._focus is None:
+            self._examine(lease.kind, lease.target, seconds)
+
+    def _end(self, lease, now):
+        end = min(now, lease.until)
+        self.held += max(0.0, end - lease.start)
+        self.idle += max(0.0, end - max(lease.start, lease.used_until))
+
+    def _expire(self, now):
+        if self._focus is not None and self._focus.until <= now:
+            self._finish_focus(now)
+        if self._base is not None and self._base.until <= now:
+            self._end(self._base, now)
+            self._base = None
+
+    def _finish_focus(self, now, restore=True):
+        self._end(self._focus, now)
+        self._focus = None
+        self._changed.notify_all()
+        base = self._base
+        if restore and base is not None and base.until > now:
+            # Back to the channel lock (pineapd hops again once the BSSID lock ends)
+            self._examine(CHANNEL, base.channel, base.until - now)
+
+    def _schedule(self, lease):
+        """End lease when it runs out (a timer that finds it renewed, or fires
+        early, schedules the next check)"""
+        if self._timed is lease:
+            return
+        self._timed = lease
+        if self._runtime is None:
+            self._runtime = get_runtime()
+        runtime = self._runtime
+        delay = max(0.0, lease.until - self._clock())
+        runtime.call_soon(runtime.loop.call_later, delay, runtime.submit, self._on_focus_end, lease)
+
+    def _on_focus_end(self, lease):
+        """Runtime pool: restore the channel lock once the focus has run out"""
+        with self._changing() as now:
+            if self._timed is lease:
+                self._timed = None
+            if self._focus is not lease:
+                return
+            if lease.until <= now:
+                self._finish_focus(now)
+            else:
+                self._schedule(lease)
@@ -0,0 +1,68 @@
+"""
+Session handshake bookkeeping for the agent
+Handshakes seen this session (and restored from recovery data), indexed by
+AP MAC and by (AP, station) pair so the per-target checks before every
+association and deauth are exact dict lookups.
+"""
+
+from pwnagotchi_port.records import mac_to_int, format_mac
+
+
+class HandshakeBook:
+    """
+    Handshake events keyed by integer MACs.
+
+    The station is None when it isn't known (PineAP captures don't name
+    it). Recovery data keeps the original "sta -> ap" string keys.
+    """
+
+    def __init__(self):
+        self._pairs = {}  # (ap, sta) -> event
+        self._by_ap = {}  # ap -> {sta, ...}
+
+    def __len__(self):
+        return len(self._pairs)
+
+    @staticmethod
+    def _key(ap, sta):
+        return mac_to_int(ap), mac_to_int(sta) if sta else None
+
+    def record(self, ap, sta, event):
+        """Store a handshake, returns False if this (AP, station) pair was known"""
+        key = self._key(ap, sta)
+        if key in self._pairs:
+            return False
+        self._pairs[key] = event
+        self._by_ap.setdefault(key[0], set()).add(key[1])
+        return True
+
+    def has_ap(self, ap):
+        """True if any handshake was captured for this AP"""
+        return mac_to_int(ap) in self._by_ap
+
+    def has_pair(self, ap, sta):
+        """True if a handshake was captured for exactly this AP and station"""
+        return self._key(ap, sta) in self._pairs
+
+    def get(self, ap, sta, default=None):
+        return self._pairs.get(self._key(ap, sta), default)
+
+    def stations(self, ap):
+        """Stations (int MACs, None if unknown) with a handshake for this AP"""
+        return set(self._by_ap.get(mac_to_int(ap), ()))
+
+    def to_dict(self):
+        """{"sta -> ap": event} for the recovery file"""
+        return {
+            '%s -> %s' % (format_mac(sta, upper=False) if sta is not None else 'unknown',
+                          format_mac(ap, upper=False) if ap is not None else ''): event
+            for (ap, sta), event in self._pairs.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        book = cls()
+        for key, event in (data or {}).items():
+            sta, _, ap = key.partition(' -> ')
+            book.record(ap, sta, event)
+        return book
@@ -0,0 +1,200 @@
+"""
+Persistent handshake catalog for Pagergotchi
+Remembers what every .22000 file in the loot directory contains (AP and
+station MAC, ESSID, hash types) together with its size and mtime, so startup
+only has to parse files that are new or changed since the last run instead
+of opening years of captures every time.
+
+Stored as JSON in data/handshakes.json; a missing or corrupt catalog is
+simply rebuilt from the files.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PAYLOAD_DIR = os.path.abspath(os.path.join(_THIS_DIR, '..'))
+DATA_DIR = os.path.join(PAYLOAD_DIR, 'data')
+CATALOG_FILE = os.path.join(DATA_DIR, 'handshakes.json')
+
+CATALOG_VERSION = 1
+
+# hashcat 22000 hash types
+HASH_PMKID = 1
+HASH_EAPOL = 2
+
+
+def parse_22000(filepath):
+    """Read a hashcat .22000 file
+
+    Returns {'ap', 'sta', 'essid', 'types'}: MACs as 12 lowercase hex digits
+    from the first hash line, ESSID from the first line that has one and the
+    sorted hash types found (1 = PMKID, 2 = EAPOL). Raises OSError if the file
+    can't be read.
+    """
+    ap = sta = essid = ''
+    types = set()
+    with open(filepath, 'r', errors='replace') as f:
+        for line in f:
+            # Format: WPA*TYPE*PMKID/MIC*MAC_AP*MAC_STA*ESSID_HEX*...
+            if not line.startswith('WPA*'):
+                continue
+            parts = line.split('*')
+            if len(parts) < 6:
+                continue
+            try:
+                types.add(int(parts[1]))
+            except ValueError:
+                pass
+            if not ap:
+                ap = parts[3].lower()
+                sta = parts[4].lower()
+            if not essid and parts[5]:
+                try:
+                    essid = bytes.fromhex(parts[5]).decode('utf-8', errors='ignore')
+                except ValueError:
+                    pass
+    return {'ap': ap, 'sta': sta, 'essid': essid, 'types': sorted(types)}
+
+
+class HandshakeCatalog:
+    """
+    Capture file path -> {size, mtime, ap, sta, essid, types}.
+
+    sync() reconciles the catalog with the files currently on disk and
+    writes it back if something changed. add() records a single new
+    capture in memory only; the owner calls save() now and then (rewriting
+    thousands of entries per capture would be wasteful).
+    """
+
+    def __init__(self, path=CATALOG_FILE):
+        self.path = path
+        self._entries = {}
+        self._dirty = False
+        # add() runs on the handshake watcher thread
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, filepath):
+        return filepath in self._entries
+
+    def get(self, filepath, default=None):
+        return self._entries.get(filepath, default)
+
+    def items(self):
+        with self._lock:
+            return list(self._entries.items())
+
+    def load(self):
+        """Read the catalog from disk, starting empty if it's missing or corrupt"""
+        self._entries = {}
+        try:
+            with open(self.path, 'rt') as fp:
+                data = json.load(fp)
+            if data.get('version') != CATALOG_VERSION:
+                raise ValueError('version %r' % data.get('version'))
+            for filepath, row in data['files'].items():
+                size, mtime, ap, sta, essid, types = row
+                self._entries[filepath] = {
+                    'size': int(size), 'mtime': int(mtime), 'ap': str(ap), 'sta': str(sta),
+                    'essid': str(essid), 'types': [int(t) for t in types],
+                }
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.warning(f"[HandshakeCatalog] Rebuilding unreadable catalog {self.path}: {e}")
+            self._entries = {}
+            self._dirty = True
+
+    def save(self):
+        """Write the catalog if it changed (atomically, so a crash can't truncate it)"""
+        with self._lock:
+            if self._dirty:
+                self._write()
+
+    def _write(self):
+        tmp = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, 'w') as fp:
+                json.dump({
+                    'version': CATALOG_VERSION,
+                    'files': {
+                        filepath: [e['size'], e['mtime'], e['ap'], e['sta'], e['essid'], e['types']]
+                        for filepath, e in self._entries.items()
+                    },
+                }, fp, separators=(',', ':'))
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except Exception as e:
+            logging.error(f"[HandshakeCatalog] Failed to save {self.path}: {e}")
+
+    def _stat_entry(self, filepath, st):
+        """Parse filepath into a fresh entry, None if it can't be read"""
+        try:
+            entry = parse_22000(filepath)
+        except OSError as e:
+            logging.debug(f"[HandshakeCatalog] Error reading {filepath}: {e}")
+            return None
+        entry['size'] = st.st_size
+        entry['mtime'] = st.st_mtime_ns
+        return entry
+
+    def add(self, filepath):
+        """Record one capture file, returns its entry (None if unreadable)"""
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        entry = self._entries.get(filepath)
+        if entry is None or entry['size'] != st.st_size or entry['mtime'] != st.st_mtime_ns:
+            entry = self._stat_entry(filepath, st)
+            if entry is None:
+                return None
+            with self._lock:
+                self._entries[filepath] = entry
+                self._dirty = True
+        return entry
+
+    def sync(self, filepaths):
+        """Make the catalog match filepaths, parsing only new or changed files
+
+        Returns (parsed, reused, removed) counts.
+        """
+        start = time.monotonic()
+        parsed = reused = 0
+        current = set()
+        for filepath in filepaths:
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                continue
+            current.add(filepath)
+            entry = self._entries.get(filepath)
+            if entry is not None and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime_ns:
+                reused += 1
+                continue
+            entry = self._stat_entry(filepath, st)
+            if entry is None:
+                current.discard(filepath)
+                continue
+            self._entries[filepath] = entry
+            self._dirty = True
+            parsed += 1
+
+        with self._lock:
+            removed = [filepath for filepath in self._entries if filepath not in current]
+            for filepath in removed:
+                del self._entries[filepath]
+            if removed:
+                self._dirty = True
+            self.save()
+        logging.info("[HandshakeCatalog] %d files (%d parsed, %d cached, %d removed) in %.0fms",
+                     len(self._entries), parsed, reused, len(removed),
+                     (time.monotonic() - start) * 1000)
+        return parsed, reused, len(removed)
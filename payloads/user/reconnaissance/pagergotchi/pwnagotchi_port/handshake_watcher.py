@@ -0,0 +1,279 @@
+"""
+Handshake directory watcher for Pagergotchi
+pineapd's handshake directory is watched with inotify (through ctypes, no
+extra packages), its fd registered with the shared runtime's event loop, and
+a handshake.new event is published for every finished capture file, instead
+of several threads globbing the loot directory on their own timers. pineapd
+appends to a file it already wrote (a PMKID capture gaining an EAPOL line),
+which is published as handshake.updated.
+
+If inotify isn't available, or the directory can't be watched, it falls
+back to polling: the directory is only listed when its mtime changes, and
+the known files are stat'ed every poll, an append being a new size or
+mtime that the directory's own mtime doesn't show.
+"""
+
+import os
+import errno
+import struct
+import logging
+import threading
+
+from pwnagotchi_port.runtime import get_runtime
+
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
+# inotify flags (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+_EVENT = struct.Struct('iIII')
+
+_libc = None
+
+
+def _load_libc():
+    """libc with the inotify calls, or None"""
+    global _libc
+    if _libc is None:
+        _libc = False
+        if ctypes is not None:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+                libc.inotify_init1.argtypes = [ctypes.c_int]
+                libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+                _libc = libc
+            except (OSError, AttributeError):
+                pass
+    return _libc or None
+
+
+class HandshakeWatcher:
+    """
+    Watches a directory for new capture files.
+
+    Subscribers are called as callback(event), in the order they
+    subscribed, on a runtime pool thread (they parse files) with
+    {'tag': 'handshake.new', 'data': {'file': path}} for each new file
+    ending in suffix, or tag 'handshake.updated' when a known file is
+    written again. Files present at start() are known, not new.
+    """
+
+    # Seconds between directory and file checks in poll mode, and between
+    # attempts to (re)establish the inotify watch
+    POLL_INTERVAL = 2.0
+
+    def __init__(self, directory, suffix='.22000'):
+        self.directory = directory
+        self.suffix = suffix
+        self.running = False
+        self._known = {}  # file name (not path) -> (size, mtime_ns), None until polled
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._runtime = None
+        self._fd = -1
+        self._mtime = None
+        self.mode = 'stopped'
+
+    @property
+    def count(self):
+        """Number of capture files currently in the directory"""
+        return len(self._known)
+
+    def known_files(self):
+        """Paths of the capture files currently in the directory"""
+        with self._lock:
+            names = list(self._known)
+        return [os.path.join(self.directory, name) for name in names]
+
+    def subscribe(self, callback):
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def scan_existing(self):
+        """Record the files already in the directory without publishing them"""
+        self._rescan(publish=False)
+
+    def start(self, runtime=None):
+        if self.running:
+            return
+        self.running = True
+        self._runtime = runtime or get_runtime()
+        self._rescan(publish=False)
+        self._runtime.every(self.POLL_INTERVAL, self._check, 'handshake-watcher', delay=0)
+
+    def stop(self):
+        self.running = False
+        if self._runtime is not None:
+            self._runtime.cancel('handshake-watcher')
+            self._runtime.call_soon(self._unwatch)
+        self.mode = 'stopped'
+
+    def _check(self):
+        """Runtime timer: set up the inotify watch, or poll while there is none"""
+        if not self.running or self._fd >= 0:
+            return
+        try:
+            if self._open_inotify():
+                self.mode = 'inotify'
+                self._runtime.add_reader(self._fd, self._on_readable)
+                # Nothing to do on a timer while the watch is up
+                self._runtime.cancel('handshake-watcher')
+            else:
+                self.mode = 'poll'
+                self._poll_once()
+        except Exception as e:
+            logging.debug(f"[HandshakeWatcher] Error: {e}")
+            self._unwatch()
+
+    def _unwatch(self):
+        if self._fd >= 0:
+            self._runtime.remove_reader(self._fd)
+        self._close_inotify()
+
+    def _open_inotify(self):
+        if self._fd >= 0:
+            return True
+        libc = _load_libc()
+        if libc is None or not os.path.isdir(self.directory):
+            return False
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logging.debug(f"[HandshakeWatcher] inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+            return False
+        if libc.inotify_add_watch(fd, os.fsencode(self.directory), WATCH_MASK) < 0:
+            logging.debug(f"[HandshakeWatcher] inotify_add_watch failed: {os.strerror(ctypes.get_errno())}")
+            os.close(fd)
+            return False
+        self._fd = fd
+        logging.info(f"[HandshakeWatcher] Watching {self.directory} (inotify)")
+        # Catch anything written between the initial scan and the watch
+        self._rescan()
+        return True
+
+    def _close_inotify(self):
+        fd, self._fd = self._fd, -1
+        if fd >= 0:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 65536)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return
+            logging.debug(f"[HandshakeWatcher] Error: {e}")
+            data = None
+        if data is None or not self._handle_events(data):
+            # Watch is gone (directory deleted/moved): poll until it's back
+            self._unwatch()
+            if self.running:
+                self._runtime.every(self.POLL_INTERVAL, self._check, 'handshake-watcher')
+
+    def _handle_events(self, data):
+        """Process a buffer of inotify events, returns False if the watch ended"""
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            _wd, mask, _cookie, length = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size:pos + _EVENT.size + length].split(b'\0', 1)[0]
+            pos += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                self._rescan()
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                return False
+            elif name:
+                name = os.fsdecode(name)
+                if not name.endswith(self.suffix):
+                    continue
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    self._add(name, updated=bool(mask & IN_CLOSE_WRITE))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    with self._lock:
+                        self._known.pop(name, None)
+        return True
+
+    def _poll_once(self):
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self._rescan(stat=True)
+        else:
+            with self._lock:
+                names = set(self._known)
+            self._update(names, stat=True)
+
+    def _rescan(self, publish=True, stat=False):
+        """List the directory and publish files not seen before"""
+        try:
+            self._mtime = os.stat(self.directory).st_mtime_ns
+            with os.scandir(self.directory) as it:
+                names = {e.name for e in it if e.name.endswith(self.suffix)}
+        except OSError:
+            return
+        self._update(names, publish, stat)
+
+    def _update(self, names, publish=True, stat=False):
+        """names are the files in the directory: publish the new ones and,
+        with stat, the known ones whose size or mtime changed since the last
+        stat"""
+        sizes = {}
+        if stat:
+            for name in names:
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                sizes[name] = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            known = self._known
+            new = names - known.keys()
+            updated = [name for name, size in sizes.items() if known.get(name) not in (None, size)]
+            self._known = {name: sizes.get(name) for name in names}
+        if publish:
+            for name in sorted(new):
+                self._publish(name)
+            for name in sorted(updated):
+                self._publish(name, 'handshake.updated')
+
+    def _add(self, name, updated=False):
+        """A file was written; known ones are published as updated if updated"""
+        with self._lock:
+            known = name in self._known
+            if known and not updated:
+                return
+            self._known[name] = None
+        self._publish(name, 'handshake.updated' if known else 'handshake.new')
+
+    def _publish(self, name, tag='handshake.new'):
+        event = {'tag': tag, 'data': {'file': os.path.join(self.directory, name)}}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        self._runtime.submit(self._notify, subscribers, event)
+
+    def _notify(self, subscribers, event):
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error(f"[HandshakeWatcher] Subscriber error: {e}")
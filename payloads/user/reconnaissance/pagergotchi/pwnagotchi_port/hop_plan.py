@@ -0,0 +1,249 @@
+"""
+Hop plan compiler for Pagergotchi's auto mode
+pineapd listens on 2.4, 5 and 6 GHz, and visiting channels in order of AP
+count jumps between bands on almost every hop. Given the scheduler's
+queued work per channel, this orders the channels so every band is visited
+once (band changes cost the most) and channels within a band are swept in
+order, and leaves out the least productive channels when the plan would
+not fit the epoch's airtime budget.
+
+The plan remembers the predicted time per channel and the agent records
+the time actually spent, so the cost model can be checked on the pager.
+Comparison with the busiest-first order on synthetic AP distributions:
+
+    python -m pwnagotchi_port.hop_plan --compare [runs]
+"""
+
+import sys
+import time
+import random
+import itertools
+
+BANDS = ('2G', '5G', '6G')
+
+# Cost model (seconds), defaults for compile_plan()
+HOP_TIME = 1.0      # main loop pause + wifi.recon.channel
+RETUNE_TIME = 0.5   # extra when the radio changes band
+ADJACENT_TIME = 0.002  # per channel number between two channels of a band
+
+
+def channel_to_band(channel):
+    """Convert channel number to frequency band string"""
+    if channel <= 14:
+        return "2G"
+    elif channel <= 177:
+        return "5G"
+    else:
+        return "6G"
+
+
+def hop_cost(a, b, hop_time=HOP_TIME, retune_time=RETUNE_TIME):
+    """Seconds to go from channel a to channel b (a = 0: not on a channel)"""
+    if a == b:
+        return 0.0
+    if not a:
+        return hop_time
+    if channel_to_band(a) != channel_to_band(b):
+        return hop_time + retune_time
+    return hop_time + ADJACENT_TIME * abs(a - b)
+
+
+def plan_cost(order, work, start=0, hop_time=HOP_TIME, retune_time=RETUNE_TIME):
+    """Predicted seconds for visiting order, work = {channel: seconds or tuple}"""
+    total, at = 0.0, start
+    for channel in order:
+        seconds = work[channel]
+        if isinstance(seconds, tuple):
+            seconds = seconds[0]
+        total += hop_cost(at, channel, hop_time, retune_time) + seconds
+        at = channel
+    return total
+
+
+def busiest_first(work):
+    """The order auto mode used before: most work first"""
+    return sorted(work, key=lambda ch: (-work[ch][0], ch))
+
+
+def _sweeps(channels, entry):
+    """Candidate orders for one band's channels, entered from channel entry"""
+    up = sorted(channels)
+    yield up
+    yield up[::-1]
+    if entry in channels:
+        below = [ch for ch in up if ch < entry]
+        above = [ch for ch in up if ch > entry]
+        yield [entry] + above + below[::-1]
+        yield [entry] + below[::-1] + above
+
+
+def order_channels(channels, start=0, hop_time=HOP_TIME, retune_time=RETUNE_TIME):
+    """Deterministic visiting order: one pass per band, channels swept in order
+
+    The band holding start goes first; the other bands in whichever order
+    (and each band in whichever sweep direction) is cheapest.
+    """
+    by_band = {}
+    for channel in channels:
+        by_band.setdefault(channel_to_band(channel), []).append(channel)
+    first = channel_to_band(start) if start else None
+    work = dict.fromkeys(channels, 0.0)
+
+    best, best_cost = [], None
+    rest = [band for band in BANDS if band in by_band and band != first]
+    for bands in itertools.permutations(rest):
+        if first in by_band:
+            bands = (first,) + bands
+        order, at = [], start
+        for band in bands:
+            sweep = min(_sweeps(by_band[band], at),
+                        key=lambda o: plan_cost(o, work, at, hop_time, retune_time))
+            order.extend(sweep)
+            at = sweep[-1]
+        cost = plan_cost(order, work, start, hop_time, retune_time)
+        if best_cost is None or cost < best_cost - 1e-9:
+            best, best_cost = order, cost
+    return best
+
+
+def compile_plan(work, start=0, budget=0, hop_time=HOP_TIME, retune_time=RETUNE_TIME):
+    """HopPlan for work = {channel: (seconds, expected handshakes, ...)}
+
+    With a budget (seconds, 0 = none), channels are added by expected
+    handshakes per second, hop included, for as long as the plan fits; the
+    best channel is always kept.
+    """
+    def density(ch):
+        seconds, shakes = work[ch][0], work[ch][1]
+        return shakes / (seconds + hop_cost(start, ch, hop_time, retune_time)), -ch
+
+    chosen = list(work)
+    if budget:
+        chosen = []
+        for channel in sorted(work, key=density, reverse=True):
+            order = order_channels(chosen + [channel], start, hop_time, retune_time)
+            if chosen and plan_cost(order, work, start, hop_time, retune_time) > budget:
+                continue
+            chosen.append(channel)
+
+    order = order_channels(chosen, start, hop_time, retune_time)
+    predicted, at = {}, start
+    for channel in order:
+        predicted[channel] = hop_cost(at, channel, hop_time, retune_time) + work[channel][0]
+        at = channel
+    dropped = sorted(ch for ch in work if ch not in predicted)
+    return HopPlan(order, predicted, dropped, budget)
+
+
+class HopPlan:
+    """
+    Channels to visit this epoch, in order, with predicted and actual time.
+
+    current() is the channel being worked on and advance() moves on to the
+    next one. The agent calls mark() when it starts hopping to a channel:
+    the time since the previous mark is what the previous channel took (its
+    attacks, the dwell after them and the next hop). After the budget is
+    used up advance() ends the plan early.
+    """
+
+    def __init__(self, order, predicted, dropped=(), budget=0):
+        self.order = list(order)
+        self.predicted = predicted
+        self.dropped = list(dropped)
+        self.budget = budget
+        self.actual = {}
+        self._step = 0
+        self._marked = None  # (channel, time)
+        self._started = None
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def retunes(self):
+        return sum(1 for a, b in zip(self.order, self.order[1:])
+                   if channel_to_band(a) != channel_to_band(b))
+
+    @property
+    def cost(self):
+        """Predicted seconds for the whole plan"""
+        return sum(self.predicted.values())
+
+    @property
+    def elapsed(self):
+        return sum(self.actual.values())
+
+    def current(self):
+        if self._step < len(self.order):
+            return self.order[self._step]
+        return None
+
+    def advance(self, now=None):
+        """Done with the current channel, returns the next one (None when done)"""
+        self._step += 1
+        if self.budget and self._started is not None:
+            if (now if now is not None else time.time()) - self._started > self.budget:
+                self._step = len(self.order)
+        return self.current()
+
+    def mark(self, channel, now=None):
+        """Starting to hop to channel (None: the epoch is over)"""
+        if now is None:
+            now = time.time()
+        if self._started is None:
+            self._started = now
+        if self._marked is not None:
+            previous, since = self._marked
+            self.actual[previous] = self.actual.get(previous, 0.0) + now - since
+        self._marked = (channel, now) if channel is not None else None
+
+    def report(self):
+        """[(channel, predicted seconds, actual seconds or None)] in plan order"""
+        return [(ch, self.predicted[ch], self.actual.get(ch)) for ch in self.order]
+
+    def summary(self):
+        return 'channels=%d retunes=%d predicted=%.0fs actual=%.0fs dropped=%d' % (
+            len(self.order), self.retunes, self.cost, self.elapsed, len(self.dropped))
+
+
+def synthetic_work(rng, aps=40):
+    """Random per-channel work: APs on common 2.4/5/6 GHz channels, busy
+    channels more likely, 0.4s per association + 0.9s per deauthed client,
+    plus a 5-10s dwell"""
+    channels = [1, 6, 11] * 4 + [2, 3, 4, 5, 7, 8, 9, 10] + \
+        [36, 40, 44, 48, 52, 100, 149, 153, 157, 161] * 2 + [181, 197, 213, 229]
+    work = {}
+    for _ in range(aps):
+        channel = rng.choice(channels)
+        seconds, shakes = work.get(channel, (rng.choice((5, 10)), 0.0))
+        clients = rng.choice((0, 0, 1, 2, 3))
+        work[channel] = (seconds + 0.4 + 0.9 * clients, shakes + 0.3 + 0.25 * clients)
+    return work
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] != '--compare':
+        print(__doc__.strip())
+        return 2
+    runs = int(argv[1]) if len(argv) > 1 else 200
+    rng = random.Random(1)
+    totals = {'busiest': [0.0, 0], 'plan': [0.0, 0]}
+    for run in range(runs):
+        work = synthetic_work(rng, aps=rng.choice((10, 40, 120)))
+        start = rng.choice((0, 6, 36))
+        old = busiest_first(work)
+        new = order_channels(list(work), start)
+        for name, order in (('busiest', old), ('plan', new)):
+            totals[name][0] += plan_cost(order, work, start) - sum(w[0] for w in work.values())
+            totals[name][1] += sum(1 for a, b in zip([start] + order, order)
+                                   if a and channel_to_band(a) != channel_to_band(b))
+    print('%d synthetic epochs' % runs)
+    for name, (hops, retunes) in totals.items():
+        print('%-8s %7.2fs hopping per epoch  %5.2f band changes per epoch' % (
+            name, hops / runs, retunes / float(runs)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -187,42 +187,39 @@ def do_auto_mode(agent):
             if should_exit() or should_return_to_menu():
                 break
 
-            # get nearby access points grouped by channel
-            channels = agent.get_access_points_by_channel()
-            logging.debug("[LOOP] Found %d channels with APs", len(channels))
-
-            # for each channel
-            for ch, aps in channels:
-                if should_exit() or should_return_to_menu():
+            # queue nearby access points by expected handshakes per second
+            # of airtime (APs recon finds meanwhile are added as they appear)
+            # and plan the channels: one pass per band, within the budget
+            targets = agent.plan_epoch()
+            logging.debug("[LOOP] Scheduled %d APs", targets)
+
+            while not should_exit() and not should_return_to_menu():
+                item = agent.next_target()
+                if item is None:
                     break
+                action, ap, clients = item
+                hostname = ap.get('hostname', ap.get('mac', 'unknown'))
 
-                time.sleep(1)
-                logging.debug("[LOOP] Setting channel %d (%d APs)", ch, len(aps))
-                agent.set_channel(ch)
-
-                if not agent.is_stale() and agent.any_activity():
-                    logging.info("%d access points on channel %d" % (len(aps), ch))
-
-                # for each ap on this channel
-                for ap in aps:
-                    if should_exit() or should_return_to_menu():
-                        break
-
-                    hostname = ap.get('hostname', ap.get('mac', 'unknown'))
+                ch = ap.get('channel', 0)
+                if ch != agent.get_current_channel():
+                    time.sleep(1)
+                    logging.debug("[LOOP] Setting channel %d for %s", ch, hostname)
+                    agent.set_channel(ch)
 
+                if action == 'assoc':
                     # send an association frame in order to get for a PMKID
                     logging.debug("[ATTACK] Associating with %s", hostname)
                     agent.associate(ap)
-
-                    # deauth all client stations in order to get a full handshake
-                    # (original behavior: only targeted deauth, skip if no clients)
-                    clients = ap.get('clients', [])
-                    if clients:
-                        logging.debug("[ATTACK] Deauthing %d clients from %s", len(clients), hostname)
-                        for sta in clients:
-                            if should_exit() or should_return_to_menu():
-                                break
-                            agent.deauth(ap, sta)
+                else:
+                    # deauth client stations in order to get a full handshake
+                    # (original behavior: only targeted deauth, skip if no clients),
+                    # active ones first and idle / out of range ones not at all
+                    logging.debug("[ATTACK] Deauthing %d of %d clients from %s",
+                                  len(clients), len(ap.get('clients', [])), hostname)
+                    for sta in clients:
+                        if should_exit() or should_return_to_menu():
+                            break
+                        agent.deauth(ap, sta)
 
             if should_exit() or should_return_to_menu():
                 break
@@ -272,6 +269,15 @@ def load_config(config_path=None):
             # Throttling - ORIGINAL VALUES from defaults.toml
             'throttle_a': 0.4,
             'throttle_d': 0.9,
+            # Injection budget over all targets (frames/s, 0 = unlimited)
+            'inject_rate': 20,
+            'inject_burst': 40,
+            # Wait after attacking a channel: 'bandit' (learned per channel)
+            # or 'fixed' (hop_recon_time after deauths, else min_recon_time)
+            'dwell': 'bandit',
+            # Seconds of attacks, dwell and hops planned per epoch (0 = all
+            # channels with targets), see hop_plan.py
+            'airtime_budget': 180,
             # Limits
             'ap_ttl': 120,
             'sta_ttl': 300,
@@ -296,6 +302,45 @@ def load_config(config_path=None):
             'handshakes': '/root/loot/handshakes/pagergotchi',
             'silence': ['wifi.client.probe'],
         },
+        'recon': {
+            # 'cli' (_pineap RECON APS) or 'db' (read pineapd's recon database)
+            'source': 'cli',
+            'db_path': '',
+            # Client tracker: 'pcap' (binary frame parsing) or 'text' (tcpdump -e)
+            'tracker': 'pcap',
+            # Above this many frames/s only the first few frames per AP/client
+            # pair per second are processed
+            'tracker_sample_fps': 300,
+            'tracker_sample_pair': 3,
+            # Hard cap on tracked AP/client pairs (least recently seen go first)
+            'max_clients': 4096,
+            # APs that drop below personality.min_rssi only come back once they
+            # are this many dB above it
+            'rssi_hysteresis': 5,
+            # Seconds per channel when hopping over a [channels] list
+            'channel_dwell': 0.5,
+            # Seconds an AP stays focused after an association (PMKID wait)
+            'focus_time': 2,
+        },
+        'targeting': {
+            # Skip APs that can't give a crackable PSK handshake
+            'skip_open': True,
+            'skip_wep': True,
+            'skip_enterprise': True,
+            'skip_sae_only': True,
+            # Deauth clients of APs that require PMF (they ignore deauths)
+            'deauth_pmf_required': False,
+            # APs already in the loot directory: 'never' (skip forever),
+            # 'days' (skip for recapture_days), 'pmkid' (re-attack until a
+            # full EAPOL handshake is captured) or 'always'
+            'recapture': 'never',
+            'recapture_days': 30,
+            'recapture_match_essid': False,
+            # Don't deauth clients without data traffic for this many seconds
+            # (0 = off) or weaker than client_min_rssi dBm
+            'client_idle_after': 120,
+            'client_min_rssi': -85,
+        },
         'ui': {
             'fps': 2.0,
             'display': {'type': 'pager'},
@@ -318,6 +363,7 @@ def load_config(config_path=None):
                 channels_str = cp.get('channels', 'channels', fallback='')
                 if channels_str:
                     config['personality']['channels'] = [int(c.strip()) for c in channels_str.split(',')]
+                config['recon']['channel_dwell'] = cp.getfloat('channels', 'dwell', fallback=0.5)
 
             if 'whitelist' in cp:
                 ssids = cp.get('whitelist', 'ssids', fallback='')
@@ -330,8 +376,33 @@ def load_config(config_path=None):
             if 'deauth' in cp:
                 config['personality']['deauth'] = cp.getboolean('deauth', 'enabled', fallback=True)
 
+            if 'recon' in cp:
+                config['recon']['source'] = cp.get('recon', 'source', fallback='cli').strip().lower() or 'cli'
+                config['recon']['db_path'] = cp.get('recon', 'db_path', fallback='').strip()
+                config['recon']['tracker'] = cp.get('recon', 'tracker', fallback='pcap').strip().lower() or 'pcap'
+                config['recon']['tracker_sample_fps'] = cp.getint('recon', 'tracker_sample_fps', fallback=300)
+                config['recon']['tracker_sample_pair'] = cp.getint('recon', 'tracker_sample_pair', fallback=3)
+                config['recon']['max_clients'] = cp.getint('recon', 'max_clients', fallback=4096)
+                config['recon']['rssi_hysteresis'] = cp.getint('recon', 'rssi_hysteresis', fallback=5)
+                config['recon']['focus_time'] = cp.getfloat('recon', 'focus_time', fallback=2)
+                for key in ('ap_ttl', 'sta_ttl', 'min_rssi'):
+                    config['personality'][key] = cp.getint('recon', key, fallback=config['personality'][key])
+
+            if 'targeting' in cp:
+                for key, default in config['targeting'].items():
+                    if isinstance(default, bool):
+                        config['targeting'][key] = cp.getboolean('targeting', key, fallback=default)
+                    elif isinstance(default, int):
+                        config['targeting'][key] = cp.getint('targeting', key, fallback=default)
+                    else:
+                        config['targeting'][key] = cp.get('targeting', key, fallback=default).strip().lower()
+
             if 'timing' in cp:
                 config['personality']['throttle_d'] = cp.getfloat('timing', 'throttle_d', fallback=0.9)
+                config['personality']['inject_rate'] = cp.getfloat('timing', 'inject_rate', fallback=20)
+                config['personality']['inject_burst'] = cp.getfloat('timing', 'inject_burst', fallback=40)
+                config['personality']['dwell'] = cp.get('timing', 'dwell', fallback='bandit').strip().lower()
+                config['personality']['airtime_budget'] = cp.getfloat('timing', 'airtime_budget', fallback=180)
                 config['personality']['throttle_a'] = cp.getfloat('timing', 'throttle_a', fallback=0.4)
 
             logging.info("Loaded config from %s", config_path)
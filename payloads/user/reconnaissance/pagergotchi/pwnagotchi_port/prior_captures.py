@@ -0,0 +1,86 @@
+"""
+Index of handshakes captured in previous sessions
+Built from the handshake catalog (everything already in the loot directory)
+plus the ESSIDs learned from it, so the agent can tell in O(1) whether an AP
+is worth more airtime or was already captured before this run.
+"""
+
+import time
+
+from pwnagotchi_port.handshake_catalog import HASH_EAPOL
+
+# Recapture policies ([targeting] recapture)
+RECAPTURE_NEVER = 'never'    # captured once = skipped forever
+RECAPTURE_DAYS = 'days'      # skipped for recapture_days after the last capture
+RECAPTURE_PMKID = 'pmkid'    # only re-attacked while all we have is a PMKID
+RECAPTURE_ALWAYS = 'always'  # index ignored (previous behaviour)
+
+POLICIES = (RECAPTURE_NEVER, RECAPTURE_DAYS, RECAPTURE_PMKID, RECAPTURE_ALWAYS)
+
+
+class PriorCaptureIndex:
+    """
+    BSSID (int) and ESSID -> [last capture time, has EAPOL handshake].
+
+    With match_essid, the other BSSIDs of a network whose PSK is already
+    captured (extenders, multi-band APs) are matched too, but only from the
+    same vendor (OUI) or address block: default ESSIDs like "NETGEAR" or
+    "xfinitywifi" are shared by unrelated networks with different PSKs.
+    """
+
+    def __init__(self, policy=RECAPTURE_NEVER, days=30, match_essid=False):
+        self.policy = policy if policy in POLICIES else RECAPTURE_NEVER
+        self.days = days
+        self.match_essid = match_essid
+        self._by_bssid = {}
+        self._by_essid = {}
+
+    def __len__(self):
+        return len(self._by_bssid)
+
+    def add(self, bssid, essid='', captured_at=0.0, types=()):
+        """Record a capture (bssid as int, types as hashcat 22000 hash types)"""
+        full = HASH_EAPOL in types
+        keys = []
+        if bssid is not None:
+            keys.append((self._by_bssid, bssid))
+            if essid:
+                keys.extend((self._by_essid, key) for key in self._essid_keys(bssid, essid))
+        for index, key in keys:
+            entry = index.get(key)
+            if entry is None:
+                index[key] = [captured_at, full]
+            else:
+                entry[0] = max(entry[0], captured_at)
+                entry[1] = entry[1] or full
+
+    def lookup(self, bssid, essid=''):
+        """[last capture time, has EAPOL] for an AP, or None if never captured"""
+        entry = self._by_bssid.get(bssid)
+        if entry is None and essid and self.match_essid and bssid is not None:
+            for key in self._essid_keys(bssid, essid):
+                entry = self._by_essid.get(key)
+                if entry is not None:
+                    break
+        return entry
+
+    @staticmethod
+    def _essid_keys(bssid, essid):
+        """ESSID keys of an AP: same OUI, or the same address apart from the
+        first octet (locally administered virtual BSSIDs) and the last one"""
+        return (essid, 'oui', bssid >> 24), (essid, 'block', (bssid >> 8) & 0xFFFFFFFF)
+
+    def should_skip(self, bssid, essid='', now=None):
+        """True if the policy says this AP was captured well enough already"""
+        if self.policy == RECAPTURE_ALWAYS:
+            return False
+        entry = self.lookup(bssid, essid)
+        if entry is None:
+            return False
+        if self.policy == RECAPTURE_PMKID:
+            return entry[1]
+        if self.policy == RECAPTURE_DAYS:
+            if now is None:
+                now = time.time()
+            return now - entry[0] < self.days * 86400
+        return True
@@ -0,0 +1,237 @@
+"""
+Recon fetch helpers for Pagergotchi
+Walks the full pineapd recon AP set page by page and parses the JSON while
+it streams in, so memory stays flat however many APs are around (dense
+wardrives easily exceed the old limit=100).
+"""
+
+import json
+import time
+import logging
+
+from pwnagotchi_port.wifi_security import recon_security, unknown_security
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n,'
+
+
+def iter_json_array(chunks):
+    """Yield the elements of a JSON array from an iterable of text chunks
+
+    The first '[' in the stream starts the array, so both a bare list and an
+    object wrapping it ({"aps": [...]}) work. Only the element currently being
+    decoded is buffered.
+    """
+    chunks = iter(chunks)
+    buf = ''
+    pos = -1
+
+    # Find the start of the array
+    for chunk in chunks:
+        buf += chunk
+        pos = buf.find('[')
+        if pos >= 0:
+            break
+    if pos < 0:
+        return
+    pos += 1
+
+    while True:
+        # Skip separators
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos < len(buf) and buf[pos] == ']':
+            return
+
+        obj, end = None, -1
+        if pos < len(buf):
+            try:
+                obj, end = _decoder.raw_decode(buf, pos)
+            except ValueError:
+                pass
+            # An element decoded up to the end of the buffer may be a number
+            # that continues in the next chunk, so only trust it with a tail
+            if end >= 0 and end < len(buf):
+                pos = end
+                yield obj
+                continue
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            if end >= 0:
+                yield obj
+                return
+            if pos < len(buf):
+                raise ValueError('truncated JSON array')
+            return
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def freq_to_channel(freq):
+    """Convert a frequency in MHz to a WiFi channel number (0 if unknown)"""
+    if 2412 <= freq <= 2472:
+        return (freq - 2407) // 5
+    if freq == 2484:
+        return 14
+    if 5160 <= freq <= 5885:
+        return (freq - 5000) // 5
+    if 5955 <= freq <= 7115:
+        return (freq - 5950) // 5
+    return 0
+
+
+def recon_ssid(ap):
+    """Best-effort SSID from a recon AP entry (top level, beacon or probe response)"""
+    ssid = ap.get('ssid', ap.get('essid', ''))
+    if ssid:
+        return ssid
+    for section in ('beacon', 'response'):
+        entries = ap.get(section)
+        if isinstance(entries, dict):
+            for data in entries.values():
+                if isinstance(data, dict) and data.get('ssid'):
+                    return data['ssid']
+    return ''
+
+
+def recon_ap_security(ap):
+    """Security fields for a recon AP entry (top level, beacon or probe response)
+
+    Falls back to unknown_security() when the entry has no security
+    information: such APs are still attacked, and what the AP table already
+    detected for them is kept.
+    """
+    sec = recon_security(ap)
+    if sec is None:
+        for section in ('beacon', 'response'):
+            entries = ap.get(section)
+            if isinstance(entries, dict):
+                for data in entries.values():
+                    sec = recon_security(data)
+                    if sec is not None:
+                        return sec
+    return sec or unknown_security()
+
+
+def parse_recon_ap(ap):
+    """Reduce a recon AP entry to {mac, hostname, channel, rssi, encryption,
+    cipher, authentication, pmf}
+
+    Returns None for entries without a MAC.
+    """
+    mac = ap.get('mac', ap.get('bssid', '')).upper()
+    if not mac:
+        return None
+
+    # Format: {"beacon": {"hash": {"channel": 11, "ssid": "name", ...}}, "mac": "...", "signal": -52}
+    channel = 0
+    beacon = ap.get('beacon')
+    if isinstance(beacon, dict):
+        # Get first beacon entry (there's usually one keyed by a hash)
+        for beacon_data in beacon.values():
+            if isinstance(beacon_data, dict):
+                channel = beacon_data.get('channel', 0)
+                break
+
+    # Convert freq to channel if channel not in beacon
+    if not channel and 'freq' in ap:
+        channel = freq_to_channel(ap['freq'])
+
+    parsed = {
+        'mac': mac,
+        'hostname': recon_ssid(ap),
+        'channel': channel,
+        'rssi': int(ap.get('signal', -100)),
+    }
+    parsed.update(recon_ap_security(ap))
+    return parsed
+
+
+class ReconFetcher:
+    """
+    Pages through `_pineap RECON APS format=json` with limit/offset.
+
+    If pineapd ignores the offset (more than a tenth of a later page are
+    APs already walked, in the same order or not) the walk stops there and
+    the fetcher switches to a single request capped at max_aps for the rest
+    of the session. APs already yielded by a walk aren't yielded again, and
+    pages are yielded in batches of at most page_size entries either way.
+    """
+
+    def __init__(self, stream, page_size=200, max_aps=5000, timeout=10):
+        # stream(cmd, timeout) -> iterable of text chunks
+        self._stream = stream
+        self.page_size = page_size
+        self.max_aps = max_aps
+        self.timeout = timeout
+        self.paging = True
+
+        # Stats from the last complete walk
+        self.last_count = 0
+        self.last_requests = 0
+        self.last_duration = 0.0
+
+    def _command(self, limit, offset):
+        cmd = ['_pineap', 'RECON', 'APS', 'format=json', 'limit=%d' % limit]
+        if offset:
+            cmd.append('offset=%d' % offset)
+        return cmd
+
+    def pages(self):
+        """Yield lists of raw recon AP entries until the whole set is walked"""
+        start = time.monotonic()
+        count = 0
+        requests = 0
+        offset = 0
+        seen = set()  # MACs yielded by this walk
+
+        while count < self.max_aps:
+            limit = self.page_size if self.paging else self.max_aps
+            requests += 1
+            received = 0
+            batch = []
+
+            try:
+                for ap in iter_json_array(self._stream(self._command(limit, offset), self.timeout)):
+                    if not isinstance(ap, dict):
+                        continue
+                    received += 1
+                    batch.append(ap)
+                    if self.paging:
+                        # Checked against earlier pages once complete
+                        continue
+                    count += 1
+                    if len(batch) >= self.page_size:
+                        yield batch
+                        batch = []
+                    if count >= self.max_aps:
+                        break
+            except ValueError as e:
+                logging.debug(f"[Recon] JSON parse error: {e}")
+
+            if self.paging:
+                fresh = [ap for ap in batch if ap.get('mac', '').lower() not in seen]
+                if offset and (len(batch) - len(fresh)) * 10 > len(batch):
+                    # Paging only repeats the few APs that inserts between
+                    # requests shift into the next page; more means the
+                    # offset is ignored (same order or not). Later walks
+                    # fetch everything in one request
+                    logging.info("[Recon] pineapd ignores offset, fetching up to %d APs per request",
+                                 self.max_aps)
+                    self.paging = False
+                    break
+                batch = fresh[:self.max_aps - count]
+                seen.update(ap.get('mac', '').lower() for ap in batch)
+                count += len(batch)
+
+            if batch:
+                yield batch
+
+            if not self.paging or received < limit:
+                break
+            offset += limit
+
+        self.last_count = count
+        self.last_requests = requests
+        self.last_duration = time.monotonic() - start
@@ -0,0 +1,286 @@
+"""
+Read-only reader for the pineapd recon database
+pineapd (started with --reconpath /root/recon/ --reconname pager) keeps its
+recon results in a SQLite file. Reading it directly skips the _pineap CLI and
+the JSON round trip, and a per-table high-water mark means each poll only
+reads rows written since the previous one.
+
+The schema isn't documented, so tables and columns are found by name. A
+time column only serves as the mark while it holds numbers; text timestamps
+fall back to rowids (new rows only).
+"""
+
+import os
+import time
+import logging
+
+try:
+    import sqlite3
+except ImportError:  # python3-sqlite3 is a separate package on OpenWRT
+    sqlite3 = None
+
+from pwnagotchi_port.recon import freq_to_channel
+from pwnagotchi_port.wifi_security import security_from_text, unknown_security
+
+AP_TABLES = ('wifi_ap', 'wifi_aps', 'aps', 'ap', 'access_points')
+CLIENT_TABLES = ('wifi_client', 'wifi_clients', 'clients', 'client', 'stations', 'sta')
+
+# logical field -> accepted column names, in order of preference
+AP_COLUMNS = {
+    'mac': ('mac', 'bssid', 'ap_mac'),
+    'ssid': ('ssid', 'essid', 'name'),
+    'channel': ('channel', 'chan'),
+    'freq': ('freq', 'frequency'),
+    'signal': ('signal', 'rssi', 'last_signal'),
+    'encryption': ('encryption', 'enc', 'security', 'privacy'),
+    'akm': ('akm', 'auth', 'authentication'),
+    'pmf': ('pmf', 'mfp'),
+    'time': ('last_seen', 'lastseen', 'time', 'timestamp', 'updated', 'seen'),
+}
+CLIENT_COLUMNS = {
+    'mac': ('mac', 'client_mac', 'sta_mac', 'station'),
+    'ap': ('ap', 'bssid', 'ap_mac', 'associated'),
+    'signal': ('signal', 'rssi', 'last_signal'),
+    'time': ('last_seen', 'lastseen', 'time', 'timestamp', 'updated', 'seen'),
+}
+
+
+def find_recon_db(reconpath='/root/recon/', reconname='pager'):
+    """Locate the recon database pineapd writes for --reconpath/--reconname"""
+    for name in (reconname + '.db', reconname + '.sqlite', reconname):
+        path = os.path.join(reconpath, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _to_seconds(value):
+    """Row timestamp -> unix seconds, or None if it isn't numeric"""
+    if isinstance(value, (int, float)) and value > 0:
+        # Some builds store milliseconds
+        return value / 1000.0 if value > 1e12 else float(value)
+    return None
+
+
+class _TableCursor:
+    """Column mapping and high-water mark for one recon table"""
+
+    def __init__(self, table, columns, numeric_time=True):
+        self.table = table
+        self.columns = columns  # logical field -> column name
+        # Track changes by timestamp when there is a numeric one (catches
+        # updates), otherwise by rowid (inserts only)
+        self.mark_column = columns.get('time', 'rowid') if numeric_time else 'rowid'
+        self.mark = None
+
+    def use_rowid(self):
+        """The time column turned out not to be numeric: mark by rowid, from the start"""
+        logging.info(f"[ReconDB] {self.table}.{self.mark_column} isn't numeric, tracking rows by rowid")
+        self.mark_column = 'rowid'
+        self.mark = None
+
+    def query(self):
+        fields = list(self.columns)
+        select = ', '.join('"%s"' % self.columns[f] for f in fields)
+        sql = 'SELECT %s, %s FROM "%s"' % (select, self.mark_expr(), self.table)
+        args = ()
+        if self.mark is not None:
+            # Rows sharing the last timestamp may still be written after we
+            # read, so re-read them (merging is idempotent); rowids are unique
+            op = '>' if self.mark_column == 'rowid' else '>='
+            sql += ' WHERE %s %s ?' % (self.mark_expr(), op)
+            args = (self.mark,)
+        sql += ' ORDER BY %s' % self.mark_expr()
+        return fields, sql, args
+
+    def mark_expr(self):
+        return 'rowid' if self.mark_column == 'rowid' else '"%s"' % self.mark_column
+
+
+class ReconDBReader:
+    """
+    Incremental, read-only view of the recon database.
+
+    read_aps() yields dicts in the same shape as recon.parse_recon_ap(),
+    read_clients() yields (ap_mac, client_mac, signal) tuples. Both only
+    return rows changed since the previous call.
+    """
+
+    # Seconds to wait before retrying a database that couldn't be opened
+    RETRY_INTERVAL = 60
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._aps = None
+        self._clients = None
+        self._retry_at = 0
+
+    @property
+    def available(self):
+        return sqlite3 is not None and bool(self.path) and os.path.isfile(self.path)
+
+    def open(self):
+        """Open the database and map its tables; returns True if APs can be read"""
+        if self._conn is not None:
+            return self._aps is not None
+        if time.time() < self._retry_at:
+            return False
+        self._retry_at = time.time() + self.RETRY_INTERVAL
+        if sqlite3 is None:
+            logging.warning("[ReconDB] sqlite3 module not available")
+            return False
+        if not self.available:
+            logging.warning(f"[ReconDB] No recon database at {self.path}")
+            return False
+        try:
+            self._conn = sqlite3.connect('file:%s?mode=ro' % self.path, uri=True,
+                                         timeout=1.0, check_same_thread=False)
+            tables = {row[0].lower(): row[0] for row in
+                      self._conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+            self._aps = self._map_table(tables, AP_TABLES, AP_COLUMNS, ('mac',))
+            self._clients = self._map_table(tables, CLIENT_TABLES, CLIENT_COLUMNS, ('mac', 'ap'))
+        except sqlite3.Error as e:
+            logging.warning(f"[ReconDB] Could not open {self.path}: {e}")
+            self.close()
+            return False
+
+        if self._aps is None:
+            logging.warning(f"[ReconDB] No AP table found in {self.path} (tables: {sorted(tables)})")
+            self.close()
+            return False
+        self._retry_at = 0
+        logging.info("[ReconDB] Reading APs from %s.%s (mark: %s)%s", self.path, self._aps.table,
+                     self._aps.mark_column,
+                     ', clients from %s' % self._clients.table if self._clients else '')
+        return True
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self._aps = None
+        self._clients = None
+
+    def _map_table(self, tables, names, aliases, required):
+        for name in names:
+            if name not in tables:
+                continue
+            table = tables[name]
+            info = list(self._conn.execute('PRAGMA table_info("%s")' % table))
+            cols = {row[1].lower(): row[1] for row in info}
+            types = {row[1]: (row[2] or '').upper() for row in info}
+            mapping = {}
+            for field, candidates in aliases.items():
+                for candidate in candidates:
+                    if candidate in cols:
+                        mapping[field] = cols[candidate]
+                        break
+            if all(f in mapping for f in required):
+                # Columns with text affinity hold strings (others are checked
+                # as rows are read, see _read)
+                declared = types.get(mapping.get('time'), '')
+                numeric = not any(t in declared for t in ('CHAR', 'TEXT', 'CLOB'))
+                return _TableCursor(table, mapping, numeric)
+        return None
+
+    def _read(self, cursor):
+        """Yield (row dict, timestamp seconds) for rows past the cursor's mark"""
+        fields, sql, args = cursor.query()
+        try:
+            rows = self._conn.execute(sql, args)
+            for row in rows:
+                mark = row[-1]
+                if isinstance(mark, (str, bytes)):
+                    # Next poll starts over by rowid (merging again is harmless)
+                    cursor.use_rowid()
+                    return
+                if mark is not None:
+                    cursor.mark = mark
+                data = dict(zip(fields, row))
+                yield data, _to_seconds(data.get('time'))
+        except sqlite3.Error as e:
+            # Database replaced (e.g. RECON NEW) or locked: reopen and start over
+            logging.debug(f"[ReconDB] Read error on {cursor.table}: {e}")
+            self.close()
+
+    def _check_reset(self, cursor):
+        """Start from scratch if the table was recreated (mark is past the end)"""
+        if cursor.mark is None:
+            return
+        try:
+            row = self._conn.execute('SELECT MAX(%s) FROM "%s"' % (cursor.mark_expr(), cursor.table)).fetchone()
+        except sqlite3.Error:
+            return
+        if row is None or row[0] is None:
+            cursor.mark = None
+            return
+        try:
+            if row[0] < cursor.mark:
+                cursor.mark = None
+        except TypeError:
+            # A text value in a numeric time column
+            cursor.use_rowid()
+
+    def read_aps(self):
+        """Yield APs changed since the last call"""
+        if not self.open():
+            return
+        cursor = self._aps
+        self._check_reset(cursor)
+        for row, seen in self._read(cursor):
+            mac = str(row.get('mac') or '').upper()
+            if not mac:
+                continue
+            channel = row.get('channel') or 0
+            if not channel and row.get('freq'):
+                channel = freq_to_channel(int(row['freq']))
+            ap = {
+                'mac': mac,
+                'hostname': row.get('ssid') or '',
+                'channel': int(channel),
+                'rssi': int(row.get('signal') or -100),
+            }
+            ap.update(self._security(row))
+            if seen is not None:
+                ap['last_seen'] = seen
+            yield ap
+
+    @staticmethod
+    def _security(row):
+        """Security fields from a row's encryption/akm/pmf columns"""
+        encryption = row.get('encryption')
+        if isinstance(encryption, int):
+            # Privacy flag column
+            encryption = 'WPA2' if encryption else 'OPEN'
+        text = ' '.join(str(v) for v in (encryption, row.get('akm')) if isinstance(v, str) and v)
+        sec = security_from_text(text)
+        if sec is None:
+            return unknown_security()
+        pmf = row.get('pmf')
+        if isinstance(pmf, str) and pmf.lower() in ('capable', 'required'):
+            sec['pmf'] = pmf.lower()
+        elif isinstance(pmf, int) and pmf:
+            sec['pmf'] = 'required' if pmf > 1 else 'capable'
+        return sec
+
+    def read_clients(self):
+        """Yield (ap_mac, client_mac, signal) for clients changed since the last call"""
+        if not self.open() or self._clients is None:
+            return
+        cursor = self._clients
+        self._check_reset(cursor)
+        for row, _seen in self._read(cursor):
+            ap_mac = str(row.get('ap') or '').lower()
+            client_mac = str(row.get('mac') or '').lower()
+            if ap_mac and client_mac:
+                yield ap_mac, client_mac, row.get('signal')
+
+    @property
+    def tracks_time(self):
+        """True if AP rows carry a last-seen time that is tracked (so unchanged
+        rows mean unseen APs)"""
+        return self._aps is not None and self._aps.mark_column != 'rowid'
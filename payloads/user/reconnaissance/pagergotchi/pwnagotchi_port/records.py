@@ -0,0 +1,126 @@
+"""
+Compact AP and client records for the PineAP backend
+MACs are kept as 48-bit integers and records use __slots__, so thousands of
+APs and clients fit in the Pager's small RAM. The bettercap-shaped dicts the
+rest of the code expects are only built at the API boundary (view()).
+"""
+
+from array import array
+
+BROADCAST = 0xFFFFFFFFFFFF
+
+
+def mac_to_int(mac):
+    """'aa:bb:cc:dd:ee:ff', 'AA-BB-..' or 'aabbccddeeff' -> 48-bit int (None if invalid)"""
+    if isinstance(mac, int):
+        return mac
+    try:
+        digits = mac.replace(':', '').replace('-', '')
+        if len(digits) != 12:
+            return None
+        return int(digits, 16)
+    except (AttributeError, ValueError):
+        return None
+
+
+def format_mac(value, upper=True):
+    """48-bit int -> 'AA:BB:CC:DD:EE:FF' (the one place MAC strings are built)"""
+    fmt = '%02X:%02X:%02X:%02X:%02X:%02X' if upper else '%02x:%02x:%02x:%02x:%02x:%02x'
+    return fmt % tuple(value.to_bytes(6, 'big'))
+
+
+def is_group_mac(value):
+    """True for broadcast/multicast addresses (I/G bit of the first octet)"""
+    return bool((value >> 40) & 1)
+
+
+class APRecord:
+    """One access point seen by recon"""
+
+    __slots__ = ('mac', 'hostname', 'vendor', 'channel', 'rssi', 'encryption',
+                 'cipher', 'authentication', 'pmf', 'first_seen', 'last_seen',
+                 'rssi_history')
+
+    # Number of RSSI samples kept per AP
+    RSSI_HISTORY = 8
+
+    def __init__(self, mac, hostname='', channel=0, rssi=-100, encryption='', seen=0.0, vendor=''):
+        self.mac = mac
+        self.hostname = hostname
+        self.vendor = vendor
+        self.channel = channel
+        self.rssi = rssi
+        self.encryption = encryption
+        # See wifi_security for the values
+        self.cipher = ''
+        self.authentication = ''
+        self.pmf = ''
+        self.first_seen = seen
+        self.last_seen = seen
+        self.rssi_history = array('b', (max(-128, min(127, rssi)),))
+
+    def add_rssi(self, rssi):
+        self.rssi = rssi
+        history = self.rssi_history
+        history.append(max(-128, min(127, rssi)))
+        if len(history) > self.RSSI_HISTORY:
+            del history[0]
+
+    def view(self, clients=None):
+        """Bettercap-shaped dict for this AP"""
+        data = {
+            'mac': format_mac(self.mac),
+            'hostname': self.hostname,
+            'vendor': self.vendor,
+            'channel': self.channel,
+            'rssi': self.rssi,
+            'encryption': self.encryption,
+            'cipher': self.cipher,
+            'authentication': self.authentication,
+            'pmf': self.pmf,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+        }
+        if clients is not None:
+            data['clients'] = clients
+        return data
+
+
+class ClientRecord:
+    """One client station seen talking to an AP
+
+    frames / nulls count the data frames the tracker saw for the pair (null
+    data frames are power-save keepalives, not traffic) and last_active is
+    when the last real data frame went either way. Sightings that aren't
+    frames (recon database rows) only move last_seen.
+    """
+
+    __slots__ = ('mac', 'vendor', 'rssi', 'first_seen', 'last_seen',
+                 'frames', 'nulls', 'last_active')
+
+    def __init__(self, mac, seen, vendor='', rssi=None):
+        self.mac = mac
+        self.vendor = vendor
+        self.rssi = rssi
+        self.first_seen = seen
+        self.last_seen = seen
+        self.frames = 0
+        self.nulls = 0
+        self.last_active = None
+
+    def add_frame(self, now, null=False):
+        self.frames += 1
+        if null:
+            self.nulls += 1
+        else:
+            self.last_active = now
+
+    def view(self):
+        """Bettercap-shaped dict for this client"""
+        data = {'mac': format_mac(self.mac), 'vendor': self.vendor, 'first_seen': self.first_seen,
+                'last_seen': self.last_seen, 'frames': self.frames, 'nulls': self.nulls}
+        if self.rssi is not None:
+            data['rssi'] = self.rssi
+        if self.last_active is not None:
+            data['last_active'] = self.last_active
+        return data
@@ -0,0 +1,260 @@
+"""
+Shared asyncio runtime for Pagergotchi
+One event loop, on one thread, drives the periodic work that used to have a
+thread each sleeping on its own cadence (recon polls, the session fetcher,
+display refresh, uptime, the handshake watcher, the event poller). Timers
+are coalesced: due times are rounded up to a GRANULARITY grid, so tasks
+that fall due close together run on the same wakeup and an idle unit wakes
+only as often as its fastest task needs.
+
+Anything that may block or runs code we don't control (backend commands,
+battery and GPS reads, event handlers and plugins, handshake file parsing)
+goes to a small thread pool. The loop itself only runs timers, queue
+handling and display redraws, which take milliseconds: handing those to a
+pool thread would cost more wakeups than it saves.
+Wakeups and process CPU are counted and logged every REPORT_INTERVAL
+seconds, so the cost of the runtime itself can be read off the log.
+"""
+
+import math
+import time
+import asyncio
+import logging
+import threading
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Task:
+    __slots__ = ('name', 'interval', 'fn', 'blocking', 'due', 'future', 'runs', 'overruns')
+
+    def __init__(self, name, interval, fn, blocking, due):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.blocking = blocking
+        self.due = due
+        self.future = None  # last blocking run
+        self.runs = 0
+        self.overruns = 0   # ticks skipped because the last run hadn't finished
+
+
+class Runtime:
+    """
+    The event loop thread plus a thread pool for blocking calls.
+
+    every() and cancel() may be called from any thread. A blocking task
+    that is still running when it falls due again is skipped, not queued
+    twice.
+    """
+
+    # Seconds; timers are rounded up to multiples of this
+    GRANULARITY = 0.25
+    # Seconds between wakeup/CPU reports in the log
+    REPORT_INTERVAL = 300
+
+    def __init__(self, workers=4, granularity=GRANULARITY):
+        self.granularity = granularity
+        self.loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='runtime')
+        self.loop.set_default_executor(self._executor)
+        self._tasks = {}      # name -> _Task, only touched on the loop
+        self._handle = None   # loop timer for the earliest due task
+        self._handle_at = None
+        self._thread = None
+
+        # Counters
+        self.timer_wakeups = 0
+        self.io_wakeups = 0
+        self._report_at = None  # (monotonic, process time, wakeups)
+
+    @property
+    def wakeups(self):
+        return self.timer_wakeups + self.io_wakeups
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name='runtime', daemon=True)
+        self._thread.start()
+        self._report_at = (time.monotonic(), time.process_time(), 0)
+        self.every(self.REPORT_INTERVAL, self._report, 'runtime-report')
+
+    def stop(self):
+        if not self.running:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2.0)
+        self._executor.shutdown(wait=False)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    # Scheduling
+
+    def every(self, interval, fn, name, blocking=False, delay=None):
+        """Run fn() every interval seconds (first after delay, default one
+        interval), on the pool if blocking; replaces a task of the same name"""
+        self.call_soon(self._add, name, interval, fn, blocking, interval if delay is None else delay)
+        return name
+
+    def cancel(self, name, wait=0.0):
+        """Stop a task, waiting up to wait seconds for a run in progress"""
+        done = threading.Event()
+        running = []
+
+        def remove():
+            task = self._tasks.pop(name, None)
+            if task is not None and task.future is not None and not task.future.done():
+                running.append(task.future)
+            done.set()
+
+        if threading.current_thread() is self._thread:
+            remove()
+        else:
+            self.call_soon(remove)
+            done.wait(1.0)
+        if wait and running:
+            try:
+                running[0].result(timeout=wait)
+            except Exception:
+                pass
+
+    def call_soon(self, fn, *args):
+        """Run fn(*args) on the loop (from any thread)"""
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    def spawn(self, coro):
+        """Run a coroutine on the loop, returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def submit(self, fn, *args):
+        """Run fn(*args) on the pool"""
+        return self._executor.submit(fn, *args)
+
+    def add_reader(self, fd, fn):
+        """Call fn() on the loop whenever fd is readable"""
+        def ready():
+            self.io_wakeups += 1
+            fn()
+        self.call_soon(self.loop.add_reader, fd, ready)
+
+    def remove_reader(self, fd):
+        if threading.current_thread() is self._thread:
+            self.loop.remove_reader(fd)
+            return
+        done = threading.Event()
+
+        def remove():
+            self.loop.remove_reader(fd)
+            done.set()
+        self.call_soon(remove)
+        done.wait(1.0)
+
+    async def run_blocking(self, fn, *args):
+        return await self.loop.run_in_executor(self._executor, fn, *args)
+
+    def stats(self):
+        now = time.monotonic()
+        at, cpu, wakeups = self._report_at or (now, time.process_time(), self.wakeups)
+        elapsed = max(now - at, 1e-6)
+        return {'wakeups_per_s': round((self.wakeups - wakeups) / elapsed, 2),
+                'cpu_percent': round(100.0 * (time.process_time() - cpu) / elapsed, 2),
+                'tasks': len(self._tasks),
+                'overruns': sum(task.overruns for task in list(self._tasks.values()))}
+
+    # On the loop
+
+    def _grid(self, t):
+        return math.ceil(t / self.granularity - 1e-9) * self.granularity
+
+    def _add(self, name, interval, fn, blocking, delay):
+        now = self.loop.time()
+        self._tasks[name] = _Task(name, interval, fn, blocking, self._grid(now + delay))
+        self._arm()
+
+    def _arm(self):
+        if not self._tasks:
+            return
+        due = min(task.due for task in self._tasks.values())
+        if self._handle is not None:
+            if self._handle_at <= due:
+                return
+            self._handle.cancel()
+        self._handle_at = due
+        self._handle = self.loop.call_at(due, self._tick)
+
+    def _tick(self):
+        self._handle = None
+        self.timer_wakeups += 1
+        now = self.loop.time()
+        for task in list(self._tasks.values()):
+            if task.due > now + 1e-3:
+                continue
+            task.due = self._grid(max(task.due + task.interval, now))
+            if task.blocking:
+                if task.future is not None and not task.future.done():
+                    task.overruns += 1
+                    continue
+                task.future = self._executor.submit(self._call, task)
+            else:
+                self._call(task)
+        self._arm()
+
+    def _call(self, task):
+        task.runs += 1
+        try:
+            task.fn()
+        except Exception as e:
+            logging.debug(f"[Runtime] {task.name} failed: {e}")
+
+    def _report(self):
+        logging.info("[Runtime] %s", self.stats())
+        self._report_at = (time.monotonic(), time.process_time(), self.wakeups)
+
+
+class EventQueue(Queue):
+    """
+    Queue that coroutines on the runtime can await (get_async) without
+    polling; put() from any thread wakes them.
+    """
+
+    def __init__(self, runtime=None):
+        Queue.__init__(self)
+        self._runtime = runtime
+        self._ready = None  # asyncio.Event, created on the loop
+
+    def put(self, item, block=True, timeout=None):
+        Queue.put(self, item, block, timeout)
+        if self._runtime is not None and self._ready is not None:
+            self._runtime.call_soon(self._ready.set)
+
+    async def get_async(self):
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        while True:
+            try:
+                return self.get_nowait()
+            except Empty:
+                self._ready.clear()
+                await self._ready.wait()
+                self._runtime.io_wakeups += 1
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime():
+    """The process-wide runtime, started on first use"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = Runtime()
+            _runtime.start()
+        return _runtime
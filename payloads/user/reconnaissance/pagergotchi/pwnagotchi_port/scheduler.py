@@ -0,0 +1,211 @@
+"""
+Target scheduler for Pagergotchi's auto mode
+Replaces "every AP on every channel, busiest channel first" with a priority
+queue of (AP, action) items scored by expected handshake yield per second of
+airtime. Moving to another channel costs the hop plus the wait for clients
+to reconnect, so a slightly better target elsewhere doesn't win over a good
+one on the current channel.
+
+Items live in one heap per channel (the score without the switch cost
+doesn't depend on where we are), so picking the next item only compares the
+top of each heap. APs reported mid-epoch by recon are offered straight into
+the queue.
+"""
+
+import heapq
+import itertools
+import threading
+
+from pwnagotchi_port.records import mac_to_int
+
+ACTION_ASSOC = 'assoc'
+ACTION_DEAUTH = 'deauth'
+
+
+class TargetScheduler:
+    """
+    Priority queue of (action, AP dict) for one epoch at a time.
+
+    Attempts are remembered across epochs: every attempt at an action on an
+    AP halves its expected yield, and after max_attempts it isn't queued
+    again until forget() (the agent calls it when an AP is lost or
+    captured). Thread-safe, since recon events offer APs from another thread.
+    """
+
+    # Chance one attempt gives a handshake, for a strong PSK AP
+    PMKID_YIELD = 0.3       # association -> PMKID
+    CLIENT_YIELD = 0.25     # per deauthed client -> EAPOL handshake
+    # Signal range (dBm) over which yield scales from RSSI_FLOOR_YIELD to 1
+    RSSI_WEAK = -90
+    RSSI_STRONG = -50
+    RSSI_FLOOR_YIELD = 0.1
+    # Attempt counts kept; over this, begin_epoch() drops APs not in the epoch
+    MAX_REMEMBERED = 4096
+
+    def __init__(self, assoc_time=0.4, deauth_time=0.9, switch_time=5.0, max_attempts=3,
+                 associate=True, deauth=True):
+        self.assoc_time = assoc_time
+        self.deauth_time = deauth_time
+        self.switch_time = switch_time
+        self.max_attempts = max_attempts
+        self.associate = associate
+        self.deauth = deauth
+        self._heaps = {}       # channel -> [(-score, seq, key)]
+        self._entries = {}     # key -> (score, ap, clients, channel); key = (mac, action)
+        self._consumed = set()  # keys handed out this epoch
+        self._attempts = {}    # key -> attempts over all epochs
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def begin_epoch(self, aps):
+        """Start a new epoch with a fresh list of (ap, ranked clients)"""
+        with self._lock:
+            self._heaps.clear()
+            self._entries.clear()
+            self._consumed.clear()
+            macs = set()
+            for ap, clients in aps:
+                macs.add(mac_to_int(ap.get('mac')))
+                self._offer(ap, clients)
+            if len(self._attempts) > self.MAX_REMEMBERED:
+                self._attempts = {key: n for key, n in self._attempts.items() if key[0] in macs}
+
+    def offer(self, ap, clients=None):
+        """Queue or re-score an AP (e.g. new from recon) for this epoch
+
+        clients are the AP's stations worth a deauth, best first; None keeps
+        the ones already known.
+        """
+        with self._lock:
+            self._offer(ap, clients)
+
+    def next(self, channel, stay=False):
+        """Pop the best (action, ap, clients) given the current channel, or None
+
+        With stay only items on channel are considered (see hop_plan.py).
+        """
+        with self._lock:
+            best = None
+            heaps = self._heaps.items()
+            if stay:
+                heaps = [(channel, self._heaps.get(channel, []))]
+            for ch, heap in heaps:
+                while heap and not self._live(heap[0], ch):
+                    heapq.heappop(heap)
+                if not heap:
+                    continue
+                key = heap[0][2]
+                score = self._entries[key][0]
+                if ch != channel:
+                    score = self._with_switch(key, score)
+                if best is None or score > best[0]:
+                    best = (score, ch, key)
+            if best is None:
+                return None
+
+            _score, ch, key = best
+            heapq.heappop(self._heaps[ch])
+            _score, ap, clients, _channel = self._entries.pop(key)
+            self._consumed.add(key)
+            self._attempts[key] = self._attempts.get(key, 0) + 1
+            return key[1], ap, clients
+
+    def workload(self):
+        """What is queued per channel: {channel: (airtime seconds, expected
+        handshakes, any deauths)}"""
+        with self._lock:
+            work = {}
+            for ch, heap in self._heaps.items():
+                seconds, shakes, deauth = 0.0, 0.0, False
+                for item in heap:
+                    if not self._live(item, ch):
+                        continue
+                    key = item[2]
+                    cost = self._action_time(key)
+                    seconds += cost
+                    shakes += self._entries[key][0] * cost
+                    deauth = deauth or key[1] == ACTION_DEAUTH
+                if seconds:
+                    work[ch] = (seconds, shakes, deauth)
+            return work
+
+    def forget(self, ap):
+        """Drop an AP (captured, lost) from the queue and the attempt counts"""
+        mac = mac_to_int(ap['mac'])
+        with self._lock:
+            for action in (ACTION_ASSOC, ACTION_DEAUTH):
+                self._entries.pop((mac, action), None)
+                self._attempts.pop((mac, action), None)
+
+    def _offer(self, ap, clients):
+        mac = mac_to_int(ap.get('mac'))
+        if mac is None:
+            return
+        if clients is None:
+            entry = self._entries.get((mac, ACTION_DEAUTH))
+            clients = entry[2] if entry is not None else []
+
+        channel = ap.get('channel', 0)
+        for action in (ACTION_ASSOC, ACTION_DEAUTH):
+            key = (mac, action)
+            if key in self._consumed:
+                continue
+            score = self._score(ap, action, clients, self._attempts.get(key, 0))
+            if score is None:
+                self._entries.pop(key, None)
+                continue
+            self._entries[key] = (score, ap, clients, channel)
+            # An older heap item for key (other score or channel) is skipped
+            # lazily once it reaches the top
+            heapq.heappush(self._heaps.setdefault(channel, []), (-score, next(self._seq), key))
+            self._prune(channel)
+
+    def _prune(self, channel):
+        """Rebuild a heap that is mostly superseded items"""
+        heap = self._heaps[channel]
+        if len(heap) > 2 * len(self._entries) + 16:
+            live = {}
+            for item in heap:
+                key = item[2]
+                if self._live(item, channel):
+                    live[key] = item
+            self._heaps[channel] = list(live.values())
+            heapq.heapify(self._heaps[channel])
+
+    def _live(self, item, channel):
+        """False for items of channel's heap superseded by a later offer (or
+        already handed out)"""
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[0] == -item[0] and entry[3] == channel
+
+    def _score(self, ap, action, clients, attempts):
+        """Expected handshakes per second of airtime, None if not worth queueing"""
+        if attempts >= self.max_attempts:
+            return None
+        rssi = ap.get('rssi', self.RSSI_WEAK)
+        signal = (rssi - self.RSSI_WEAK) / float(self.RSSI_STRONG - self.RSSI_WEAK)
+        signal = max(self.RSSI_FLOOR_YIELD, min(1.0, signal))
+
+        if action == ACTION_ASSOC:
+            if not self.associate:
+                return None
+            p, cost = self.PMKID_YIELD, self.assoc_time
+        else:
+            if not self.deauth or not clients:
+                return None
+            p = 1.0 - (1.0 - self.CLIENT_YIELD) ** len(clients)
+            cost = self.deauth_time * len(clients)
+        return p * signal * 0.5 ** attempts / max(cost, 0.1)
+
+    def _action_time(self, key):
+        if key[1] == ACTION_DEAUTH:
+            return self.deauth_time * max(1, len(self._entries[key][2]))
+        return self.assoc_time
+
+    def _with_switch(self, key, score):
+        """Score of an item on another channel once the hop is paid for"""
+        action_time = self._action_time(key)
+        return score * action_time / (action_time + self.switch_time)
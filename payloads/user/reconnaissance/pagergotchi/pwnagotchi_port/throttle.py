@@ -0,0 +1,264 @@
+"""
+Adaptive attack throttle and injection budget for Pagergotchi
+throttle_a / throttle_d start from config.conf [timing] and then follow what
+happens: they never drop below how long the backend takes to run the
+command, shrink when handshakes arrive soon after an attack on the AP, and
+grow when attacks produce nothing. A token bucket caps the frames injected
+per second over all targets.
+
+Learned values are kept per environment (the set of BSSIDs around) in
+data/throttle.json, so coming back to the same place starts from what
+worked there last time. An environment is remembered by a fixed-size
+sample of its BSSIDs (the ones with the lowest CRC32, a bottom-k MinHash
+sketch), which is enough to estimate the overlap of two BSSID sets.
+"""
+
+import os
+import json
+import time
+import zlib
+import logging
+import threading
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+PAYLOAD_DIR = os.path.abspath(os.path.join(_THIS_DIR, '..'))
+DATA_DIR = os.path.join(PAYLOAD_DIR, 'data')
+THROTTLE_FILE = os.path.join(DATA_DIR, 'throttle.json')
+
+ASSOC = 'assoc'
+DEAUTH = 'deauth'
+
+# Rough frames on air per backend command, for the injection budget
+FRAMES = {ASSOC: 2, DEAUTH: 4}
+
+
+class TokenBucket:
+    """rate tokens per second, up to burst; rate 0 = unlimited"""
+
+    def __init__(self, rate=0.0, burst=0.0):
+        self.rate = rate
+        self.burst = max(burst, rate)
+        self._tokens = self.burst
+        self._at = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0  # seconds spent waiting for tokens
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._at) * self.rate)
+        self._at = now
+
+    def wait(self, n=1.0, timeout=10.0):
+        """Block until n tokens are available (False on timeout)"""
+        if not self.rate:
+            return True
+        n = min(n, self.burst)
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return True
+                delay = (n - self._tokens) / self.rate
+            if now + delay > deadline:
+                return False
+            time.sleep(delay)
+            self.waited += delay
+
+
+class AdaptiveThrottle:
+    """
+    Per-action throttle (seconds) learned from latency and outcomes.
+
+    sent() records each attack, on_handshake() credits the attacks on that
+    AP that happened within window seconds and settle() counts the rest as
+    misses. Each hit multiplies the throttle by SHRINK and each miss by
+    GROW, within [minimum, maximum] and never below the command latency.
+    """
+
+    SHRINK = 0.85
+    GROW = 1.1
+    # Weight of the newest sample in the latency average
+    LATENCY_ALPHA = 0.2
+    # Environments remembered in the throttle file
+    MAX_ENVIRONMENTS = 32
+    # BSSID overlap (Jaccard) needed to count as the same environment
+    SAME_ENVIRONMENT = 0.3
+    # Epochs in a row that must show the same other environment before
+    # switching to it; on the move every epoch looks new, and the values
+    # keep being learned meanwhile
+    SWITCH_AFTER = 3
+    # BSSIDs kept per environment
+    SAMPLE_SIZE = 64
+
+    def __init__(self, throttle_a=0.4, throttle_d=0.9, window=10.0, minimum=0.1, maximum=5.0,
+                 path=THROTTLE_FILE):
+        self.defaults = {ASSOC: throttle_a, DEAUTH: throttle_d}
+        self.values = dict(self.defaults)
+        self.latency = {ASSOC: 0.0, DEAUTH: 0.0}
+        self.window = window
+        self.minimum = minimum
+        self.maximum = maximum
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}  # (action, ap) -> sent at
+        self._env = None     # environment id in _envs
+        self._envs = {}      # id -> {'bssids', 'assoc', 'deauth', 'latency_*', 'used'}
+        self._candidate = None  # (sample, epochs) of another environment seen lately
+        self._lock = threading.Lock()
+
+    def value(self, action):
+        """Current throttle for action"""
+        return max(self.values[action], self.latency[action])
+
+    def sent(self, action, ap, latency=None, now=None):
+        """An attack on ap (any hashable MAC) went out, taking latency seconds"""
+        with self._lock:
+            if latency is not None:
+                old = self.latency[action]
+                self.latency[action] = latency if not old else \
+                    old + self.LATENCY_ALPHA * (latency - old)
+            self._pending[(action, ap)] = now if now is not None else time.time()
+
+    def on_handshake(self, ap, actions=(ASSOC, DEAUTH), now=None):
+        """A capture for ap arrived: credit recent attacks on it"""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            for action in actions:
+                sent_at = self._pending.pop((action, ap), None)
+                if sent_at is not None and now - sent_at <= self.window:
+                    self.hits += 1
+                    self._adjust(action, self.SHRINK)
+
+    def settle(self, now=None):
+        """Count attacks older than window without a handshake as misses"""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            for key, sent_at in list(self._pending.items()):
+                if now - sent_at > self.window:
+                    del self._pending[key]
+                    self.misses += 1
+                    self._adjust(key[0], self.GROW)
+
+    def _store_current(self):
+        env = self._envs.get(self._env)
+        if env is not None:
+            env['assoc'] = self.values[ASSOC]
+            env['deauth'] = self.values[DEAUTH]
+            env['latency_assoc'] = self.latency[ASSOC]
+            env['latency_deauth'] = self.latency[DEAUTH]
+            env['used'] = time.time()
+
+    def _adjust(self, action, factor):
+        self.values[action] = min(self.maximum, max(self.minimum, self.values[action] * factor))
+
+    def summary(self):
+        return 'throttle_a=%.2f throttle_d=%.2f' % (self.value(ASSOC), self.value(DEAUTH))
+
+    def load(self):
+        """Read the remembered environments (missing or corrupt file = none)"""
+        try:
+            with open(self.path, 'rt') as fp:
+                data = json.load(fp)
+            self._envs = {str(k): v for k, v in data.get('environments', {}).items()
+                          if isinstance(v, dict) and 'bssids' in v}
+            for env in self._envs.values():
+                # Files from before sampling hold every BSSID
+                env['bssids'] = self._sample(env['bssids'])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning(f"[Throttle] Ignoring unreadable {self.path}: {e}")
+            self._envs = {}
+
+    def save(self):
+        """Store the current environment's values (atomically)"""
+        with self._lock:
+            if self._env is None:
+                return
+            self._store_current()
+            if len(self._envs) > self.MAX_ENVIRONMENTS:
+                oldest = sorted(self._envs, key=lambda k: self._envs[k].get('used', 0))
+                for key in oldest[:len(self._envs) - self.MAX_ENVIRONMENTS]:
+                    if key != self._env:
+                        del self._envs[key]
+            envs = dict(self._envs)
+        tmp = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, 'w') as fp:
+                json.dump({'environments': envs}, fp, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logging.error(f"[Throttle] Failed to save {self.path}: {e}")
+
+    def _sample(self, bssids):
+        """Bottom-k sample of a set of BSSID strings"""
+        return sorted(set(bssids), key=_bssid_hash)[:self.SAMPLE_SIZE]
+
+    def _similarity(self, a, b):
+        """Estimated Jaccard overlap of the BSSID sets two samples came from"""
+        a, b = set(a), set(b)
+        union = self._sample(a | b)
+        if not union:
+            return 0.0
+        return sum(1 for bssid in union if bssid in a and bssid in b) / float(len(union))
+
+    def select_environment(self, bssids):
+        """Switch to the remembered environment that best matches the visible
+        BSSIDs (strings), or start a new one, once SWITCH_AFTER epochs in a
+        row have shown the same other environment. Returns True if it changed."""
+        sample = self._sample(b.lower() for b in bssids)
+        if not sample:
+            return False
+        with self._lock:
+            current = self._envs.get(self._env)
+            if current is not None:
+                if self._similarity(current['bssids'], sample) >= self.SAME_ENVIRONMENT:
+                    # Still here; track drift
+                    current['bssids'] = sample
+                    self._candidate = None
+                    return False
+                seen = self._candidate
+                epochs = 1
+                if seen is not None and self._similarity(seen[0], sample) >= self.SAME_ENVIRONMENT:
+                    epochs = seen[1] + 1
+                if epochs < self.SWITCH_AFTER:
+                    self._candidate = (sample, epochs)
+                    return False
+            self._candidate = None
+
+            best, best_overlap = None, 0.0
+            for key, env in self._envs.items():
+                overlap = self._similarity(env['bssids'], sample)
+                if overlap > best_overlap:
+                    best, best_overlap = key, overlap
+            self._store_current()
+            if best is not None and best_overlap >= self.SAME_ENVIRONMENT:
+                env = self._envs[best]
+                env['bssids'] = sample
+                self._env = best
+                self.values = {ASSOC: env.get('assoc', self.defaults[ASSOC]),
+                               DEAUTH: env.get('deauth', self.defaults[DEAUTH])}
+                self.latency = {ASSOC: env.get('latency_assoc', 0.0),
+                                DEAUTH: env.get('latency_deauth', 0.0)}
+                logging.info(f"[Throttle] Known environment, {self.summary()}")
+                return True
+
+            key = '%x' % int(time.time() * 1000)
+            self._envs[key] = {'bssids': sample, 'used': time.time()}
+            self._env = key
+            # New place: start over from the configured values
+            self.values = dict(self.defaults)
+            self.latency = {ASSOC: 0.0, DEAUTH: 0.0}
+            logging.info(f"[Throttle] New environment ({len(sample)} sampled APs), {self.summary()}")
+            return True
+
+
+def _bssid_hash(bssid):
+    # Stable across runs, unlike hash()
+    return zlib.crc32(bssid.encode())
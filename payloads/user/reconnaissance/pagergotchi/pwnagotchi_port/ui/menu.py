@@ -9,6 +9,9 @@ import sys
 import subprocess
 import time
 
+from pwnagotchi_port.command_channel import stream_command
+from pwnagotchi_port.recon import ReconFetcher, recon_ssid
+
 # Payload directory paths (relative to this file's location)
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 PAYLOAD_DIR = os.path.abspath(os.path.join(_THIS_DIR, '..', '..'))
@@ -320,48 +323,19 @@ class StartupMenu:
         networks = []
         seen_bssids = set()
 
-        # Try PineAP first (best option on Pineapple)
+        # Try PineAP first (best option on Pineapple) - walk the whole recon set
         try:
-            result = subprocess.run(
-                ['_pineap', 'RECON', 'APS', 'limit=50', 'format=json'],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                try:
-                    data = json.loads(result.stdout)
-                    aps_list = data if isinstance(data, list) else data.get('aps', data.get('data', []))
-                    for ap in aps_list:
-                        bssid = ap.get('mac', ap.get('bssid', ''))
-                        ssid = ''
-
-                        # Try top-level ssid first
-                        ssid = ap.get('ssid', ap.get('essid', ap.get('name', '')))
-
-                        # If no ssid at top level, check inside beacon dict
-                        if not ssid and 'beacon' in ap:
-                            beacon = ap['beacon']
-                            if isinstance(beacon, dict):
-                                for beacon_key, beacon_data in beacon.items():
-                                    if isinstance(beacon_data, dict):
-                                        ssid = beacon_data.get('ssid', '')
-                                        if ssid:
-                                            break
-
-                        # Also check response dict
-                        if not ssid and 'response' in ap:
-                            response = ap['response']
-                            if isinstance(response, dict):
-                                for resp_key, resp_data in response.items():
-                                    if isinstance(resp_data, dict):
-                                        ssid = resp_data.get('ssid', '')
-                                        if ssid:
-                                            break
-
-                        if bssid and bssid not in seen_bssids:
-                            seen_bssids.add(bssid)
-                            networks.append({'ssid': ssid or '<hidden>', 'bssid': bssid})
-                except json.JSONDecodeError:
-                    pass
+            fetcher = ReconFetcher(stream_command)
+            signals = {}
+            for page in fetcher.pages():
+                for ap in page:
+                    bssid = ap.get('mac', ap.get('bssid', ''))
+                    if bssid and bssid not in seen_bssids:
+                        seen_bssids.add(bssid)
+                        signals[bssid] = ap.get('signal', -100)
+                        networks.append({'ssid': recon_ssid(ap) or '<hidden>', 'bssid': bssid})
+            # Strongest first so nearby networks are at the top of the list
+            networks.sort(key=lambda n: signals.get(n['bssid'], -100), reverse=True)
         except Exception:
             pass
 
@@ -387,7 +361,7 @@ class StartupMenu:
             except:
                 pass
 
-        return networks[:20]
+        return networks
 
     def _wait_button(self, timeout=None):
         """Wait for a button press using thread-safe event queue"""
@@ -7,7 +7,6 @@ Uses libpagerctl.so for native rendering instead of PIL
 
 import os
 import sys
-import threading
 import logging
 import random
 import time
@@ -28,6 +27,7 @@ import pwnagotchi_port.utils as utils
 from pwnagotchi_port.ui.components import Text, LabeledValue, Line
 from pwnagotchi_port.ui.state import State
 from pwnagotchi_port.voice import Voice
+from pwnagotchi_port.runtime import get_runtime
 from pwnagotchi_port.ui.menu import (
     load_settings, save_settings, obfuscate_gps, get_view_theme, get_menu_theme,
     THEME_NAMES, FONT_DEJAVU, TTF_MEDIUM, TTF_LARGE, TTF_SMALL
@@ -263,19 +263,19 @@ class View:
         self._is_dimmed = False
         self._dim_level = 20
 
-        # Start refresh thread
-        self._refresh_stop = False
+        # Periodic refresh and uptime run on the shared runtime's loop (a
+        # redraw takes milliseconds, handing it to the pool costs more)
+        self._runtime = get_runtime()
         self._returning_to_menu = False
         fps = config.get('ui', {}).get('fps', 2.0)
         if fps > 0.0:
             self._ignore_changes = ()
-            threading.Thread(target=self._refresh_handler, daemon=True).start()
+            self._runtime.every(1.0 / fps, self._refresh_handler, 'display')
         else:
             self._ignore_changes = ('uptime', 'name')
 
-        # Start dedicated uptime thread for 1-second updates
-        self._uptime_stop = False
-        threading.Thread(target=self._uptime_handler, daemon=True).start()
+        # Uptime updates every second
+        self._runtime.every(1.0, self._uptime_handler, 'uptime')
 
     def set_agent(self, agent):
         self._agent = agent
@@ -325,26 +325,21 @@ class View:
             self._render_cbs.append(cb)
 
     def _refresh_handler(self):
-        """Background thread to refresh display"""
-        delay = 1.0 / self._config.get('ui', {}).get('fps', 2.0)
-        while not self._refresh_stop:
-            try:
-                # Skip all rendering/IO when menu is active — button handler owns
-                # drawing and auto-dim is unnecessary during active menu use
-                if self._agent and getattr(self._agent, '_menu_active', False):
-                    time.sleep(delay)
-                    continue
-
-                # Don't overwrite "Returning to menu..." screen
-                if getattr(self, '_returning_to_menu', False):
-                    time.sleep(delay)
-                    continue
-
-                self._check_auto_dim()
-                self.update()
-            except Exception as e:
-                logging.warning(f"Display update error: {e}")
-            time.sleep(delay)
+        """One display refresh, run by the runtime every 1/fps seconds"""
+        try:
+            # Skip all rendering/IO when menu is active — button handler owns
+            # drawing and auto-dim is unnecessary during active menu use
+            if self._agent and getattr(self._agent, '_menu_active', False):
+                return
+
+            # Don't overwrite "Returning to menu..." screen
+            if getattr(self, '_returning_to_menu', False):
+                return
+
+            self._check_auto_dim()
+            self.update()
+        except Exception as e:
+            logging.warning(f"Display update error: {e}")
 
     def init_pause_menu(self, agent):
         """Initialize pause menu state and draw immediately"""
@@ -653,15 +648,13 @@ class View:
         self._display.flip()
 
     def _uptime_handler(self):
-        """Dedicated thread to update uptime every second"""
-        while not self._uptime_stop:
-            try:
-                uptime_secs = pwnagotchi.uptime()
-                time_str = utils.secs_to_hhmmss(uptime_secs)
-                self.set('uptime', time_str)
-            except Exception as e:
-                logging.debug(f"Uptime update error: {e}")
-            time.sleep(1.0)
+        """Update uptime, run by the runtime every second"""
+        try:
+            uptime_secs = pwnagotchi.uptime()
+            time_str = utils.secs_to_hhmmss(uptime_secs)
+            self.set('uptime', time_str)
+        except Exception as e:
+            logging.debug(f"Uptime update error: {e}")
 
     def set(self, key, value):
         self._state.set(key, value)
@@ -936,8 +929,7 @@ class View:
 
     def cleanup(self):
         """Clean up display"""
-        self._refresh_stop = True
-        self._uptime_stop = True
-        # Small delay to let threads see the stop flags
-        time.sleep(0.1)
+        # Returns after a refresh in progress (on the loop) has finished
+        self._runtime.cancel('display')
+        self._runtime.cancel('uptime')
         self._display.cleanup()
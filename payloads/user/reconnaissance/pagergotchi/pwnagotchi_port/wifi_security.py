@@ -0,0 +1,284 @@
+"""
+AP security detection for Pagergotchi
+Works out encryption, key management (AKM) and management frame protection
+(PMF) from beacon information elements (RSN / WPA vendor IE) or from the
+textual security fields recon sources report, and decides whether an AP can
+yield a crackable PSK handshake at all.
+
+Results use bettercap's field names: encryption ('OPEN', 'WEP', 'WPA',
+'WPA2', 'WPA3', 'OWE'), cipher ('CCMP', 'TKIP', ...) and authentication
+('PSK', 'SAE', 'MGT', or several joined with '/'), plus pmf ('', 'capable',
+'required'). An empty authentication means "unknown", an empty encryption
+that the AP's security isn't known at all (the source gave none); both are
+attacked as if PSK.
+"""
+
+import binascii
+
+IE_RSN = 48
+IE_VENDOR = 221
+
+RSN_OUI = b'\x00\x0f\xac'
+WPA_OUI = b'\x00\x50\xf2'
+
+# RSN capabilities
+RSN_CAP_MFPR = 0x0040
+RSN_CAP_MFPC = 0x0080
+
+# Cipher suite type -> name (same numbers under the RSN and WPA OUIs)
+CIPHERS = {
+    1: 'WEP', 2: 'TKIP', 4: 'CCMP', 5: 'WEP',
+    8: 'GCMP', 9: 'GCMP256', 10: 'CCMP256',
+}
+
+# RSN AKM suite type -> authentication
+RSN_AKMS = {
+    1: 'MGT', 2: 'PSK', 3: 'MGT', 4: 'PSK', 5: 'MGT', 6: 'PSK',
+    8: 'SAE', 9: 'SAE', 11: 'MGT', 12: 'MGT', 13: 'MGT',
+    18: 'OWE', 24: 'SAE', 25: 'SAE',
+}
+WPA_AKMS = {1: 'MGT', 2: 'PSK'}
+
+# Preferred order when an AP advertises several AKMs
+_AUTH_ORDER = ('PSK', 'SAE', 'MGT', 'OWE')
+
+# Defaults for the [targeting] config section
+DEFAULT_POLICY = {
+    'skip_open': True,
+    'skip_wep': True,
+    'skip_enterprise': True,
+    'skip_sae_only': True,
+    'deauth_pmf_required': False,
+}
+
+
+def iter_ies(data):
+    """Yield (id, body) for each tagged parameter in an IE blob"""
+    pos = 0
+    end = len(data)
+    while pos + 2 <= end:
+        ie_id = data[pos]
+        length = data[pos + 1]
+        body = data[pos + 2:pos + 2 + length]
+        if len(body) < length:
+            return
+        yield ie_id, body
+        pos += 2 + length
+
+
+def _suites(body, pos, oui, table):
+    """Read a count-prefixed suite list, returns (names, new pos)"""
+    if pos + 2 > len(body):
+        return [], len(body)
+    count = int.from_bytes(body[pos:pos + 2], 'little')
+    pos += 2
+    names = []
+    for _ in range(count):
+        suite = body[pos:pos + 4]
+        if len(suite) < 4:
+            break
+        if suite[:3] == oui and suite[3] in table:
+            names.append(table[suite[3]])
+        pos += 4
+    return names, pos
+
+
+def parse_rsn(body, oui=RSN_OUI, akms=RSN_AKMS):
+    """Parse an RSN IE body (or a WPA vendor IE body after its OUI/type)
+
+    Returns {'ciphers': [...], 'akms': [...], 'pmf': ''|'capable'|'required'}.
+    Missing trailing fields take their 802.11 defaults (CCMP/TKIP, 802.1X).
+    """
+    ciphers, pos = _suites(body, 6, oui, CIPHERS)
+    auths, pos = _suites(body, pos, oui, akms)
+    pmf = ''
+    if pos + 2 <= len(body):
+        caps = int.from_bytes(body[pos:pos + 2], 'little')
+        if caps & RSN_CAP_MFPR:
+            pmf = 'required'
+        elif caps & RSN_CAP_MFPC:
+            pmf = 'capable'
+    return {'ciphers': ciphers, 'akms': auths, 'pmf': pmf}
+
+
+def _join_auth(auths):
+    return '/'.join(a for a in _AUTH_ORDER if a in auths)
+
+
+def security_from_ies(data, privacy=None):
+    """Security fields from a beacon/probe response IE blob
+
+    privacy is the capability Privacy bit if known; without any RSN/WPA IE
+    it tells WEP from OPEN. Returns None if the blob says nothing.
+    """
+    rsn = wpa = None
+    for ie_id, body in iter_ies(data):
+        if ie_id == IE_RSN and len(body) >= 2:
+            rsn = parse_rsn(body)
+        elif ie_id == IE_VENDOR and body[:4] == WPA_OUI + b'\x01':
+            wpa = parse_rsn(body[4:], WPA_OUI, WPA_AKMS)
+
+    if rsn is not None:
+        auths = set(rsn['akms'])
+        if auths == {'OWE'}:
+            encryption = 'OWE'
+        elif 'SAE' in auths and 'PSK' not in auths:
+            encryption = 'WPA3'
+        else:
+            encryption = 'WPA2'
+        return {
+            'encryption': encryption,
+            'cipher': (rsn['ciphers'] or ['CCMP'])[0],
+            'authentication': _join_auth(auths or {'MGT'}),
+            'pmf': rsn['pmf'],
+        }
+    if wpa is not None:
+        return {
+            'encryption': 'WPA',
+            'cipher': (wpa['ciphers'] or ['TKIP'])[0],
+            'authentication': _join_auth(set(wpa['akms']) or {'MGT'}),
+            'pmf': '',
+        }
+    if privacy is None:
+        return None
+    return {
+        'encryption': 'WEP' if privacy else 'OPEN',
+        'cipher': 'WEP' if privacy else '',
+        'authentication': '',
+        'pmf': '',
+    }
+
+
+def security_from_text(text):
+    """Security fields from a textual description ('WPA2 PSK', 'wpa3-sae', 'none', ...)
+
+    Returns None for empty text.
+    """
+    text = str(text or '').strip().upper().replace('_', '-')
+    if not text:
+        return None
+    if text in ('OPEN', 'NONE', 'OFF', 'NO'):
+        return {'encryption': 'OPEN', 'cipher': '', 'authentication': '', 'pmf': ''}
+    if 'OWE' in text:
+        return {'encryption': 'OWE', 'cipher': 'CCMP', 'authentication': 'OWE', 'pmf': 'required'}
+    if 'WEP' in text:
+        return {'encryption': 'WEP', 'cipher': 'WEP', 'authentication': '', 'pmf': ''}
+
+    auths = set()
+    if 'PSK' in text or 'PERSONAL' in text:
+        auths.add('PSK')
+    if 'SAE' in text:
+        auths.add('SAE')
+    if 'EAP' in text or '802.1X' in text or 'MGT' in text or 'ENTERPRISE' in text:
+        auths.add('MGT')
+
+    if 'WPA3' in text:
+        if 'WPA2' in text or 'PSK' in auths:
+            encryption = 'WPA2'
+            auths.update(('PSK', 'SAE'))
+        else:
+            encryption = 'WPA3'
+            if 'MGT' not in auths:
+                auths.add('SAE')
+    elif 'WPA2' in text or 'RSN' in text:
+        encryption = 'WPA2'
+    elif 'WPA' in text:
+        encryption = 'WPA'
+    else:
+        return None
+
+    cipher = 'TKIP' if 'TKIP' in text and 'CCMP' not in text else 'CCMP'
+    pmf = 'required' if encryption == 'WPA3' else ''
+    return {'encryption': encryption, 'cipher': cipher,
+            'authentication': _join_auth(auths), 'pmf': pmf}
+
+
+def _hex_bytes(value):
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    try:
+        return binascii.unhexlify(str(value).replace(':', '').replace(' ', ''))
+    except (binascii.Error, ValueError):
+        return None
+
+
+# Fields set by the functions below
+SECURITY_FIELDS = ('encryption', 'cipher', 'authentication', 'pmf')
+
+
+def unknown_security():
+    """Security fields for an AP the source gave no security information for
+
+    security_known=False tells the AP table not to overwrite what it
+    already detected with these.
+    """
+    return {'encryption': '', 'cipher': '', 'authentication': '', 'pmf': '', 'security_known': False}
+
+
+def recon_security(entry):
+    """Security fields from one recon AP entry (or one of its beacon sections)
+
+    Looks for a raw IE blob first, then textual security fields, then the
+    Privacy bit. Returns None if the entry carries no security information.
+    """
+    if not isinstance(entry, dict):
+        return None
+
+    privacy = entry.get('privacy')
+    if privacy is None and isinstance(entry.get('capabilities'), int):
+        privacy = bool(entry['capabilities'] & 0x0010)
+
+    for key in ('ies', 'ie', 'tags', 'rsn'):
+        data = _hex_bytes(entry[key]) if entry.get(key) else None
+        if data:
+            if key == 'rsn' and data[0] != IE_RSN:
+                # Bare RSN body, wrap it as a tagged parameter
+                data = bytes((IE_RSN, len(data))) + data
+            sec = security_from_ies(data, privacy)
+            if sec is not None:
+                return sec
+
+    for key in ('encryption', 'security', 'crypto', 'auth', 'akm'):
+        value = entry.get(key)
+        if isinstance(value, (list, tuple)):
+            value = ' '.join(str(v) for v in value)
+        sec = security_from_text(value)
+        if sec is not None:
+            pmf = entry.get('pmf', entry.get('mfp'))
+            if isinstance(pmf, str) and pmf.lower() in ('capable', 'required'):
+                sec['pmf'] = pmf.lower()
+            return sec
+
+    if privacy is not None:
+        return security_from_ies(b'', bool(privacy))
+    return None
+
+
+def skip_reason(ap, policy=None):
+    """Why an AP can't give a crackable handshake under policy ('' if it can)
+
+    ap is a bettercap-style AP dict. APs with unknown security or
+    authentication are assumed to be PSK.
+    """
+    policy = policy or DEFAULT_POLICY
+    encryption = ap.get('encryption', '')
+    auths = set(filter(None, ap.get('authentication', '').split('/')))
+
+    if not encryption:
+        return ''
+    if encryption in ('OPEN', 'OWE'):
+        return 'open' if policy.get('skip_open', True) else ''
+    if encryption == 'WEP':
+        return 'wep' if policy.get('skip_wep', True) else ''
+    if auths and 'PSK' not in auths:
+        if 'SAE' in auths and policy.get('skip_sae_only', True):
+            return 'sae-only'
+        if 'MGT' in auths and policy.get('skip_enterprise', True):
+            return 'enterprise'
+    return ''
+
+
+def deauth_useful(ap, policy=None):
+    """False if deauths are ignored by the AP's clients (PMF required)"""
+    policy = policy or DEFAULT_POLICY
+    return ap.get('pmf', '') != 'required' or policy.get('deauth_pmf_required', False)
@@ -0,0 +1,26 @@
+-- Sample of what pineapd writes to /root/recon/pager.db (--reconpath
+-- /root/recon/ --reconname pager). last_seen is in milliseconds, as some
+-- builds store it; the 5 GHz AP has no channel, only a frequency.
+CREATE TABLE wifi_ap (
+    bssid TEXT PRIMARY KEY,
+    ssid TEXT,
+    channel INTEGER,
+    freq INTEGER,
+    signal INTEGER,
+    encryption TEXT,
+    akm TEXT,
+    pmf TEXT,
+    last_seen INTEGER
+);
+INSERT INTO wifi_ap VALUES ('aa:bb:cc:00:00:01', 'HomeNet', 6, 2437, -48, 'WPA2 CCMP', 'PSK', '', 1700000000000);
+INSERT INTO wifi_ap VALUES ('aa:bb:cc:00:00:02', 'Office', 0, 5180, -71, 'WPA3 CCMP', 'SAE', 'required', 1700000001000);
+INSERT INTO wifi_ap VALUES ('aa:bb:cc:00:00:03', '', 11, 2462, -80, 'OPEN', '', '', 1700000002000);
+
+CREATE TABLE wifi_client (
+    mac TEXT,
+    bssid TEXT,
+    signal INTEGER,
+    last_seen INTEGER
+);
+INSERT INTO wifi_client VALUES ('11:22:33:44:55:01', 'aa:bb:cc:00:00:01', -52, 1700000000500);
+INSERT INTO wifi_client VALUES ('11:22:33:44:55:02', 'aa:bb:cc:00:00:02', -75, 1700000001500);
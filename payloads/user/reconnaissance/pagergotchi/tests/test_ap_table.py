@@ -0,0 +1,63 @@
+"""APTable merging of recon polls"""
+
+import queue
+
+from pwnagotchi_port.ap_table import APTable
+from pwnagotchi_port.recon import parse_recon_ap
+from pwnagotchi_port.records import mac_to_int
+from pwnagotchi_port.wifi_security import skip_reason
+
+MAC = 'AA:BB:CC:00:00:01'
+KEY = mac_to_int(MAC)
+
+
+def recon_entry(**fields):
+    entry = {'mac': MAC, 'signal': -50, 'beacon': {'h': {'channel': 6, 'ssid': 'Net'}}}
+    entry.update(fields)
+    return parse_recon_ap(entry)
+
+
+def test_unknown_security_keeps_detected():
+    table = APTable()
+    table.merge([recon_entry(encryption='OPEN')], now=100.0)
+    new, changed = table.merge([recon_entry()], now=101.0)
+    assert (new, changed) == ([], [])
+    assert table.records[KEY].encryption == 'OPEN'
+    assert skip_reason(table.records[KEY].view()) == 'open'
+
+    table.merge([recon_entry(encryption='WPA3 SAE')], now=102.0)
+    table.merge([recon_entry()], now=103.0)
+    assert table.records[KEY].encryption == 'WPA3'
+    assert skip_reason(table.records[KEY].view()) == 'sae-only'
+
+
+def test_unknown_security_is_attacked():
+    table = APTable()
+    table.merge([recon_entry()], now=100.0)
+    rec = table.records[KEY]
+    assert rec.encryption == ''
+    assert skip_reason(rec.view()) == ''
+
+    table.merge([recon_entry(encryption='WPA2 PSK')], now=101.0)
+    assert table.records[KEY].encryption == 'WPA2'
+
+
+def test_cleared_fields_are_taken():
+    events = queue.Queue()
+    table = APTable(events)
+    table.merge([recon_entry(encryption='WPA2 PSK', pmf='capable')], now=100.0)
+    assert table.records[KEY].pmf == 'capable'
+
+    events.get_nowait()
+    table.merge([recon_entry(encryption='WPA2 PSK')], now=101.0)
+    assert table.records[KEY].pmf == ''
+    event = events.get_nowait()
+    assert event['tag'] == 'wifi.ap.changed' and event['data']['changed'] == ['pmf']
+
+
+def test_missing_ssid_keeps_known():
+    table = APTable()
+    table.merge([recon_entry(encryption='WPA2 PSK')], now=100.0)
+    hidden = recon_entry(encryption='WPA2 PSK', beacon={'h': {'channel': 6, 'ssid': ''}})
+    table.merge([hidden], now=101.0)
+    assert table.records[KEY].hostname == 'Net'
@@ -0,0 +1,55 @@
+"""Deauth target ranking from client tracker statistics"""
+
+from pwnagotchi_port.client_priority import client_skip_reason, rank_clients
+from pwnagotchi_port.records import ClientRecord, mac_to_int
+
+NOW = 10000.0
+
+
+def station(mac, first_seen, frames=(), rssi=-60):
+    """ClientRecord view after (time, null) frames"""
+    rec = ClientRecord(mac_to_int(mac), first_seen, rssi=rssi)
+    for when, null in frames:
+        rec.add_frame(when, null)
+    return rec.view()
+
+
+def test_null_only_station_is_not_idle():
+    # Waking from power save: one null frame 2s ago
+    sta = station('11:22:33:44:55:01', NOW - 2, [(NOW - 2, True)])
+    assert 'last_active' not in sta
+    assert client_skip_reason(sta, now=NOW) == ''
+    assert rank_clients([sta], now=NOW) == [sta]
+
+
+def test_null_only_station_goes_idle():
+    sta = station('11:22:33:44:55:01', NOW - 300, [(NOW - 300, True), (NOW - 5, True)])
+    assert client_skip_reason(sta, now=NOW) == 'idle'
+    assert rank_clients([sta], now=NOW) == []
+
+
+def test_active_station():
+    sta = station('11:22:33:44:55:02', NOW - 1000, [(NOW - 1000, False), (NOW - 10, False)])
+    assert client_skip_reason(sta, now=NOW) == ''
+    stale = station('11:22:33:44:55:03', NOW - 1000, [(NOW - 500, False)])
+    assert client_skip_reason(stale, now=NOW) == 'idle'
+
+
+def test_weak_station():
+    sta = station('11:22:33:44:55:04', NOW - 5, [(NOW - 5, False)], rssi=-92)
+    assert client_skip_reason(sta, now=NOW) == 'weak'
+
+
+def test_station_without_statistics():
+    # Recon database rows: no frames, no first_seen
+    sta = {'mac': '11:22:33:44:55:05', 'rssi': -70}
+    assert client_skip_reason(sta, now=NOW) == ''
+    assert client_skip_reason(station('11:22:33:44:55:06', NOW - 5000), now=NOW) == ''
+
+
+def test_ranking():
+    active = station('11:22:33:44:55:07', NOW - 100, [(NOW - 3, False)])
+    waking = station('11:22:33:44:55:08', NOW - 20, [(NOW - 20, True)])
+    unknown = {'mac': '11:22:33:44:55:09'}
+    idle = station('11:22:33:44:55:0a', NOW - 900, [(NOW - 900, False)])
+    assert rank_clients([unknown, idle, waking, active], now=NOW) == [active, waking, unknown]
@@ -0,0 +1,80 @@
+"""ClientTable bounds under churn: LRU cap, TTL expiry and the per-AP index"""
+
+import random
+
+from pwnagotchi_port.client_table import ClientTable
+
+
+def assert_consistent(table):
+    pairs = {(ap, sta) for ap, stations in table._by_ap.items() for sta in stations}
+    assert pairs == set(table._lru)
+    assert all(stations for stations in table._by_ap.values())
+    for (ap, sta), rec in table._lru.items():
+        assert table._by_ap[ap][sta] is rec
+    assert len(table) <= table.max_clients
+
+
+def test_churn_soak():
+    # Two hours: 100 regulars on 20 APs and a stream of passers-by, busy
+    # enough to hit the cap for the first hour (eviction), then quieter
+    # (TTL expiry)
+    rng = random.Random(3)
+    table = ClientTable(ttl=300, max_clients=500)
+    regulars = [(rng.randrange(20), 0x100000 + i) for i in range(100)]
+    added = 0
+    for second in range(7200):
+        now = 1000.0 + second
+        if second == 3600:
+            assert len(table) == table.max_clients
+            assert table.evicted > 0
+        elif second == 3600 + table.ttl:
+            # The busy hour's passers-by have timed out, no more evictions
+            assert len(table) < table.max_clients
+            evicted = table.evicted
+        for ap, sta in rng.sample(regulars, 10):
+            added += table.touch(ap, sta, now, rssi=-60, null=rng.random() < 0.3)
+        for _ in range(rng.randrange(6 if second < 3600 else 2)):
+            added += table.touch(1000 + rng.randrange(400), rng.getrandbits(48), now, rssi=-80)
+        if second % 3 == 0:
+            table.expire(now)
+        if second % 60 == 0:
+            assert_consistent(table)
+
+    assert_consistent(table)
+    assert table.evicted == evicted and table.expired > 0
+    assert 100 < len(table) < 300
+    # Every pair added is still in the table, evicted or expired
+    assert added == len(table) + table.evicted + table.expired
+    # Regulars are seen every few seconds and stay at the recent end
+    for ap, sta in regulars:
+        assert (ap, sta) in table._lru
+    stats = table.stats()
+    assert (stats['clients'], stats['evicted'], stats['expired']) == (len(table), table.evicted, table.expired)
+
+
+def test_ttl_expiry():
+    table = ClientTable(ttl=300, max_clients=100)
+    for i in range(50):
+        table.touch(i % 5, i, 1000.0 + i)
+    assert table.expire(1000.0 + 300 + 9) == 10
+    assert len(table) == 40
+    assert_consistent(table)
+
+    # A sighting moves a station to the back of the queue
+    table.touch(0, 10, 1400.0)
+    assert table.expire(1400.0 + 1) == 39
+    assert [rec.mac for rec in table.clients_for(0)] == [10]
+    assert table.expire(2000.0) == 1
+    assert len(table) == 0 and table._by_ap == {}
+
+
+def test_eviction_order():
+    table = ClientTable(ttl=0, max_clients=3)
+    for sta in range(3):
+        table.touch(1, sta, 100.0 + sta)
+    table.touch(1, 0, 200.0)  # 1 is now the oldest
+    assert table.touch(2, 9, 201.0)
+    assert table.evicted == 1
+    assert {rec.mac for rec in table.clients_for(1)} == {0, 2}
+    assert table.expire(10 ** 9) == 0  # no TTL
+    assert_consistent(table)
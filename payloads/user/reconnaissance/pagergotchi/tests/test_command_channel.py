@@ -0,0 +1,60 @@
+"""CommandChannel replies: stdout and stderr kept apart, timeouts"""
+
+import os
+import time
+
+import pytest
+
+from pwnagotchi_port.command_channel import CommandChannel, stream_command
+from pwnagotchi_port.recon import iter_json_array
+
+pytestmark = pytest.mark.skipif(not os.path.exists(CommandChannel.SHELL),
+                                reason='needs %s' % CommandChannel.SHELL)
+
+# A warning on stderr around JSON data on stdout
+NOISY_JSON = ['sh', '-c', 'echo "[warn] low memory" >&2; echo \'[{"mac": "aa"},\'; '
+              'echo "[x]" >&2; echo \'{"mac": "bb"}]\'']
+
+
+def alive(pid):
+    try:
+        with open('/proc/%d/stat' % pid) as fp:
+            return fp.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@pytest.fixture
+def channel():
+    channel = CommandChannel()
+    yield channel
+    channel.close()
+
+
+def test_run_keeps_stderr_apart(channel):
+    assert channel.run(['sh', '-c', 'echo out; echo err >&2; exit 3']) == ('out', 'err', 3)
+    # Data only on stderr (as _pineap prints it) is still the reply
+    assert channel.run(['sh', '-c', 'echo data >&2']) == ('data', 'data', 0)
+    assert channel.stats.snapshot()['sh -c']['channel'] == 2
+
+
+def test_stream_yields_stdout_only(channel):
+    for stream in (channel.stream, stream_command):
+        macs = [ap['mac'] for ap in iter_json_array(stream(NOISY_JSON, 5))]
+        assert macs == ['aa', 'bb']
+    assert ''.join(channel.stream(['sh', '-c', 'echo "[1]" >&2'], 5)).strip() == '[1]'
+    assert ''.join(stream_command(['sh', '-c', 'echo "[1]" >&2'], 5)).strip() == '[1]'
+
+
+def test_timeout_kills_the_command(channel, tmp_path):
+    pidfile = tmp_path / 'pid'
+    start = time.monotonic()
+    assert channel.run(['sh', '-c', 'echo $$ > %s; exec sleep 30' % pidfile], timeout=0.5) == ('', 'timeout', -1)
+    assert time.monotonic() - start < 5
+    pid = int(pidfile.read_text())
+    deadline = time.monotonic() + 2
+    while alive(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not alive(pid)
+    # A fresh shell takes over
+    assert channel.run(['echo', 'again']) == ('again', '', 0)
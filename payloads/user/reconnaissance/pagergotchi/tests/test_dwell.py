@@ -0,0 +1,64 @@
+"""Dwell history recording and the offline replay evaluation"""
+
+import random
+
+from pwnagotchi_port.ai.dwell import DwellBandit, VisitHistory, evaluate, read_history
+
+
+def history(rng, visits=400):
+    """Visits with dwells explored evenly; channel 1 pays off for long
+    dwells, channel 6 never does"""
+    records = []
+    for _ in range(visits):
+        channel = rng.choice((1, 6))
+        dwell = rng.choice((5.0, 10.0))
+        shakes = 1 if channel == 1 and dwell == 10.0 else 0
+        records.append({'channel': channel, 'dwell': dwell, 'shakes': shakes,
+                        'seconds': dwell + 2.0, 'deauth': True, 'fixed': 10.0})
+    return records
+
+
+def test_evaluate_fixed_policy_counts_matching_visits():
+    visits = [
+        {'channel': 1, 'dwell': 5.0, 'shakes': 0, 'seconds': 6.0, 'fixed': 5},
+        {'channel': 1, 'dwell': 10.0, 'shakes': 2, 'seconds': 11.0, 'fixed': 5},
+        {'channel': 6, 'dwell': 5.0, 'shakes': 1, 'seconds': 7.0, 'fixed': 5},
+    ]
+    # An int fixed dwell matches the float recorded one
+    assert evaluate(visits, lambda v: v['fixed']) == (2, 1.0, 13.0)
+    assert evaluate(visits, lambda v: 20.0) == (0, 0.0, 0.0)
+
+
+def test_evaluate_bandit_learns_the_better_dwell():
+    visits = history(random.Random(1))
+    fixed_short = evaluate(visits, lambda v: 5.0)
+    matched, shakes, seconds = evaluate(
+        visits, DwellBandit((5.0, 10.0), path=None, history=None, rng=random.Random(2)))
+    # Roughly half the visits match whatever the bandit picks
+    assert 0.3 * len(visits) < matched < 0.7 * len(visits)
+    assert shakes / seconds > fixed_short[1] / fixed_short[2]
+    # ...and it ends up preferring 10s where that pays off
+    bandit = DwellBandit((5.0, 10.0), path=None, history=None, rng=random.Random(3))
+    evaluate(visits, bandit)
+    expected = bandit.expected(1)
+    assert expected[10.0] > expected[5.0]
+
+
+def test_visit_history_round_trip_and_trim(tmp_path, monkeypatch):
+    path = str(tmp_path / 'data' / 'dwell_history.jsonl')
+    monkeypatch.setattr(VisitHistory, 'MAX_HISTORY', 10)
+    log = VisitHistory(path)
+    for i in range(12):
+        log.append({'channel': 1, 'dwell': 5, 'shakes': i, 'seconds': 6.0, 'fixed': 5, 'policy': 'fixed'})
+    visits = read_history(path)
+    # Trimmed to the newer half once full, then appended to
+    assert [v['shakes'] for v in visits] == [5, 6, 7, 8, 9, 10, 11]
+    assert evaluate(visits, lambda v: v['fixed'])[0] == len(visits)
+
+
+def test_bandit_update_appends_history(tmp_path):
+    path = str(tmp_path / 'dwell_history.jsonl')
+    bandit = DwellBandit((5.0, 10.0), path=None, history=path)
+    bandit.update(1, 5.0, 1, 6.0, {'channel': 1, 'dwell': 5.0, 'shakes': 1, 'seconds': 6.0})
+    bandit.update(1, 5.0, 0, 6.0)
+    assert read_history(path) == [{'channel': 1, 'dwell': 5.0, 'shakes': 1, 'seconds': 6.0}]
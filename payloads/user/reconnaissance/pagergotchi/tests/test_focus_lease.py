@@ -0,0 +1,111 @@
+"""FocusLeases: EXAMINE commands sent outside the lock, focus ends on the runtime loop"""
+
+import threading
+import time
+
+import pytest
+
+from pwnagotchi_port.focus_lease import FocusConflict, FocusLeases, OWNER_HOP
+from pwnagotchi_port.runtime import Runtime
+
+AP = 'AA:BB:CC:00:00:01'
+OTHER = 'AA:BB:CC:00:00:02'
+
+
+@pytest.fixture
+def runtime():
+    rt = Runtime(workers=2)
+    rt.start()
+    yield rt
+    rt.stop()
+
+
+class Pineap:
+    """run(command) recording EXAMINE commands; BSSID locks can be held up"""
+
+    def __init__(self):
+        self.commands = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, command):
+        if command[2] == 'BSSID':
+            self.release.wait(5)
+        self.commands.append(' '.join(command[2:]))
+        return '', '', 0
+
+
+def test_slow_command_does_not_hold_the_lock(runtime):
+    pineap = Pineap()
+    leases = FocusLeases(pineap, bssid_lease=1.0, runtime=runtime)
+    leases.lock_channel(6, 30)
+    pineap.release.clear()
+    worker = threading.Thread(target=leases.focus_bssid, args=(AP, 6))
+    worker.start()
+    time.sleep(0.1)
+
+    # The focus is decided while its EXAMINE is still being sent
+    start = time.monotonic()
+    assert leases.bssid == AP
+    assert leases.channel == 6
+    leases.touch(6, 1.0)
+    assert leases.lock_channel(11, owner=OWNER_HOP) is False
+    assert leases.stats()['granted'] == 2
+    assert time.monotonic() - start < 0.05
+    assert worker.is_alive()
+
+    pineap.release.set()
+    worker.join(1)
+    assert pineap.commands == ['CHANNEL 6 30', 'BSSID %s 1' % AP]
+
+
+def test_commands_keep_their_order(runtime):
+    pineap = Pineap()
+    leases = FocusLeases(pineap, bssid_lease=0.5, runtime=runtime)
+    leases.lock_channel(6, 30)
+    pineap.release.clear()
+    worker = threading.Thread(target=leases.focus_bssid, args=(AP, 6))
+    worker.start()
+    time.sleep(0.1)
+    # Queued behind the BSSID lock being sent, returns once sent itself
+    mover = threading.Thread(target=leases.lock_channel, args=(11, 20))
+    mover.start()
+    time.sleep(0.1)
+    assert mover.is_alive()
+    pineap.release.set()
+    worker.join(1)
+    mover.join(1)
+    assert pineap.commands == ['CHANNEL 6 30', 'BSSID %s 1' % AP, 'CHANNEL 11 20']
+    assert leases.bssid is None
+
+
+def test_focus_end_restores_channel_lock(runtime):
+    pineap = Pineap()
+    leases = FocusLeases(pineap, bssid_lease=0.3, runtime=runtime)
+    threads = threading.active_count()
+    leases.lock_channel(6, 30)
+    leases.focus_bssid(AP, 6)
+    leases.focus_bssid(AP, 6, 0.6)  # renewed
+    assert threading.active_count() == threads
+
+    time.sleep(0.3)
+    assert pineap.commands[-1] == 'BSSID %s 1' % AP
+    time.sleep(0.6)
+    assert pineap.commands[-1] == 'CHANNEL 6 30'
+    assert leases.bssid is None
+    assert leases.channel == 6
+
+
+def test_conflicts(runtime):
+    pineap = Pineap()
+    leases = FocusLeases(pineap, bssid_lease=0.3, runtime=runtime)
+    leases.lock_channel(6, 30)
+    with pytest.raises(FocusConflict):
+        leases.focus_bssid(AP, 11)
+    leases.focus_bssid(AP, 6)
+    with pytest.raises(FocusConflict):
+        leases.focus_bssid(OTHER, 6, wait=0.05)
+    # Waits out the first AP's lease
+    leases.focus_bssid(OTHER, 6, wait=1.0)
+    assert leases.bssid == OTHER
+    assert leases.stats()['rejected'] == 2
@@ -0,0 +1,76 @@
+"""HandshakeBook lookups, and their cost against the "sta -> ap" key scan they replaced"""
+
+import random
+import timeit
+
+from pwnagotchi_port.handshake_book import HandshakeBook
+from pwnagotchi_port.records import format_mac, mac_to_int
+
+AP = 'AA:BB:CC:00:00:01'
+STA = '11:22:33:44:55:66'
+
+
+def test_record_and_lookup_any_mac_form():
+    book = HandshakeBook()
+    assert book.record(AP, STA, {'file': 'a.22000'})
+    # Same pair in other spellings
+    assert not book.record(AP.lower(), mac_to_int(STA), {'file': 'b.22000'})
+    assert not book.record('aabbcc000001', STA.replace(':', '-'), {})
+    assert len(book) == 1
+
+    for ap in (AP, AP.lower(), mac_to_int(AP), 'aabbcc000001'):
+        assert book.has_ap(ap)
+        assert book.has_pair(ap, STA.lower())
+        assert book.get(ap, mac_to_int(STA)) == {'file': 'a.22000'}
+    assert not book.has_ap('AA:BB:CC:00:00:02')
+    assert not book.has_pair(AP, '11:22:33:44:55:67')
+
+
+def test_unknown_station():
+    book = HandshakeBook()
+    assert book.record(mac_to_int(AP), None, {'file': 'pmkid.22000'})
+    assert book.record(AP, STA, {'file': 'eapol.22000'})
+    assert book.has_ap(AP.lower())
+    assert book.has_pair(AP, None)
+    assert book.stations(AP) == {None, mac_to_int(STA)}
+
+
+def test_station_is_not_an_ap():
+    # The old scan over "sta -> ap" keys matched the station's MAC too
+    book = HandshakeBook()
+    book.record(AP, STA, {})
+    assert not book.has_ap(STA)
+
+
+def test_recovery_round_trip():
+    book = HandshakeBook()
+    book.record(AP, STA, {'file': 'a.22000'})
+    book.record('AA:BB:CC:00:00:02', None, {'file': 'b.22000'})
+    data = book.to_dict()
+    assert '11:22:33:44:55:66 -> aa:bb:cc:00:00:01' in data
+    restored = HandshakeBook.from_dict(data)
+    assert restored.has_pair(AP, STA)
+    assert restored.has_ap(mac_to_int('AA:BB:CC:00:00:02'))
+
+
+def test_lookup_cost():
+    rng = random.Random(7)
+    book, keys = HandshakeBook(), {}
+    for _ in range(5000):
+        ap, sta = rng.getrandbits(48), rng.getrandbits(48)
+        book.record(ap, sta, {})
+        keys['%s -> %s' % (format_mac(sta, upper=False), format_mac(ap, upper=False))] = {}
+    missing = 'DE:AD:BE:EF:00:01'
+
+    def scan():
+        # What Agent._has_handshake did before the book
+        for key in keys:
+            if missing.lower() in key:
+                return True
+        return False
+
+    runs = 200
+    scan_time = min(timeit.repeat(scan, number=runs, repeat=3)) / runs
+    book_time = min(timeit.repeat(lambda: book.has_ap(missing), number=runs * 10, repeat=3)) / (runs * 10)
+    print('\n5000 handshakes: key scan %.1fus, has_ap %.2fus per lookup' % (scan_time * 1e6, book_time * 1e6))
+    assert book_time * 20 < scan_time
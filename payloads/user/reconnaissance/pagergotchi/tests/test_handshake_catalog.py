@@ -0,0 +1,77 @@
+"""HandshakeCatalog startup over a loot directory of 10k generated captures"""
+
+import builtins
+import os
+import time
+
+from pwnagotchi_port.handshake_catalog import HASH_EAPOL, HASH_PMKID, HandshakeCatalog
+
+FILES = 10000
+
+
+def make_loot(directory, count=FILES):
+    paths = []
+    for i in range(count):
+        ap = '0000aa%06x' % i
+        sta = '1111bb%06x' % i
+        essid = ('net-%d' % i).encode().hex()
+        path = os.path.join(str(directory), '%d_%s.22000' % (1700000000 + i, ap))
+        with open(path, 'w') as fp:
+            fp.write('WPA*01*%s*%s*%s*%s***\n' % ('0' * 32, ap, sta, essid))
+            if i % 3 == 0:
+                fp.write('WPA*02*%s*%s*%s*%s*%s*%s*00\n' % ('0' * 32, ap, sta, essid, '0' * 64, '0' * 200))
+        paths.append(path)
+    return paths
+
+
+def timed_sync(catalog, paths):
+    start = time.monotonic()
+    counts = catalog.sync(paths)
+    return counts, time.monotonic() - start
+
+
+def test_cold_then_warm_sync(tmp_path, monkeypatch):
+    loot = tmp_path / 'handshakes'
+    loot.mkdir()
+    paths = make_loot(loot)
+    catalog_file = str(tmp_path / 'handshakes.json')
+
+    cold = HandshakeCatalog(catalog_file)
+    cold.load()
+    (parsed, reused, removed), cold_time = timed_sync(cold, paths)
+    assert (parsed, reused, removed) == (FILES, 0, 0)
+    assert cold.get(paths[3])['types'] == [HASH_PMKID, HASH_EAPOL]
+    assert cold.get(paths[4])['essid'] == 'net-4'
+
+    opened = []
+    real_open = builtins.open
+
+    def counting_open(file, *args, **kwargs):
+        if str(file).endswith('.22000'):
+            opened.append(file)
+        return real_open(file, *args, **kwargs)
+
+    warm = HandshakeCatalog(catalog_file)
+    warm.load()
+    monkeypatch.setattr(builtins, 'open', counting_open)
+    (parsed, reused, removed), warm_time = timed_sync(warm, paths)
+    monkeypatch.undo()
+
+    assert (parsed, reused, removed) == (0, FILES, 0)
+    assert opened == []
+    assert warm.get(paths[3]) == cold.get(paths[3])
+    print('\n%d files: cold sync %.0fms, warm sync %.0fms' % (FILES, cold_time * 1000, warm_time * 1000))
+
+
+def test_changed_and_removed_files(tmp_path):
+    paths = make_loot(tmp_path, 20)
+    catalog = HandshakeCatalog(str(tmp_path / 'handshakes.json'))
+    catalog.sync(paths)
+
+    with open(paths[0], 'a') as fp:
+        fp.write('WPA*02*%s*0000aa000000*1111bb000000*00*%s*%s*00\n' % ('0' * 32, '0' * 64, '0' * 200))
+    os.utime(paths[0], ns=(1, 1))
+    os.remove(paths[1])
+    assert catalog.sync(paths) == (1, 18, 1)
+    assert catalog.get(paths[0])['types'] == [HASH_PMKID, HASH_EAPOL]
+    assert paths[1] not in catalog
@@ -0,0 +1,87 @@
+"""HandshakeWatcher in poll mode: new files and appends to known ones"""
+
+import os
+
+import pytest
+
+from pwnagotchi_port import handshake_watcher
+from pwnagotchi_port.handshake_watcher import HandshakeWatcher
+
+
+class FakeRuntime:
+    """Runs submitted work inline; timers are ticked by the test"""
+
+    def __init__(self):
+        self.timers = {}
+
+    def every(self, interval, fn, name, blocking=False, delay=None):
+        self.timers[name] = fn
+
+    def cancel(self, name, wait=0.0):
+        self.timers.pop(name, None)
+
+    def call_soon(self, fn, *args):
+        fn(*args)
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+    def add_reader(self, fd, fn):
+        raise AssertionError('no inotify in poll mode')
+
+    def remove_reader(self, fd):
+        pass
+
+
+@pytest.fixture
+def watched(tmp_path, monkeypatch):
+    monkeypatch.setattr(handshake_watcher, '_load_libc', lambda: None)
+    (tmp_path / 'old.22000').write_text('WPA*01*pmkid\n')
+    watcher = HandshakeWatcher(str(tmp_path))
+    events = []
+    watcher.subscribe(lambda event: events.append((event['tag'], os.path.basename(event['data']['file']))))
+    runtime = FakeRuntime()
+    watcher.start(runtime)
+    tick = runtime.timers['handshake-watcher']
+    tick()
+    assert watcher.mode == 'poll'
+    yield tmp_path, events, tick
+    watcher.stop()
+
+
+def append(path, line):
+    with open(path, 'a') as fp:
+        fp.write(line)
+
+
+def test_poll_reports_appends_to_known_files(watched):
+    directory, events, tick = watched
+    assert events == []
+    tick()
+    assert events == []
+
+    append(directory / 'old.22000', 'WPA*02*eapol\n')
+    tick()
+    assert events == [('handshake.updated', 'old.22000')]
+    tick()
+    assert events == [('handshake.updated', 'old.22000')]
+
+
+def test_poll_reports_new_files_then_their_appends(watched):
+    directory, events, tick = watched
+    (directory / 'new.22000').write_text('WPA*01*pmkid\n')
+    (directory / 'notes.txt').write_text('x')
+    tick()
+    assert events == [('handshake.new', 'new.22000')]
+
+    append(directory / 'new.22000', 'WPA*02*eapol\n')
+    append(directory / 'old.22000', 'WPA*02*eapol\n')
+    tick()
+    assert events[1:] == [('handshake.updated', 'new.22000'), ('handshake.updated', 'old.22000')]
+
+    # Deleted and written again: new, not updated
+    os.remove(directory / 'new.22000')
+    tick()
+    (directory / 'new.22000').write_text('WPA*01*pmkid\n')
+    tick()
+    assert events[3:] == [('handshake.new', 'new.22000')]
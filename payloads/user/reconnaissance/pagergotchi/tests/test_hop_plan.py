@@ -0,0 +1,65 @@
+"""Hop plan cost against the busiest-first channel order on synthetic AP distributions"""
+
+import random
+
+import pytest
+
+from pwnagotchi_port.hop_plan import (busiest_first, channel_to_band, compile_plan, order_channels,
+                                      plan_cost, synthetic_work)
+
+
+def retunes(order, start=0):
+    return sum(1 for a, b in zip([start] + order, order)
+               if a and channel_to_band(a) != channel_to_band(b))
+
+
+def epochs(runs=200, seed=1):
+    """(work, start) for runs synthetic epochs, as in hop_plan --compare"""
+    rng = random.Random(seed)
+    for _ in range(runs):
+        yield synthetic_work(rng, aps=rng.choice((10, 40, 120))), rng.choice((0, 6, 36))
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_never_costs_more_than_busiest_first(seed):
+    plan_total = busiest_total = 0.0
+    for work, start in epochs(seed=seed):
+        plan = plan_cost(order_channels(list(work), start), work, start)
+        busiest = plan_cost(busiest_first(work), work, start)
+        assert plan <= busiest + 1e-9
+        plan_total += plan
+        busiest_total += busiest
+    assert plan_total < busiest_total
+
+
+def test_one_band_change_per_band():
+    for work, start in epochs():
+        order = order_channels(list(work), start)
+        bands = {channel_to_band(ch) for ch in work}
+        assert sorted(order) == sorted(work)
+        assert retunes(order, start) <= len(bands)
+        assert retunes(order, start) <= retunes(busiest_first(work), start)
+
+
+def test_starts_in_current_band():
+    work = {1: (5.0, 1.0), 6: (5.0, 1.0), 36: (20.0, 3.0), 197: (5.0, 1.0)}
+    order = order_channels(list(work), start=6)
+    assert order[0] == 6
+    assert [channel_to_band(ch) for ch in order[:2]] == ['2G', '2G']
+
+
+def test_budget_drops_least_productive():
+    for work, start in epochs(runs=50):
+        plan = compile_plan(work, start, budget=60)
+        assert sorted(plan.order + plan.dropped) == sorted(work)
+        assert plan.order
+        if len(plan.order) > 1:
+            assert plan.cost <= 60 + 1e-9
+        assert plan.cost == pytest.approx(plan_cost(plan.order, work, start))
+
+
+def test_no_budget_keeps_every_channel():
+    work = synthetic_work(random.Random(4), aps=40)
+    plan = compile_plan(work, start=1)
+    assert plan.dropped == []
+    assert sorted(plan.order) == sorted(work)
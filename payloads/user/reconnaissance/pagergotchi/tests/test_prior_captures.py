@@ -0,0 +1,33 @@
+"""PriorCaptureIndex matching by BSSID and ESSID"""
+
+from pwnagotchi_port.handshake_catalog import HASH_EAPOL
+from pwnagotchi_port.prior_captures import RECAPTURE_NEVER, PriorCaptureIndex
+from pwnagotchi_port.records import mac_to_int
+
+CAPTURED = mac_to_int('a0:04:60:12:34:56')
+
+
+def index(match_essid):
+    prior = PriorCaptureIndex(RECAPTURE_NEVER, match_essid=match_essid)
+    prior.add(CAPTURED, 'NETGEAR', 1000.0, (HASH_EAPOL,))
+    return prior
+
+
+def test_bssid_match():
+    assert index(False).should_skip(CAPTURED, 'NETGEAR')
+    assert index(False).should_skip(CAPTURED, '')
+
+
+def test_essid_not_matched_by_default():
+    assert not index(False).should_skip(mac_to_int('a0:04:60:12:34:57'), 'NETGEAR')
+
+
+def test_essid_needs_same_vendor_or_block():
+    prior = index(True)
+    # Other band / extender from the same vendor
+    assert prior.should_skip(mac_to_int('a0:04:60:99:00:01'), 'NETGEAR')
+    # Locally administered virtual BSSID of the same AP
+    assert prior.should_skip(mac_to_int('a2:04:60:12:34:50'), 'NETGEAR')
+    # Someone else's NETGEAR, another vendor's chip
+    assert not prior.should_skip(mac_to_int('10:da:43:12:34:56'), 'NETGEAR')
+    assert not prior.should_skip(mac_to_int('a0:04:60:12:34:57'), 'linksys')
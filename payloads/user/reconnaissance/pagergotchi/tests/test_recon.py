@@ -0,0 +1,92 @@
+"""ReconFetcher paging against fake `_pineap RECON APS` servers"""
+
+import json
+import random
+
+from pwnagotchi_port.recon import ReconFetcher
+
+
+def ap_list(count):
+    return [{'mac': 'aa:bb:cc:%02x:%02x:%02x' % (i >> 16, (i >> 8) & 0xff, i & 0xff), 'signal': -60}
+            for i in range(count)]
+
+
+class FakeServer:
+    """stream(cmd, timeout) for a pineapd with count APs"""
+
+    def __init__(self, count, offset=True, shuffle=False):
+        self.aps = ap_list(count)
+        self.offset = offset
+        self.rng = random.Random(1) if shuffle else None
+        self.commands = []
+
+    def __call__(self, cmd, timeout):
+        self.commands.append(cmd)
+        args = dict(arg.split('=', 1) for arg in cmd if '=' in arg)
+        aps = list(self.aps)
+        if self.rng is not None:
+            self.rng.shuffle(aps)
+        start = int(args.get('offset', 0)) if self.offset else 0
+        text = json.dumps(aps[start:start + int(args['limit'])])
+        # In small chunks, as read from the co-process
+        return [text[i:i + 512] for i in range(0, len(text), 512)]
+
+
+def walk(fetcher):
+    pages = list(fetcher.pages())
+    return [ap['mac'] for page in pages for ap in page], pages
+
+
+def test_offset_supported():
+    server = FakeServer(450)
+    fetcher = ReconFetcher(server, page_size=200)
+    macs, pages = walk(fetcher)
+    assert macs == [ap['mac'] for ap in server.aps]
+    assert [len(page) for page in pages] == [200, 200, 50]
+    assert fetcher.paging
+    assert fetcher.last_requests == len(server.commands) == 3
+    assert fetcher.last_count == 450
+
+
+def test_exact_multiple_of_page_size():
+    server = FakeServer(400)
+    fetcher = ReconFetcher(server, page_size=200)
+    assert len(walk(fetcher)[0]) == 400
+    # The third, empty page ends the walk
+    assert fetcher.last_requests == 3
+    assert fetcher.paging
+
+
+def test_offset_ignored():
+    server = FakeServer(450, offset=False)
+    fetcher = ReconFetcher(server, page_size=200)
+
+    macs, _pages = walk(fetcher)
+    # The repeated page is neither merged again nor followed by more requests
+    assert macs == [ap['mac'] for ap in server.aps[:200]]
+    assert len(set(macs)) == len(macs)
+    assert fetcher.last_requests == 2
+    assert not fetcher.paging
+
+    # Next walk: one request for everything, still yielded page by page
+    macs, pages = walk(fetcher)
+    assert macs == [ap['mac'] for ap in server.aps]
+    assert [len(page) for page in pages] == [200, 200, 50]
+    assert fetcher.last_requests == 1
+    assert server.commands[-1][-1] == 'limit=5000'
+
+
+def test_offset_ignored_unstable_order():
+    server = FakeServer(450, offset=False, shuffle=True)
+    fetcher = ReconFetcher(server, page_size=200)
+    macs, _pages = walk(fetcher)
+    assert len(set(macs)) == len(macs) == 200
+    assert fetcher.last_requests == 2
+    assert not fetcher.paging
+
+
+def test_max_aps():
+    server = FakeServer(1000)
+    fetcher = ReconFetcher(server, page_size=200, max_aps=500)
+    assert len(walk(fetcher)[0]) == 500
+    assert fetcher.last_requests == 3
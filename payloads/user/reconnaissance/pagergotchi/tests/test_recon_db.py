@@ -0,0 +1,115 @@
+"""ReconDBReader against a sample recon database (tests/fixtures/recon_pager.sql)"""
+
+import os
+import sqlite3
+
+import pytest
+
+from pwnagotchi_port.recon_db import ReconDBReader, find_recon_db
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'recon_pager.sql')
+
+
+@pytest.fixture
+def recon_db(tmp_path):
+    """Path of a fresh copy of the sample database"""
+    path = tmp_path / 'pager.db'
+    conn = sqlite3.connect(str(path))
+    with open(FIXTURE) as fp:
+        conn.executescript(fp.read())
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def execute(path, sql, *args):
+    conn = sqlite3.connect(path)
+    conn.execute(sql, args)
+    conn.commit()
+    conn.close()
+
+
+def test_find_recon_db(recon_db):
+    assert find_recon_db(os.path.dirname(recon_db), 'pager') == recon_db
+    assert find_recon_db(os.path.dirname(recon_db), 'other') is None
+
+
+def test_reads_aps(recon_db):
+    reader = ReconDBReader(recon_db)
+    aps = {ap['mac']: ap for ap in reader.read_aps()}
+
+    assert sorted(aps) == ['AA:BB:CC:00:00:01', 'AA:BB:CC:00:00:02', 'AA:BB:CC:00:00:03']
+    home = aps['AA:BB:CC:00:00:01']
+    assert (home['hostname'], home['channel'], home['rssi']) == ('HomeNet', 6, -48)
+    assert home['last_seen'] == 1700000000.0  # from milliseconds
+    # Channel from the frequency when the row has none
+    assert aps['AA:BB:CC:00:00:02']['channel'] == 36
+    assert aps['AA:BB:CC:00:00:02']['pmf'] == 'required'
+    assert aps['AA:BB:CC:00:00:03']['encryption'] == 'OPEN'
+    assert reader.tracks_time
+
+
+def test_only_changed_rows_after_first_poll(recon_db):
+    reader = ReconDBReader(recon_db)
+    assert len(list(reader.read_aps())) == 3
+
+    # Rows sharing the last timestamp are read again, nothing else
+    assert [ap['mac'] for ap in reader.read_aps()] == ['AA:BB:CC:00:00:03']
+
+    execute(recon_db, "UPDATE wifi_ap SET signal = -40, last_seen = 1700000010000 WHERE bssid = 'aa:bb:cc:00:00:01'")
+    execute(recon_db, "INSERT INTO wifi_ap VALUES ('aa:bb:cc:00:00:04', 'Cafe', 1, 2412, -60, 'WPA2', 'PSK', '', "
+                      "1700000011000)")
+    changed = {ap['mac']: ap for ap in reader.read_aps()}
+    assert sorted(changed) == ['AA:BB:CC:00:00:01', 'AA:BB:CC:00:00:03', 'AA:BB:CC:00:00:04']
+    assert changed['AA:BB:CC:00:00:01']['rssi'] == -40
+
+
+def test_reads_clients(recon_db):
+    reader = ReconDBReader(recon_db)
+    list(reader.read_aps())
+    assert sorted(reader.read_clients()) == [
+        ('aa:bb:cc:00:00:01', '11:22:33:44:55:01', -52),
+        ('aa:bb:cc:00:00:02', '11:22:33:44:55:02', -75),
+    ]
+    assert list(reader.read_clients()) == [('aa:bb:cc:00:00:02', '11:22:33:44:55:02', -75)]
+
+
+def test_recreated_table_starts_over(recon_db):
+    reader = ReconDBReader(recon_db)
+    list(reader.read_aps())
+
+    # RECON NEW: same table, older rows
+    execute(recon_db, "DELETE FROM wifi_ap")
+    execute(recon_db, "INSERT INTO wifi_ap VALUES ('aa:bb:cc:00:00:09', 'New', 1, 2412, -50, 'WPA2', 'PSK', '', 5000)")
+    assert [ap['mac'] for ap in reader.read_aps()] == ['AA:BB:CC:00:00:09']
+
+
+def test_text_timestamps_fall_back_to_rowid(tmp_path):
+    path = str(tmp_path / 'pager.db')
+    execute(path, "CREATE TABLE aps (mac TEXT, ssid TEXT, channel INTEGER, signal INTEGER, time TEXT)")
+    execute(path, "INSERT INTO aps VALUES ('aa:bb:cc:00:00:01', 'A', 1, -50, '2024-01-01 10:00:00')")
+    reader = ReconDBReader(path)
+
+    aps = list(reader.read_aps())
+    assert [ap['mac'] for ap in aps] == ['AA:BB:CC:00:00:01']
+    assert 'last_seen' not in aps[0]
+    assert not reader.tracks_time
+    execute(path, "INSERT INTO aps VALUES ('aa:bb:cc:00:00:02', 'B', 6, -60, '2024-01-01 10:00:05')")
+    assert [ap['mac'] for ap in reader.read_aps()] == ['AA:BB:CC:00:00:02']
+
+
+def test_text_in_untyped_time_column(tmp_path):
+    # No declared type: the first poll sees numbers, a later row a string
+    path = str(tmp_path / 'pager.db')
+    execute(path, "CREATE TABLE aps (mac, ssid, channel, signal, last_seen)")
+    execute(path, "INSERT INTO aps VALUES ('aa:bb:cc:00:00:01', 'A', 1, -50, 1700000000)")
+    reader = ReconDBReader(path)
+    assert len(list(reader.read_aps())) == 1
+    assert reader.tracks_time
+
+    execute(path, "INSERT INTO aps VALUES ('aa:bb:cc:00:00:02', 'B', 6, -60, 'yesterday')")
+    # No TypeError comparing the mark; starts over by rowid
+    assert sorted(ap['mac'] for ap in reader.read_aps()) == ['AA:BB:CC:00:00:01', 'AA:BB:CC:00:00:02']
+    assert not reader.tracks_time
+    assert list(reader.read_aps()) == []
+
@@ -0,0 +1,67 @@
+"""Memory of the AP/client tables: slotted records with int MACs against the
+per-AP dicts keyed by MAC strings they replaced, at 10k APs and 50k clients"""
+
+import random
+import tracemalloc
+from collections import deque
+
+from pwnagotchi_port.records import APRecord, ClientRecord, format_mac
+
+APS = 10000
+CLIENTS = 50000
+
+
+def macs(rng, count):
+    return [rng.getrandbits(48) & ~(1 << 40) for _ in range(count)]
+
+
+def dict_layout(ap_macs, client_macs):
+    """The previous layout: one dict per AP and client, string MACs"""
+    aps, clients = {}, {}
+    for i, mac in enumerate(ap_macs):
+        key = format_mac(mac)
+        aps[key] = {'mac': key, 'hostname': 'AP-%d' % i, 'vendor': '', 'channel': 6, 'rssi': -60,
+                    'encryption': 'WPA2', 'cipher': 'CCMP', 'authentication': 'PSK', 'pmf': '',
+                    'first_seen': 1700000000.0 + i, 'last_seen': 1700000000.0 + i,
+                    'rssi_history': deque([-60], maxlen=APRecord.RSSI_HISTORY)}
+    for i, mac in enumerate(client_macs):
+        key = format_mac(mac).lower()
+        ap = format_mac(ap_macs[i % len(ap_macs)])
+        clients.setdefault(ap, {})[key] = {'mac': key, 'vendor': '', 'rssi': -70,
+                                           'first_seen': 1700000000.0 + i,
+                                           'last_seen': 1700000000.0 + i}
+    return aps, clients
+
+
+def slots_layout(ap_macs, client_macs):
+    aps, clients = {}, {}
+    for i, mac in enumerate(ap_macs):
+        rec = APRecord(mac, 'AP-%d' % i, 6, -60, 'WPA2', 1700000000.0 + i)
+        rec.cipher = 'CCMP'
+        rec.authentication = 'PSK'
+        aps[mac] = rec
+    for i, mac in enumerate(client_macs):
+        clients[(ap_macs[i % len(ap_macs)], mac)] = ClientRecord(mac, 1700000000.0 + i, rssi=-70)
+    return aps, clients
+
+
+def measure(build, *args):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tables = build(*args)
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del tables
+    return size
+
+
+def test_slots_use_less_memory():
+    rng = random.Random(5)
+    ap_macs, client_macs = macs(rng, APS), macs(rng, CLIENTS)
+    dicts = measure(dict_layout, ap_macs, client_macs)
+    slots = measure(slots_layout, ap_macs, client_macs)
+    print('\n%d APs, %d clients: dicts %.1f MiB, slots %.1f MiB (%.0f%%)' % (
+        APS, CLIENTS, dicts / 2.0 ** 20, slots / 2.0 ** 20, 100.0 * slots / dicts))
+    assert slots < dicts * 0.6
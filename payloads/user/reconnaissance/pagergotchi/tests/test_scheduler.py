@@ -0,0 +1,54 @@
+"""TargetScheduler queueing of APs offered mid-epoch"""
+
+from pwnagotchi_port.scheduler import ACTION_ASSOC, ACTION_DEAUTH, TargetScheduler
+
+AP = {'mac': 'AA:BB:CC:00:00:01', 'channel': 6, 'rssi': -50}
+CLIENTS = [{'mac': '11:22:33:44:55:66'}]
+
+
+def drain(scheduler, channel, stay=True):
+    items = []
+    while True:
+        item = scheduler.next(channel, stay)
+        if item is None:
+            return items
+        items.append((item[0], item[1]['mac'], item[1]['channel']))
+
+
+def test_offer_with_clients_queues_deauth():
+    scheduler = TargetScheduler()
+    scheduler.begin_epoch([])
+    scheduler.offer(dict(AP), CLIENTS)
+    assert sorted(action for action, _mac, _ch in drain(scheduler, 6)) == [ACTION_ASSOC, ACTION_DEAUTH]
+
+
+def test_reoffer_keeps_clients():
+    scheduler = TargetScheduler()
+    scheduler.begin_epoch([(dict(AP), CLIENTS)])
+    # wifi.ap.changed without clients
+    scheduler.offer(dict(AP, rssi=-55))
+    assert scheduler.workload()[6][2]
+    assert ACTION_DEAUTH in [action for action, _mac, _ch in drain(scheduler, 6)]
+
+
+def test_channel_change_drops_old_item():
+    scheduler = TargetScheduler()
+    scheduler.begin_epoch([(dict(AP), CLIENTS)])
+    # Same signal, so the same score, on another channel
+    scheduler.offer(dict(AP, channel=11))
+    assert set(scheduler.workload()) == {11}
+    assert drain(scheduler, 6) == []
+    assert sorted(drain(scheduler, 11)) == [(ACTION_ASSOC, AP['mac'], 11), (ACTION_DEAUTH, AP['mac'], 11)]
+    assert scheduler.next(6) is None
+
+
+def test_forget():
+    scheduler = TargetScheduler(max_attempts=1)
+    scheduler.begin_epoch([(dict(AP), CLIENTS)])
+    assert scheduler.next(6)[0] == ACTION_ASSOC
+    scheduler.begin_epoch([(dict(AP), CLIENTS)])
+    assert drain(scheduler, 6) == [(ACTION_DEAUTH, AP['mac'], 6)]
+
+    scheduler.forget(AP)
+    scheduler.begin_epoch([(dict(AP), CLIENTS)])
+    assert len(drain(scheduler, 6)) == 2
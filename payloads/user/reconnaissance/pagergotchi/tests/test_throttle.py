@@ -0,0 +1,88 @@
+"""AdaptiveThrottle environments: switching only when a new place persists"""
+
+import json
+import random
+
+from pwnagotchi_port.throttle import ASSOC, AdaptiveThrottle
+
+
+def place(rng, count):
+    return ['%012x' % rng.getrandbits(48) for _ in range(count)]
+
+
+def nearby(rng, bssids, keep=0.8):
+    """Most of the same APs, some replaced"""
+    return [b for b in bssids if rng.random() < keep] + place(rng, int(len(bssids) * (1 - keep)))
+
+
+def throttle(tmp_path):
+    return AdaptiveThrottle(0.4, 0.9, path=str(tmp_path / 'throttle.json'))
+
+
+def test_stays_while_moving(tmp_path):
+    rng = random.Random(1)
+    t = throttle(tmp_path)
+    assert t.select_environment(place(rng, 40))
+    t.values[ASSOC] = 1.5  # learned
+    # Driving: every epoch shows different APs
+    for _ in range(30):
+        assert not t.select_environment(place(rng, rng.randrange(5, 200)))
+    assert t.values[ASSOC] == 1.5
+    assert len(t._envs) == 1
+
+
+def test_switches_once_a_place_persists(tmp_path):
+    rng = random.Random(2)
+    t = throttle(tmp_path)
+    home, work = place(rng, 60), place(rng, 300)
+    t.select_environment(home)
+    t.values[ASSOC] = 1.5
+
+    assert not t.select_environment(nearby(rng, work))
+    assert not t.select_environment(nearby(rng, work))
+    assert t.select_environment(nearby(rng, work))
+    assert t.values[ASSOC] == 0.4  # new place, configured default
+    t.values[ASSOC] = 0.2
+
+    for _ in range(t.SWITCH_AFTER - 1):
+        assert not t.select_environment(nearby(rng, home))
+    assert t.select_environment(nearby(rng, home))
+    assert t.values[ASSOC] == 1.5
+    assert len(t._envs) == 2
+
+
+def test_bssid_sample_is_capped(tmp_path):
+    rng = random.Random(3)
+    t = throttle(tmp_path)
+    city = place(rng, 1000)
+    t.select_environment(city)
+    t.save()
+    with open(t.path) as fp:
+        stored = json.load(fp)['environments']
+    assert [len(env['bssids']) for env in stored.values()] == [t.SAMPLE_SIZE]
+
+    again = throttle(tmp_path)
+    again.load()
+    assert again.select_environment(nearby(rng, city, keep=0.7))
+    assert again._env == t._env
+
+
+def test_old_files_are_sampled(tmp_path):
+    rng = random.Random(4)
+    t = throttle(tmp_path)
+    bssids = place(rng, 500)
+    with open(t.path, 'w') as fp:
+        json.dump({'environments': {'1': {'bssids': bssids, 'assoc': 0.7, 'used': 1}}}, fp)
+    t.load()
+    assert len(t._envs['1']['bssids']) == t.SAMPLE_SIZE
+    assert t.select_environment(bssids)
+    assert t._env == '1' and t.values[ASSOC] == 0.7
+
+
+def test_similarity_estimate():
+    rng = random.Random(5)
+    t = AdaptiveThrottle()
+    a = place(rng, 2000)
+    b = a[:1000] + place(rng, 1000)  # Jaccard 1/3
+    assert abs(t._similarity(t._sample(a), t._sample(b)) - 1 / 3.0) < 0.15
+    assert t._similarity(t._sample(a), t._sample(place(rng, 2000))) < 0.05
@@ -0,0 +1,65 @@
+"""BSSID set for the client tracker's BPF filter"""
+
+import random
+from types import SimpleNamespace
+
+from pwnagotchi_port.ap_table import APTable
+from pwnagotchi_port.bettercap import PineAPBackend
+
+MAX = PineAPBackend.TRACKER_MAX_BSSIDS
+
+
+def backend(aps):
+    """Just enough of a backend for _strongest_bssids(): {int mac: rssi}"""
+    table = APTable(lost_after=0)
+    table.merge([{'mac': '%012x' % mac, 'channel': 6, 'rssi': rssi} for mac, rssi in aps.items()], now=0.0)
+    table.publish()
+    return SimpleNamespace(_ap_table=table, TRACKER_MAX_BSSIDS=MAX,
+                           TRACKER_SWAP_DB=PineAPBackend.TRACKER_SWAP_DB,
+                           TRACKER_SWAP_SHARE=PineAPBackend.TRACKER_SWAP_SHARE)
+
+
+def strongest(aps, current=frozenset()):
+    return PineAPBackend._strongest_bssids(backend(aps), current)
+
+
+def test_no_aps_no_filter():
+    assert strongest({}) == frozenset()
+
+
+def test_capped_at_strongest_however_many():
+    rng = random.Random(2)
+    for count in (65, 256, 300, 2000):
+        aps = {mac: rng.randrange(-95, -30) for mac in range(1, count + 1)}
+        chosen = strongest(aps)
+        assert len(chosen) == MAX
+        weakest_in = min(aps[mac] for mac in chosen)
+        assert all(aps[mac] <= weakest_in for mac in aps if mac not in chosen)
+
+
+def test_few_aps_change_with_hysteresis():
+    # APs appearing one per refilter, never more than the cap
+    rng = random.Random(4)
+    aps, current, restarts = {}, frozenset(), 0
+    for mac in range(1, MAX + 1):
+        aps[mac] = rng.randrange(-90, -40)
+        chosen = strongest(aps, current)
+        if chosen != current:
+            restarts += 1
+            current = chosen
+    # The filter grows by a third at a time: ~log(64)/log(4/3) restarts, not 64
+    assert restarts <= 16
+    # Less than a quarter of the APs are outside the filter
+    assert len(set(aps) - current) < PineAPBackend.TRACKER_SWAP_SHARE * len(aps)
+
+
+def test_stable_set_kept():
+    aps = {mac: -50 - mac % 30 for mac in range(1, 200)}
+    current = strongest(aps)
+    # Slightly stronger newcomers don't displace anyone
+    aps.update({mac: -45 for mac in range(500, 505)})
+    assert strongest(aps, current) == current
+    # Many much stronger ones do
+    aps.update({mac: -30 for mac in range(600, 640)})
+    moved = strongest(aps, current)
+    assert set(range(600, 640)) <= moved and len(moved) == MAX